@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -18,8 +18,18 @@ class Settings(BaseSettings):
     # Vector Store Configuration
     vector_store_type: str = "faiss"  # faiss, pgvector
     faiss_index_path: str = "./data/faiss_index"
+    chunking_strategy: str = "sentences"  # sentences (token budget) or chars (chunk_size characters)
     chunk_size: int = 500
     chunk_overlap: int = 50
+    chunk_max_tokens: int = 512  # sentence chunks, lowered to the embedding model's input limit
+    chunk_overlap_tokens: int = 48
+    near_dup_enabled: bool = True  # skip pages and chunks nearly identical to one already indexed
+    near_dup_threshold: float = 0.85  # estimated Jaccard similarity of word 5-grams
+    near_dup_num_perm: int = 128  # MinHash values per text
+    template_detection_enabled: bool = True  # drop text blocks repeated across a site's pages
+    template_block_ratio: float = 0.5  # share of a site's pages a block must appear on to be dropped
+    template_min_pages: int = 5  # pages of a site seen before its template is applied
+    template_prune_pages: int = 20  # pages of a site between prunes of its rare blocks (bounds the counts table)
     top_k: int = 5
     
     # LLM Configuration
@@ -32,11 +42,67 @@ class Settings(BaseSettings):
     fetch_timeout: int = 10
     fetch_max_retries: int = 3
     fetch_user_agent: str = "NexTraction-Bot/1.0 (Research Tool)"
-    fetch_rate_limit: float = 1.0  # seconds between requests
+    fetch_rate_limit: float = 1.0  # seconds between requests to the same host
+    fetch_max_per_host: int = 4  # upper bound of the adaptive (AIMD) in-flight window per host
+    fetch_slow_latency: float = 5.0  # responses slower than this shrink the host's window
+    fetch_max_retry_after: float = 120.0  # give up on a URL when Retry-After asks for longer
+    circuit_breaker_threshold: int = 5  # consecutive failures before a host is parked
+    circuit_breaker_cooldown: float = 60.0  # seconds a parked host is skipped
+    fetch_concurrency: int = 8  # max in-flight requests per crawl job
+    fetch_dispatch_lookahead: int = 200  # URLs held back for busy hosts while looking for idle ones
+    fetch_max_body_bytes: int = 5 * 1024 * 1024  # pages larger than this are dropped mid-download
+    fetch_http2: bool = False  # HTTP/2 multiplexing (requires the optional h2 package)
+    http_max_connections: int = 100  # shared client pool, all jobs
+    http_max_keepalive: int = 50
+    http_keepalive_expiry: float = 30.0
+    dns_cache_ttl: int = 300  # seconds a DNS answer is reused
+    http_cassette_mode: str = "off"  # off, record (save every HTTP exchange), replay (serve from the cassette, no network)
+    http_cassette_path: str = "./data/cassettes/default.jsonl"
+    http_cassette_latency: float = 0.0  # simulated seconds per request in replay mode
+    frontier_max_in_memory: int = 10000  # queued URLs kept in memory before spilling to disk
+    seen_url_backend: str = "set"  # set, fingerprint (64-bit hashes), bloom (a few bytes per URL)
+    seen_url_bloom_capacity: int = 1_000_000
+    seen_url_bloom_error_rate: float = 0.001
+    http_cache_enabled: bool = True  # on-disk HTTP cache under data_dir/http_cache
+    http_cache_max_age: int = 300  # seconds a cached page is served without revalidation
+    http_cache_max_bytes: int = 1024 * 1024 * 1024  # cached bodies on disk; least recently stored entries are evicted past this (0 = no limit)
+    robots_cache_ttl: int = 3600  # seconds a parsed robots.txt is reused
+    robots_max_crawl_delay: float = 30.0  # upper bound for robots.txt Crawl-delay
+    sitemap_max_files: int = 50  # sitemap files (including indexes) read per job
+    crawl_exclude_traps: bool = True  # never follow links matching crawl_trap_patterns
+    crawl_trap_patterns: List[str] = [  # regexes searched in the URL path and query
+        r"/tags?/",  # tag listings
+        r"/page/\d+",  # paginated archives
+        r"[?&](page|paged)=\d+",
+        r"/calendar\b",  # calendar widgets generate endless dates
+        r"[?&](date|day|week|month|year)=",
+        r"/(19|20)\d{2}/\d{1,2}/?$",  # month archives
+        r"[?&](replytocom|share|sort|orderby|order)=",  # comment replies, sharing and sort variants
+    ]
+    crawl_checkpoints_enabled: bool = True  # journal crawl progress under data_dir/checkpoints
+    crawl_checkpoint_interval: int = 5  # fetched pages between checkpoint flushes
+    
+    # HTML Processing Configuration
+    html_parser: str = "lxml"  # BeautifulSoup tree builder (lxml, html.parser, html5lib)
+    
+    # Ingestion Pipeline Configuration
+    pipeline_queue_size: int = 16  # parsed pages buffered between the fetch and clean stages
+    pipeline_max_pending_batches: int = 4  # chunk batches buffered before the embed stage
+    embedding_batch_size: int = 64  # chunks per embedding request
+    clean_pool_workers: int = 2  # processes cleaning pages off the event loop, shared by all jobs (0 = clean inline)
+    bulk_ingest_workers: int = 0  # cleaning processes for offline bulk ingestion (0 = one per CPU)
+    bulk_embedding_batch_size: int = 512  # chunks per embedding request during bulk ingestion
+    push_max_record_bytes: int = 10_000_000  # longest NDJSON line accepted by POST /ingest/push
+    
+    # Refresh Configuration
+    refresh_scheduler_enabled: bool = True  # periodically refresh jobs created with refresh_interval_hours
+    refresh_check_interval: int = 300  # seconds between checks for jobs due a refresh
+    refresh_max_concurrent_jobs: int = 4
     
     # Storage Configuration
     data_dir: str = "./data"
     chunks_dir: str = "./data/chunks"
+    page_archive_enabled: bool = True  # keep fetched pages (gzip WARC) under data_dir/archives for reprocessing
     
     # Logging Configuration
     log_level: str = "INFO"
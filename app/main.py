@@ -5,6 +5,10 @@ from fastapi.responses import JSONResponse
 from app.config import settings
 from app.routers import ingest, status, ask, health, auth
 from app.middleware.rate_limit import RateLimitMiddleware
+from app.services.clean_pool import cleaning_pool
+from app.services.http_client import http_client_pool
+from app.services.job_manager import job_manager
+from app.services.refresh_scheduler import refresh_scheduler
 from app.utils.logger import logger
 import os
 import traceback
@@ -77,6 +81,15 @@ async def startup_event():
     os.makedirs(settings.chunks_dir, exist_ok=True)
     os.makedirs(f"{settings.data_dir}/indices", exist_ok=True)
     
+    # Shared HTTP client pool for all crawl jobs
+    await http_client_pool.start()
+    
+    # Reload persisted jobs and resume crawls interrupted by the last shutdown
+    job_manager.resume_jobs()
+    
+    # Periodic re-crawls of the jobs created with refresh_interval_hours
+    refresh_scheduler.start()
+    
     logger.info("Application started")
     logger.info(f"Embedding provider: {settings.embedding_provider}")
     logger.info(f"LLM provider: {settings.llm_provider}")
@@ -99,3 +112,6 @@ async def global_exception_handler(request: Request, exc: Exception):
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("Application shutting down")
+    await refresh_scheduler.stop()
+    await http_client_pool.close()
+    cleaning_pool.close()
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, BackgroundTasks, HTTPException
-from app.schemas import IngestRequest, IngestResponse
+from typing import Optional
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
+from app.schemas import IngestRequest, IngestResponse, JobState, PushIngestResponse
 from app.services.job_manager import job_manager
+from app.services.push_ingest import PushStream
 from app.utils.logger import logger
 
 router = APIRouter(prefix="/ingest", tags=["ingest"])
@@ -18,7 +20,14 @@ async def ingest(
             domain_allowlist=request.domain_allowlist,
             max_pages=request.max_pages,
             max_depth=request.max_depth,
-            user_notes=request.user_notes
+            user_notes=request.user_notes,
+            discover_sitemaps=request.discover_sitemaps,
+            include_patterns=request.include_patterns,
+            exclude_patterns=request.exclude_patterns,
+            crawl_strategy=request.crawl_strategy,
+            refresh_interval_hours=request.refresh_interval_hours,
+            budget_split=request.budget_split,
+            budget_weights=request.budget_weights
         )
         
         # Start background processing
@@ -38,3 +47,105 @@ async def ingest(
         logger.error(f"Error creating ingestion job: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to create job: {str(e)}")
 
+
+@router.post("/push", response_model=PushIngestResponse)
+async def push(request: Request, user_notes: Optional[str] = None):
+    """Ingest pre-fetched documents streamed as NDJSON, without crawling
+    
+    Each line is a {url, html|text, title, fetched_at} record. Records are
+    cleaned, chunked and embedded while the body is still uploading; the
+    response is sent once the job has finished. An oversized record fails
+    the job with 413, an upload without a valid record with 400, and other
+    failures (e.g. embedding) with 500.
+    """
+    job_id = job_manager.create_job(
+        seed_urls=[], domain_allowlist=[], max_pages=0, max_depth=0, user_notes=user_notes, source="push"
+    )
+    stream = PushStream(request.stream())
+    
+    logger.info(f"Started push ingestion job {job_id}")
+    job = await job_manager.ingest_push(job_id, stream)
+    
+    logger.info(f"Push job {job_id}: {stream.accepted} records accepted, {stream.rejected} rejected")
+    
+    if job["state"] == JobState.FAILED:
+        if stream.error:
+            status_code = 413
+        elif not stream.accepted:
+            status_code = 400
+        else:
+            status_code = 500
+        raise HTTPException(status_code=status_code, detail=f"Push job {job_id} failed: {job['error']}")
+    
+    return PushIngestResponse(
+        job_id=job_id,
+        accepted_pages=stream.accepted,
+        rejected_records=stream.rejected,
+        state=job["state"]
+    )
+
+
+@router.post("/{job_id}/reprocess", response_model=IngestResponse, status_code=202)
+async def reprocess(
+    job_id: str,
+    background_tasks: BackgroundTasks
+):
+    """Re-run cleaning, chunking and embedding from a job's page archive, without refetching
+    
+    The job keeps answering /ask from its current index until the rebuilt
+    one is published.
+    """
+    job = job_manager.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if job["state"] in (JobState.QUEUED, JobState.RUNNING):
+        raise HTTPException(status_code=409, detail=f"Job is still {job['state'].value}")
+    
+    if job_id in job_manager.refreshing:
+        raise HTTPException(status_code=409, detail="Job is refreshing")
+    
+    if job_id in job_manager.reprocessing:
+        raise HTTPException(status_code=409, detail="Job is already reprocessing")
+    
+    archived_pages = job_manager.prepare_reprocess(job_id)
+    if not archived_pages:
+        raise HTTPException(status_code=400, detail="No page archive for this job")
+    
+    background_tasks.add_task(job_manager.reprocess_job, job_id)
+    
+    logger.info(f"Reprocessing job {job_id} from {archived_pages} archived pages")
+    
+    return IngestResponse(
+        job_id=job_id,
+        accepted_pages=archived_pages
+    )
+
+
+@router.post("/{job_id}/refresh", response_model=IngestResponse, status_code=202)
+async def refresh(
+    job_id: str,
+    background_tasks: BackgroundTasks
+):
+    """Re-crawl a finished job now and re-index only the pages that changed"""
+    job = job_manager.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if job_id in job_manager.refreshing:
+        raise HTTPException(status_code=409, detail="Job is already refreshing")
+    
+    if job_id in job_manager.reprocessing:
+        raise HTTPException(status_code=409, detail="Job is reprocessing")
+    
+    if not job_manager.is_refreshable(job):
+        raise HTTPException(status_code=409, detail="Only finished crawl jobs can be refreshed")
+    
+    background_tasks.add_task(job_manager.refresh_job, job_id)
+    
+    logger.info(f"Refreshing job {job_id}")
+    
+    return IngestResponse(
+        job_id=job_id,
+        accepted_pages=job["pages_fetched"]
+    )
@@ -17,6 +17,15 @@ async def get_status(job_id: str):
         state=job["state"],
         pages_fetched=job["pages_fetched"],
         pages_indexed=job["pages_indexed"],
-        error=job.get("error")
+        cache_hits=job.get("cache_hits", 0),
+        cache_revalidations=job.get("cache_revalidations", 0),
+        shared_fetches=job.get("shared_fetches", 0),
+        error=job.get("error"),
+        refreshing=job.get("refreshing", False),
+        last_refreshed_at=job.get("last_refreshed_at"),
+        refresh_error=job.get("refresh_error"),
+        reprocessing=job.get("reprocessing", False),
+        last_reprocessed_at=job.get("last_reprocessed_at"),
+        reprocess_error=job.get("reprocess_error")
     )
 
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+import re
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Dict, List, Optional
 from enum import Enum
 
 
@@ -16,6 +17,31 @@ class IngestRequest(BaseModel):
     max_pages: int = Field(20, ge=1, le=1000, description="Maximum number of pages to fetch")
     max_depth: int = Field(2, ge=0, le=10, description="Maximum crawl depth")
     user_notes: Optional[str] = Field(None, description="Optional text tag for this ingestion")
+    discover_sitemaps: bool = Field(False, description="Honor robots.txt and seed the crawl from the sites' sitemaps")
+    include_patterns: Optional[List[str]] = Field(None, description="Only follow links whose path/query matches one of these regexes")
+    exclude_patterns: Optional[List[str]] = Field(None, description="Never follow links whose path/query matches one of these regexes")
+    crawl_strategy: str = Field("bfs", pattern="^(bfs|best_first)$", description="Crawl order: breadth-first, or most relevant links first (best_first)")
+    refresh_interval_hours: Optional[float] = Field(None, gt=0, description="Re-crawl the job this often and re-index the pages that changed")
+    budget_split: str = Field("seed", pattern="^(none|seed|domain)$", description="Share max_pages between seeds or domains by taking turns (none: one shared queue)")
+    budget_weights: Optional[Dict[str, int]] = Field(None, description="Pages per turn for a seed URL or domain (default 1)")
+    
+    @field_validator("budget_weights")
+    @classmethod
+    def validate_budget_weights(cls, weights: Optional[Dict[str, int]]) -> Optional[Dict[str, int]]:
+        for group, weight in (weights or {}).items():
+            if weight < 1:
+                raise ValueError(f"Budget weight for {group} must be at least 1")
+        return weights
+    
+    @field_validator("include_patterns", "exclude_patterns")
+    @classmethod
+    def validate_patterns(cls, patterns: Optional[List[str]]) -> Optional[List[str]]:
+        for pattern in patterns or []:
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise ValueError(f"Invalid pattern {pattern!r}: {e}")
+        return patterns
 
 
 class IngestResponse(BaseModel):
@@ -23,11 +49,39 @@ class IngestResponse(BaseModel):
     accepted_pages: int = Field(..., description="Number of pages accepted for processing")
 
 
+class PushRecord(BaseModel):
+    url: str = Field(..., min_length=1, description="Source URL of the document")
+    html: Optional[str] = Field(None, description="Raw HTML of the page")
+    text: Optional[str] = Field(None, description="Already extracted text, used when there is no HTML")
+    title: Optional[str] = Field(None, description="Page title (taken from the HTML if omitted)")
+    fetched_at: Optional[str] = Field(None, description="When the upstream system fetched the page (ISO 8601)")
+    
+    @model_validator(mode="after")
+    def require_body(self) -> "PushRecord":
+        if self.html is None and self.text is None:
+            raise ValueError("Either html or text is required")
+        return self
+
+
+class PushIngestResponse(IngestResponse):
+    rejected_records: int = Field(0, description="Number of invalid NDJSON records skipped")
+    state: JobState = Field(..., description="Final job state")
+
+
 class StatusResponse(BaseModel):
     state: JobState = Field(..., description="Current job state")
     pages_fetched: int = Field(0, description="Number of pages fetched")
     pages_indexed: int = Field(0, description="Number of pages indexed")
+    cache_hits: int = Field(0, description="Pages served from the HTTP cache without a full download")
+    cache_revalidations: int = Field(0, description="Cached pages revalidated with a 304 response")
+    shared_fetches: int = Field(0, description="Pages taken from another job's in-flight request for the same URL")
     error: Optional[str] = Field(None, description="Error message if failed")
+    refreshing: bool = Field(False, description="Whether a refresh is running (the current index keeps serving)")
+    last_refreshed_at: Optional[str] = Field(None, description="When the job was last refreshed")
+    refresh_error: Optional[str] = Field(None, description="Error message of the last refresh, if it failed")
+    reprocessing: bool = Field(False, description="Whether a reprocess is running (the current index keeps serving)")
+    last_reprocessed_at: Optional[str] = Field(None, description="When the job was last reprocessed")
+    reprocess_error: Optional[str] = Field(None, description="Error message of the last reprocess, if it failed")
 
 
 class Citation(BaseModel):
@@ -0,0 +1,160 @@
+import asyncio
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+from app.config import settings
+from app.services.clean_pool import clean_page_in_worker, worker_context
+from app.services.cleaner import ContentCleaner
+from app.services.page_archive import read_warc
+from app.services.pipeline import EmbeddingError
+from app.utils.logger import logger
+
+
+HTML_SUFFIXES = (".html", ".htm", ".xhtml")
+
+
+def iter_directory_pages(directory: str, base_url: Optional[str] = None) -> Iterator[Dict]:
+    """Read the HTML files of a local mirror as pages, in path order
+    
+    Page URLs are `base_url` joined with the file's path relative to the
+    directory, percent-encoded (e.g. a wget mirror of
+    https://docs.example.com/), or file:// URIs without a base URL.
+    """
+    root = Path(directory).resolve()
+    for path in sorted(root.rglob("*")):
+        if not path.is_file() or path.suffix.lower() not in HTML_SUFFIXES:
+            continue
+        if base_url:
+            url = base_url.rstrip("/") + "/" + quote(path.relative_to(root).as_posix())
+        else:
+            url = path.as_uri()
+        try:
+            content = path.read_bytes()
+        except OSError as e:
+            logger.warning(f"Skipping unreadable file {path}: {str(e)}")
+            continue
+        yield {
+            "url": url,
+            "content": content,
+            "encoding": None,
+            "status_code": 200,
+            "content_type": "text/html",
+            "fetched_at": datetime.utcfromtimestamp(path.stat().st_mtime).isoformat(),
+        }
+
+
+def iter_source_pages(source: str, base_url: Optional[str] = None) -> Iterator[Dict]:
+    """Pages of a local HTML directory or of a WARC file (.warc / .warc.gz)"""
+    path = Path(source)
+    if path.is_dir():
+        return iter_directory_pages(source, base_url)
+    if path.name.endswith((".warc", ".warc.gz")):
+        return read_warc(source)
+    raise ValueError(f"Unsupported source {source}: expected a directory or a .warc/.warc.gz file")
+
+
+class BulkIngestor:
+    """Offline ingestion of local pages: clean in worker processes, embed in large batches
+    
+    Pages are cleaned by a process pool, at most `workers * 4` at a time,
+    and their chunks collected in input order. Deduplication and site
+    template learning run in the parent process. Full batches go through a
+    bounded queue to a separate embed stage, as in IngestionPipeline, so
+    pages keep being submitted to the workers while a batch is embedded.
+    """
+    
+    def __init__(
+        self,
+        embedding_service,
+        vector_store,
+        workers: Optional[int] = None,
+        batch_size: Optional[int] = None
+    ):
+        self.embedding_service = embedding_service
+        self.vector_store = vector_store
+        self.workers = workers or settings.bulk_ingest_workers or os.cpu_count() or 1
+        self.batch_size = batch_size or settings.bulk_embedding_batch_size
+        self.cleaner = ContentCleaner()
+        self.stats: Dict[str, int] = {"pages_fetched": 0, "pages_cleaned": 0, "chunks_indexed": 0}
+        self.batch: List[Dict] = []
+        self.batches: asyncio.Queue = asyncio.Queue(maxsize=settings.pipeline_max_pending_batches)
+    
+    async def _collect(self, url: str, future: asyncio.Future):
+        """Add a cleaned page's new chunks to the batch, queuing full batches"""
+        chunks, blocks = await future
+        if self.cleaner.templates is not None and blocks:
+            self.cleaner.templates.add(url, blocks)
+        chunks = self.cleaner.deduplicate(chunks)
+        self.stats["pages_cleaned"] += 1
+        self.batch.extend(chunks)
+        while len(self.batch) >= self.batch_size:
+            await self.batches.put(self.batch[:self.batch_size])
+            self.batch = self.batch[self.batch_size:]
+    
+    async def _clean_stage(self, pages: Iterable[Dict]):
+        """Submit pages to the worker processes and collect their chunks in input order"""
+        loop = asyncio.get_running_loop()
+        pending: Deque[Tuple[str, asyncio.Future]] = deque()
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=worker_context()) as pool:
+                for page in pages:
+                    self.stats["pages_fetched"] += 1
+                    template = self.cleaner.template_blocks(page["url"])
+                    pending.append((page["url"], loop.run_in_executor(pool, clean_page_in_worker, page, template)))
+                    if len(pending) >= self.workers * 4:
+                        await self._collect(*pending.popleft())
+                while pending:
+                    await self._collect(*pending.popleft())
+        finally:
+            for _, future in pending:
+                future.cancel()
+        
+        if self.batch:
+            await self.batches.put(self.batch)
+            self.batch = []
+        await self.batches.put(None)
+    
+    async def _embed_stage(self):
+        """Embed chunk batches and append them to the index"""
+        while True:
+            batch = await self.batches.get()
+            if batch is None:
+                break
+            try:
+                embeddings = await self.embedding_service.embed_texts([chunk["text"] for chunk in batch])
+            except Exception as e:
+                raise EmbeddingError(str(e)) from e
+            self.vector_store.add_chunks(batch, embeddings)
+            self.stats["chunks_indexed"] += len(batch)
+            logger.info(
+                f"Bulk ingest: {self.stats['pages_cleaned']} pages cleaned, "
+                f"{self.stats['chunks_indexed']} chunks indexed"
+            )
+    
+    async def run(self, pages: Iterable[Dict]) -> Dict[str, int]:
+        """Clean, embed and index every page, returns the pipeline stats
+        
+        If a stage fails the other is cancelled and the error is raised.
+        """
+        stages = [
+            asyncio.create_task(self._clean_stage(pages)),
+            asyncio.create_task(self._embed_stage()),
+        ]
+        try:
+            done, _ = await asyncio.wait(stages, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            for task in stages:
+                task.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+        
+        logger.info(
+            f"Bulk ingest finished: {self.stats['pages_fetched']} pages read, "
+            f"{self.stats['chunks_indexed']} chunks indexed"
+        )
+        return self.stats
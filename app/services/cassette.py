@@ -0,0 +1,127 @@
+import asyncio
+import base64
+import json
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import httpx
+from app.config import settings
+from app.utils.logger import logger
+
+
+class Cassette:
+    """File of recorded HTTP exchanges (one JSON object per line)
+    
+    Bodies are stored exactly as received on the wire (still compressed if
+    the server used a Content-Encoding), so a replayed run goes through the
+    same decoding as the recorded one.
+    """
+    
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._file = None
+    
+    def _key(self, method: str, url: str) -> Tuple[str, str]:
+        """Exchanges are matched on method and full URL"""
+        return method.upper(), url
+    
+    def append(self, request: httpx.Request, status_code: int, headers: httpx.Headers, body: bytes):
+        """Record one exchange"""
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps({
+            "method": request.method,
+            "url": str(request.url),
+            "status_code": status_code,
+            "headers": [[name, value] for name, value in headers.multi_items()],
+            "body": base64.b64encode(body).decode("ascii"),
+        }) + "\n")
+        self._file.flush()
+    
+    def load(self) -> Dict[Tuple[str, str], List[Dict]]:
+        """Load recorded exchanges grouped by (method, URL), in recording order"""
+        exchanges = defaultdict(list)
+        if not self.path.exists():
+            logger.warning(f"Cassette {self.path} does not exist, every request will miss")
+            return exchanges
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                exchange = json.loads(line)
+                exchanges[self._key(exchange["method"], exchange["url"])].append(exchange)
+        return exchanges
+    
+    def close(self):
+        """Close the recording file"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Transport that forwards requests to the network and records every exchange
+    
+    Responses are read in full before being returned, so streaming early
+    rejection (non-HTML, oversized bodies) still works but no longer saves
+    the download while recording.
+    """
+    
+    def __init__(self, transport: httpx.AsyncBaseTransport, cassette: Cassette):
+        self.transport = transport
+        self.cassette = cassette
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await self.transport.handle_async_request(request)
+        try:
+            # Raw transport stream: the body as sent, before any decoding
+            body = b"".join([chunk async for chunk in response.stream])
+        finally:
+            await response.aclose()
+        self.cassette.append(request, response.status_code, response.headers, body)
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            content=body,
+            extensions=response.extensions,
+        )
+    
+    async def aclose(self):
+        self.cassette.close()
+        await self.transport.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Transport that serves requests from a cassette, without any network access
+    
+    Repeated requests for a URL get its recorded responses in order, then the
+    last one again. Unrecorded requests get a 404 so they fail fast instead of
+    being retried. `latency` seconds are added to each response to simulate
+    the network.
+    """
+    
+    def __init__(self, cassette: Cassette, latency: Optional[float] = None):
+        self.cassette = cassette
+        self.latency = settings.http_cassette_latency if latency is None else latency
+        self.exchanges = cassette.load()
+        self.served: Dict[Tuple[str, str], int] = defaultdict(int)
+        logger.info(f"Replaying {sum(len(v) for v in self.exchanges.values())} exchanges from {cassette.path}")
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        
+        key = self.cassette._key(request.method, str(request.url))
+        recorded = self.exchanges.get(key)
+        if not recorded:
+            logger.warning(f"Cassette miss: {request.method} {request.url}")
+            return httpx.Response(404, headers={"x-cassette": "miss"}, content=b"")
+        
+        exchange = recorded[min(self.served[key], len(recorded) - 1)]
+        self.served[key] += 1
+        return httpx.Response(
+            status_code=exchange["status_code"],
+            headers=exchange["headers"],
+            content=base64.b64decode(exchange["body"]),
+        )
@@ -0,0 +1,132 @@
+import base64
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional
+from app.config import settings
+from app.utils.logger import logger
+from app.utils.urls import canonicalize_url
+
+
+class CrawlCheckpoint:
+    """Append-only journal of a job's crawl progress, used to resume after a restart
+    
+    Each line is one event: a URL queued in the frontier, a URL whose fetch
+    finished without producing a page, a fetched page, or the end of sitemap
+    discovery. Events are written in crawl order and a page is journaled after
+    its outgoing links, so any prefix of the file (e.g. after a crash in the
+    middle of a write) replays to a consistent state.
+    """
+    
+    def __init__(self, job_id: str, checkpoint_dir: Optional[str] = None):
+        self.path = Path(checkpoint_dir or Path(settings.data_dir) / "checkpoints") / f"{job_id}.jsonl"
+        self.flush_interval = max(1, settings.crawl_checkpoint_interval)
+        self._file = None
+        self._unflushed_pages = 0
+    
+    def load(self) -> Optional[Dict]:
+        """Replay the journal, returns None if there is nothing to resume
+        
+        Returns the fetched pages, the URLs already visited and the URLs
+        still queued as (url, depth, score, group) (including fetches that
+        were in flight when the process stopped), in crawl order.
+        """
+        if not self.path.exists():
+            return None
+        
+        pages = []
+        queued = []
+        visited = set()
+        discovered = False
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn last line from an interrupted write
+                    break
+                kind = event.get("event")
+                if kind == "queued":
+                    queued.append((event["url"], event["depth"], event["key"], event.get("score", 0.0), event.get("group", "")))
+                elif kind == "done":
+                    visited.add(event["key"])
+                elif kind == "page":
+                    page = event["page"]
+                    if page.get("content") is not None:
+                        page["content"] = base64.b64decode(page["content"])
+                    pages.append(page)
+                    visited.add(event["key"])
+                    visited.add(canonicalize_url(event["page"]["url"]))
+                elif kind == "discovered":
+                    discovered = True
+        
+        # Queued URLs that never finished, including fetches that were in
+        # flight when the process stopped, go back to the frontier
+        frontier = []
+        pending = set()
+        for url, depth, key, score, group in queued:
+            if key not in visited and key not in pending:
+                pending.add(key)
+                frontier.append((url, depth, score, group))
+        
+        return {
+            "pages": pages,
+            "frontier": frontier,
+            "visited": visited,
+            "discovered": discovered,
+        }
+    
+    def _write(self, event: Dict):
+        """Append one event to the journal"""
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+    
+    def record_queued(self, url: str, depth: int, key: str, score: float = 0.0, group: str = ""):
+        """Journal a URL pushed to the frontier (with its best-first score and budget group)"""
+        self._write({"event": "queued", "url": url, "depth": depth, "key": key, "score": score, "group": group})
+    
+    def record_done(self, key: str):
+        """Journal a URL whose fetch finished without keeping a page"""
+        self._write({"event": "done", "key": key})
+    
+    def record_page(self, page: Dict, key: str):
+        """Journal a fetched page; flushes every `flush_interval` pages"""
+        if isinstance(page.get("content"), bytes):
+            # Raw body, stored as fetched so a resumed crawl decodes it the same way
+            page = {**page, "content": base64.b64encode(page["content"]).decode("ascii")}
+        self._write({"event": "page", "key": key, "page": page})
+        self._unflushed_pages += 1
+        if self._unflushed_pages >= self.flush_interval:
+            self.flush()
+    
+    def record_discovered(self):
+        """Journal the end of sitemap discovery so it is not repeated on resume"""
+        self._write({"event": "discovered"})
+        self.flush()
+    
+    def flush(self):
+        """Push journaled events to disk"""
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._unflushed_pages = 0
+    
+    def close(self):
+        """Flush and close the journal, keeping it for a later resume"""
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+    
+    def clear(self):
+        """Delete the journal once the job has finished"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+        logger.info(f"Removed crawl checkpoint {self.path}")
@@ -0,0 +1,201 @@
+import math
+import re
+from functools import lru_cache
+from typing import List, Optional, Tuple
+from app.config import settings
+from app.services.embedder import LOCAL_EMBEDDING_MODEL
+from app.utils.logger import logger
+
+
+# Input limit, in tokens, of the embedding models the service supports
+MODEL_TOKEN_LIMITS = {
+    "text-embedding-3-small": 8191,
+    "text-embedding-3-large": 8191,
+    "text-embedding-ada-002": 8191,
+    "embedding-001": 2048,
+    "text-embedding-004": 2048,
+    LOCAL_EMBEDDING_MODEL: 256,
+}
+
+# Tokens the model's tokenizer adds around every input ([CLS] and [SEP] for BERT-style models)
+MODEL_SPECIAL_TOKENS = {
+    LOCAL_EMBEDDING_MODEL: 2,
+}
+
+# Share of the model's limit used when token counts are only estimated
+ESTIMATE_MARGIN = 0.8
+
+# End of a sentence: terminal punctuation (and closing quotes/brackets) followed by whitespace, or a line break
+SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*\s+|\n+")
+WORD = re.compile(r"\S+\s*")
+# Token estimate without a tokenizer: words and punctuation marks
+ROUGH_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+def active_embedding_model() -> str:
+    """Name of the model the configured embedding provider uses"""
+    if settings.embedding_provider == "local":
+        return LOCAL_EMBEDDING_MODEL
+    return settings.embedding_model
+
+
+def sentence_spans(text: str) -> List[Tuple[int, int]]:
+    """(start, end) offsets of the sentences of a text, found in one scan"""
+    spans = []
+    start = 0
+    for match in SENTENCE_END.finditer(text):
+        spans.append((start, match.end()))
+        start = match.end()
+    if start < len(text):
+        spans.append((start, len(text)))
+    return spans
+
+
+class TokenCounter:
+    """Count tokens with the embedding model's tokenizer, or estimate them
+    
+    OpenAI models are counted exactly when the optional tiktoken package is
+    installed, and the local model with its own tokenizer (the one
+    SentenceTransformer loads, from the transformers package it depends
+    on). Otherwise the count is the larger of the number of words and
+    punctuation marks and a quarter of the characters, which errs on the
+    high side for English text but not always for other languages or code.
+    """
+    
+    def __init__(self, model: Optional[str] = None):
+        self.model = model or active_embedding_model()
+        self.encoding = None
+        self.tokenizer = None
+        if self.model == LOCAL_EMBEDDING_MODEL:
+            self._load_tokenizer()
+            return
+        try:
+            import tiktoken
+            self.encoding = tiktoken.encoding_for_model(self.model)
+        except ImportError:
+            pass
+        except Exception as e:
+            logger.info(f"No tiktoken encoding for {self.model} ({str(e)}), estimating token counts")
+    
+    def _load_tokenizer(self):
+        """Load the local model's tokenizer alone (no weights), if transformers is installed"""
+        try:
+            from transformers import AutoTokenizer
+            self.tokenizer = AutoTokenizer.from_pretrained(f"sentence-transformers/{self.model}")
+        except ImportError:
+            pass
+        except Exception as e:
+            logger.info(f"Could not load the tokenizer of {self.model} ({str(e)}), estimating token counts")
+    
+    @property
+    def exact(self) -> bool:
+        """Whether counts come from the model's tokenizer rather than an estimate"""
+        return self.encoding is not None or self.tokenizer is not None
+    
+    def count(self, text: str) -> int:
+        """Number of tokens in a text, without the special tokens added around an input"""
+        if self.encoding is not None:
+            return len(self.encoding.encode_ordinary(text))
+        if self.tokenizer is not None:
+            return len(self.tokenizer.encode(text, add_special_tokens=False, verbose=False))
+        return max(len(ROUGH_TOKEN.findall(text)), math.ceil(len(text) / 4))
+
+
+@lru_cache(maxsize=None)
+def token_counter(model: str) -> TokenCounter:
+    """Shared counter per model, so the tokenizer is loaded once per process rather than per cleaner"""
+    return TokenCounter(model)
+
+
+class SentenceChunker:
+    """Pack whole sentences into chunks that fit the embedding model
+    
+    Sentence boundaries are found once, each sentence is counted once, and
+    sentences are then packed greedily up to `max_tokens` (by default
+    `chunk_max_tokens`, lowered to the model's budget: its input limit less
+    the special tokens, and only ESTIMATE_MARGIN of that when counts are
+    estimated). Each chunk starts with the last sentences of the previous
+    one, up to `overlap_tokens`. A sentence longer than the budget is split
+    between words. Packing walks the sentences with two pointers, so
+    chunking is linear in the length of the page.
+    """
+    
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        overlap_tokens: Optional[int] = None,
+        counter: Optional[TokenCounter] = None
+    ):
+        self.counter = counter or token_counter(active_embedding_model())
+        limit = self.model_budget(self.counter)
+        self.max_tokens = max(1, min(max_tokens or settings.chunk_max_tokens, limit))
+        overlap = settings.chunk_overlap_tokens if overlap_tokens is None else overlap_tokens
+        self.overlap_tokens = min(overlap, self.max_tokens // 2)
+    
+    @staticmethod
+    def model_budget(counter: TokenCounter) -> int:
+        """Most tokens of text a chunk may hold for the counter's model"""
+        limit = MODEL_TOKEN_LIMITS.get(counter.model)
+        if limit is None:
+            return settings.chunk_max_tokens
+        limit -= MODEL_SPECIAL_TOKENS.get(counter.model, 0)
+        if not counter.exact:
+            limit = int(limit * ESTIMATE_MARGIN)
+        return limit
+    
+    def _pieces(self, text: str) -> Tuple[List[Tuple[int, int]], List[int]]:
+        """Sentence spans and their token counts, with oversized sentences split between words"""
+        spans: List[Tuple[int, int]] = []
+        counts: List[int] = []
+        for start, end in sentence_spans(text):
+            tokens = self.counter.count(text[start:end])
+            if tokens <= self.max_tokens:
+                spans.append((start, end))
+                counts.append(tokens)
+                continue
+            
+            piece_start, piece_tokens = start, 0
+            for word in WORD.finditer(text, start, end):
+                word_tokens = self.counter.count(word.group())
+                if piece_tokens and piece_tokens + word_tokens > self.max_tokens:
+                    spans.append((piece_start, word.start()))
+                    counts.append(piece_tokens)
+                    piece_start, piece_tokens = word.start(), 0
+                piece_tokens += word_tokens
+            spans.append((piece_start, end))
+            counts.append(piece_tokens)
+        return spans, counts
+    
+    def chunk(self, text: str) -> List[str]:
+        """Split a text into overlapping chunks of at most `max_tokens` tokens"""
+        spans, counts = self._pieces(text)
+        # prefix[i] = tokens in the first i pieces
+        prefix = [0]
+        for tokens in counts:
+            prefix.append(prefix[-1] + tokens)
+        
+        chunks = []
+        first = 0
+        while first < len(spans):
+            last = first
+            while last < len(spans) and prefix[last + 1] - prefix[first] <= self.max_tokens:
+                last += 1
+            last = max(last, first + 1)
+            chunk = text[spans[first][0]:spans[last - 1][1]].strip()
+            if chunk:
+                chunks.append(chunk)
+            if last == len(spans):
+                break
+            
+            # Back up over the trailing sentences that fit in the overlap,
+            # keeping room for at least the next sentence
+            next_first = last
+            while (
+                next_first - 1 > first
+                and prefix[last] - prefix[next_first - 1] <= self.overlap_tokens
+                and prefix[last + 1] - prefix[next_first - 1] <= self.max_tokens
+            ):
+                next_first -= 1
+            first = next_first
+        
+        return chunks
@@ -0,0 +1,130 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+from app.config import settings
+from app.services.cleaner import ContentCleaner
+from app.services.html_parser import link_info, parse_page
+from app.utils.logger import logger
+
+
+# Cleaner of the current worker process, created on first use
+_worker_cleaner: Optional[ContentCleaner] = None
+
+
+def worker_context():
+    """Start method for worker processes: never fork, the parent may already run torch or tokenizers threads"""
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def clean_page_in_worker(page: Dict, template_blocks: FrozenSet[int] = frozenset()) -> Tuple[List[Dict], List[int]]:
+    """Clean and chunk one page in a worker process (no deduplication)
+    
+    Returns the chunks and the page's block fingerprints (see ContentCleaner.clean_page_blocks).
+    """
+    global _worker_cleaner
+    if _worker_cleaner is None:
+        _worker_cleaner = ContentCleaner()
+    try:
+        return _worker_cleaner.clean_page_blocks(page, template_blocks=template_blocks)
+    except Exception as e:
+        logger.error(f"Error processing page {page.get('url', 'unknown')}: {str(e)}")
+        return [], []
+
+
+def process_page_in_worker(
+    page: Dict,
+    template_blocks: FrozenSet[int] = frozenset(),
+    links: bool = True,
+    profile: bool = False
+) -> Dict:
+    """Parse a crawled page once in a worker process, for both the crawler and the cleaner
+    
+    Returns the page's `link_info` with its "chunks" and "blocks" added.
+    """
+    global _worker_cleaner
+    if _worker_cleaner is None:
+        _worker_cleaner = ContentCleaner()
+    soup = parse_page(page)
+    # Links first: cleaning drops the navigation from the tree
+    info = link_info(soup, page["url"], links=links, profile=profile)
+    try:
+        info["chunks"], info["blocks"] = _worker_cleaner.clean_page_blocks(page, soup, template_blocks)
+    except Exception as e:
+        logger.error(f"Error processing page {page.get('url', 'unknown')}: {str(e)}")
+        info["chunks"], info["blocks"] = [], []
+    return info
+
+
+class CleaningPool:
+    """Process pool cleaning pages off the event loop
+    
+    Parsing, boilerplate removal and chunking are CPU-bound: run inline they
+    block the event loop, and every API request with it, while a job is
+    ingesting. The pool is shared by all jobs of the process and started on
+    first use. Deduplication stays with the caller, since it needs the
+    job's state, and so does template learning: callers pass the template
+    blocks of the page's site and get back its block fingerprints. A worker
+    that dies breaks the executor, so it is replaced and only the pages in
+    flight at that moment fail.
+    """
+    
+    def __init__(self, workers: Optional[int] = None):
+        self._workers = workers
+        self.executor: Optional[ProcessPoolExecutor] = None
+    
+    @property
+    def workers(self) -> int:
+        """Number of worker processes (0 = clean on the calling thread)"""
+        return settings.clean_pool_workers if self._workers is None else self._workers
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Get the executor, creating it on first use or after a crash"""
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=worker_context())
+            logger.info(f"Cleaning pool started with {self.workers} processes")
+        return self.executor
+    
+    async def clean(self, page: Dict, template_blocks: FrozenSet[int] = frozenset()) -> Tuple[List[Dict], List[int]]:
+        """Clean and chunk one page in a worker process, returns its chunks and block fingerprints
+        
+        Cleaning errors give empty lists; raises BrokenProcessPool if the
+        worker died, in which case the next call starts a new executor.
+        """
+        return await self._run(clean_page_in_worker, page, template_blocks)
+    
+    async def process(
+        self,
+        page: Dict,
+        template_blocks: FrozenSet[int] = frozenset(),
+        links: bool = True,
+        profile: bool = False
+    ) -> Dict:
+        """Extract a crawled page's links and clean it in one worker call (see process_page_in_worker)"""
+        return await self._run(process_page_in_worker, page, template_blocks, links, profile)
+    
+    async def _run(self, function: Callable, *args):
+        """Run a function in a worker process, replacing the executor if the worker died"""
+        if self.workers <= 0:
+            return function(*args)
+        executor = self._get_executor()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+        except BrokenProcessPool:
+            if self.executor is executor:
+                logger.warning("A cleaning process died, restarting the pool")
+                self.executor = None
+                executor.shutdown(wait=False, cancel_futures=True)
+            raise
+    
+    def close(self):
+        """Stop the worker processes (application shutdown)"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+# Global cleaning pool shared by every job in the process
+cleaning_pool = CleaningPool()
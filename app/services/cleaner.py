@@ -1,73 +1,147 @@
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, CData, NavigableString
+from itertools import groupby
 import re
-from typing import List, Dict
+from typing import FrozenSet, List, Dict, Optional, Tuple
 import hashlib
 from app.config import settings
+from app.services.chunker import SentenceChunker
+from app.services.html_parser import parse_page
+from app.services.near_duplicates import NearDuplicateIndex
+from app.services.templates import BLOCK_TAGS, SiteTemplates, block_fingerprint
 from app.utils.logger import logger
 
 
+# Boilerplate: elements dropped along with everything inside them
+DROP_TAGS = frozenset({"script", "style", "noscript", "iframe", "nav", "footer", "header", "aside"})
+# Also dropped: elements whose class or id contains one of these
+DROP_ATTRIBUTE_PATTERN = re.compile("nav|menu|footer|sidebar")
+
+# Main content containers, by priority: when one rule matches, the text of
+# all its matches is the page content (otherwise the body's text is used)
+MAIN_CONTENT_RULES = [
+    ("tag", "main"), ("tag", "article"), ("role", "main"),
+    ("class", "content"), ("class", "post"), ("class", "entry"),
+    ("id", "content"), ("id", "main"), ("id", "article"),
+]
+MAIN_CONTENT_PRIORITY = {rule: priority for priority, rule in enumerate(MAIN_CONTENT_RULES)}
+
+# String types get_text() returns (no comments, doctypes, script bodies...)
+TEXT_TYPES = frozenset({NavigableString, CData})
+
+# Stack marker for the end of a block-level element
+BLOCK_END = object()
+
+
 class ContentCleaner:
     """Service for cleaning HTML and chunking text"""
     
     def __init__(self):
         self.processed_content: List[Dict] = []
+        self.pages_seen = 0
+        self.seen_hashes = set()
+        self.similar_pages = NearDuplicateIndex() if settings.near_dup_enabled else None
+        self.similar_chunks = NearDuplicateIndex() if settings.near_dup_enabled else None
+        self.templates = SiteTemplates() if settings.template_detection_enabled else None
+        self.chunker = SentenceChunker() if settings.chunking_strategy == "sentences" else None
     
-    def _remove_boilerplate(self, soup: BeautifulSoup) -> BeautifulSoup:
-        """Remove navigation, footer, and other boilerplate"""
-        # Remove script and style elements
-        for element in soup(["script", "style", "noscript", "iframe"]):
-            element.decompose()
-        
-        # Remove common boilerplate classes/ids
-        for selector in [
-            "nav", "footer", "header", "aside",
-            "[class*='nav']", "[class*='menu']",
-            "[class*='footer']", "[class*='sidebar']",
-            "[id*='nav']", "[id*='menu']",
-            "[id*='footer']", "[id*='sidebar']"
-        ]:
-            for element in soup.select(selector):
-                element.decompose()
-        
-        return soup
+    def _extract_content(
+        self,
+        soup: BeautifulSoup,
+        template_blocks: FrozenSet[int] = frozenset()
+    ) -> Tuple[Optional[str], str, List[int]]:
+        """Extract the title, main content text and text block fingerprints in a single walk of the tree
+        
+        Boilerplate subtrees (DROP_TAGS, or a class/id matching
+        DROP_ATTRIBUTE_PATTERN) are skipped rather than removed, so the tree
+        is left untouched. Kept strings are collected in document order and
+        each element of interest records the span of strings it contains.
+        Block-level elements split the strings into text blocks; blocks
+        whose fingerprint is in `template_blocks` are left out of the text.
+        The title is the <title> text, else the first <h1>'s, else None.
+        """
+        texts: List[str] = []
+        spans: Dict[int, List[List[int]]] = {}
+        title: Optional[List[int]] = None
+        h1: Optional[List[int]] = None
+        body: Optional[List[int]] = None
+        boundaries = [0]
+        
+        stack = [soup]
+        while stack:
+            node = stack.pop()
+            if node is BLOCK_END:
+                boundaries.append(len(texts))
+                continue
+            if type(node) is list:
+                # Closing marker: the element's strings end here
+                node[1] = len(texts)
+                continue
+            if isinstance(node, NavigableString):
+                if type(node) in TEXT_TYPES:
+                    texts.append(node)
+                continue
+            
+            name = node.name
+            if name in DROP_TAGS:
+                continue
+            classes = node.get("class") or ()
+            if isinstance(classes, str):
+                classes = classes.split()
+            element_id = node.get("id")
+            if (
+                (classes and DROP_ATTRIBUTE_PATTERN.search(" ".join(classes)))
+                or (element_id and DROP_ATTRIBUTE_PATTERN.search(element_id))
+            ):
+                continue
+            
+            span = None
+            keys = [("tag", name), ("role", node.get("role")), ("id", element_id)]
+            keys += [("class", token) for token in classes]
+            for priority in {MAIN_CONTENT_PRIORITY.get(key) for key in keys} - {None}:
+                span = span or [len(texts), len(texts)]
+                spans.setdefault(priority, []).append(span)
+            if name == "title" and title is None:
+                title = span = span or [len(texts), len(texts)]
+            elif name == "h1" and h1 is None:
+                h1 = span = span or [len(texts), len(texts)]
+            elif name == "body" and body is None:
+                body = span = span or [len(texts), len(texts)]
+            
+            if span is not None:
+                stack.append(span)
+            if name in BLOCK_TAGS:
+                boundaries.append(len(texts))
+                stack.append(BLOCK_END)
+            stack.extend(reversed(node.contents))
+        
+        heading = title or h1
+        title_text = "".join(texts[heading[0]:heading[1]]).strip() if heading else None
+        
+        blocks = []
+        boundaries.append(len(texts))
+        for start, end in zip(boundaries, boundaries[1:]):
+            if start == end:
+                continue
+            fingerprint = block_fingerprint("".join(texts[start:end]))
+            if fingerprint is None:
+                continue
+            blocks.append(fingerprint)
+            if fingerprint in template_blocks:
+                texts[start:end] = [""] * (end - start)
+        
+        if spans:
+            matches = spans[min(spans)]
+            return title_text, " ".join("".join(texts[start:end]) for start, end in matches), blocks
+        if body:
+            return title_text, "".join(texts[body[0]:body[1]]), blocks
+        return title_text, "".join(texts), blocks
     
-    def _extract_title(self, soup: BeautifulSoup, url: str) -> str:
-        """Extract page title"""
-        title_tag = soup.find("title")
-        if title_tag:
-            return title_tag.get_text().strip()
-        
-        # Try h1 as fallback
-        h1 = soup.find("h1")
-        if h1:
-            return h1.get_text().strip()
-        
-        # Use URL as last resort
+    def _title_from_url(self, url: str) -> str:
+        """Title of a page without <title> or <h1>: the last path segment or the host"""
         from urllib.parse import urlparse
         parsed = urlparse(url)
         return parsed.path.split("/")[-1] or parsed.netloc
     
-    def _extract_main_content(self, soup: BeautifulSoup) -> str:
-        """Extract main content using readability-style heuristics"""
-        # Try common content selectors
-        content_selectors = [
-            "main", "article", "[role='main']",
-            ".content", ".post", ".entry",
-            "#content", "#main", "#article"
-        ]
-        
-        for selector in content_selectors:
-            elements = soup.select(selector)
-            if elements:
-                return " ".join([elem.get_text() for elem in elements])
-        
-        # Fallback: use body
-        body = soup.find("body")
-        if body:
-            return body.get_text()
-        
-        return soup.get_text()
-    
     def _clean_text(self, text: str) -> str:
         """Clean and normalize text"""
         # Collapse whitespace
@@ -116,79 +190,164 @@ class ContentCleaner:
         content = f"{url}:{chunk_index}"
         return hashlib.md5(content.encode()).hexdigest()
     
-    def _deduplicate_pages(self, pages: List[Dict]) -> List[Dict]:
-        """Remove near-duplicate pages based on content hash"""
-        seen_hashes = set()
-        unique_pages = []
+    def _deduplicate_pages(self, chunks: List[Dict]) -> List[Dict]:
+        """Remove duplicate and near-duplicate chunks, and the chunks of near-duplicate pages
         
-        for page in pages:
-            # Create content hash (first 1000 chars)
-            content_preview = page.get("text", "")[:1000]
-            content_hash = hashlib.md5(content_preview.encode()).hexdigest()
+        A page whose text is nearly identical to an earlier page's (print
+        views, paginated or locale copies) is skipped entirely; then each
+        chunk is checked for an exact match (MD5 of its first 1000 chars)
+        and for a near-duplicate among earlier chunks. Hashes and MinHash
+        indexes are kept across calls, so chunks can be deduplicated as they
+        are produced.
+        """
+        unique_chunks = []
+        
+        for url, page_chunks in groupby(chunks, key=lambda chunk: chunk.get("url")):
+            page_chunks = list(page_chunks)
+            if self.similar_pages is not None:
+                page_text = " ".join(chunk.get("text", "") for chunk in page_chunks)
+                similar = self.similar_pages.add(url, page_text)
+                if similar is not None:
+                    logger.info(f"Skipping near-duplicate page: {url} (similar to {similar})")
+                    continue
+            
+            for chunk in page_chunks:
+                # Create content hash (first 1000 chars)
+                content_preview = chunk.get("text", "")[:1000]
+                content_hash = hashlib.md5(content_preview.encode()).hexdigest()
+                
+                if content_hash in self.seen_hashes:
+                    logger.info(f"Skipping duplicate chunk: {url}")
+                    continue
+                self.seen_hashes.add(content_hash)
+                
+                if self.similar_chunks is not None:
+                    similar = self.similar_chunks.add(chunk.get("chunkid") or content_hash, chunk.get("text", ""))
+                    if similar is not None:
+                        logger.info(f"Skipping near-duplicate chunk: {url}")
+                        continue
+                unique_chunks.append(chunk)
+        
+        return unique_chunks
+    
+    def deduplicate(self, chunks: List[Dict], known: Optional[List[Dict]] = None) -> List[Dict]:
+        """Drop chunks that duplicate an earlier one (see `_deduplicate_pages`)
+        
+        `known` chunks, e.g. the ones an index already holds, count as
+        earlier chunks without being filtered themselves.
+        """
+        if known:
+            self._deduplicate_pages(known)
+        return self._deduplicate_pages(chunks)
+    
+    def clean_page(self, page: Dict, soup: Optional[BeautifulSoup] = None) -> List[Dict]:
+        """Clean one page and chunk it into passages
+        
+        `soup` is the tree already parsed by the fetcher, if any; it is
+        not modified. Pages pushed as plain "text" skip HTML cleaning,
+        and a "title" given with the page wins over the extracted one.
+        """
+        return self.clean_page_blocks(page, soup)[0]
+    
+    def clean_page_blocks(
+        self,
+        page: Dict,
+        soup: Optional[BeautifulSoup] = None,
+        template_blocks: FrozenSet[int] = frozenset()
+    ) -> Tuple[List[Dict], List[int]]:
+        """Clean one page without its site's `template_blocks`, returns its chunks and block fingerprints"""
+        url = page["url"]
+        fetched_at = page["fetched_at"]
+        blocks: List[int] = []
+        
+        if soup is None and page.get("text") is not None and page.get("html") is None and page.get("content") is None:
+            title = page.get("title") or url
+            text = self._clean_text(page["text"])
+        else:
+            if soup is None:
+                soup = parse_page(page)
+            
+            # One pass skips boilerplate and collects the title and main content
+            extracted_title, raw_text, blocks = self._extract_content(soup, template_blocks)
+            if extracted_title is None:
+                extracted_title = self._title_from_url(url)
+            title = page.get("title") or extracted_title
+            text = self._clean_text(raw_text)
+        
+        # Skip if too short (likely not useful content)
+        if len(text) < 100:
+            logger.warning(f"Skipping page with too little content: {url}")
+            return [], blocks
+        
+        # Chunk the text
+        if self.chunker:
+            chunks = self.chunker.chunk(text)
+        else:
+            chunks = self._chunk_text(text, settings.chunk_size, settings.chunk_overlap)
+        
+        # Create chunk documents
+        chunk_docs = []
+        for idx, chunk_text in enumerate(chunks):
+            chunk_id = self._generate_chunk_id(url, idx)
             
-            if content_hash not in seen_hashes:
-                seen_hashes.add(content_hash)
-                unique_pages.append(page)
-            else:
-                logger.info(f"Skipping duplicate page: {page.get('url')}")
+            chunk_doc = {
+                "chunkid": chunk_id,
+                "url": url,
+                "title": title,
+                "text": chunk_text,
+                "chunk_index": idx,
+                "total_chunks": len(chunks),
+                "fetched_at": fetched_at,
+            }
+            
+            chunk_docs.append(chunk_doc)
+        
+        logger.info(f"Processed {url}: {len(chunks)} chunks")
+        return chunk_docs, blocks
+    
+    def template_blocks(self, url: str) -> FrozenSet[int]:
+        """Template blocks learned so far for a URL's site, to leave out of its text"""
+        return self.templates.blocks_for(url) if self.templates else frozenset()
+    
+    def add_page(self, page: Dict, soup: Optional[BeautifulSoup] = None) -> List[Dict]:
+        """Clean a page as soon as it is fetched, returns its new (non-duplicate) chunks"""
+        try:
+            chunks, blocks = self.clean_page_blocks(page, soup, self.template_blocks(page["url"]))
+        except Exception as e:
+            logger.error(f"Error processing page {page.get('url', 'unknown')}: {str(e)}")
+            return []
+        return self.add_cleaned(chunks, page["url"], blocks)
+    
+    def add_cleaned(self, chunks: List[Dict], url: Optional[str] = None, blocks: Optional[List[int]] = None) -> List[Dict]:
+        """Add the chunks of a page cleaned elsewhere (e.g. in a worker process), returns the new ones
         
-        return unique_pages
+        `blocks` are the page's block fingerprints, counted towards its site's
+        template. The chunks are not kept, so a streaming job's memory does
+        not grow with its size; `clean_and_chunk` collects them itself.
+        """
+        if self.templates is not None and url and blocks:
+            self.templates.add(url, blocks)
+        chunks = self._deduplicate_pages(chunks)
+        self.pages_seen += 1
+        return chunks
+    
+    def finalize(self) -> List[Dict]:
+        """Return all chunks collected by `clean_and_chunk`"""
+        logger.info(f"Created {len(self.processed_content)} chunks from {self.pages_seen} pages")
+        return self.processed_content
     
     def clean_and_chunk(self, pages: List[Dict]) -> List[Dict]:
         """Clean HTML pages and chunk into passages"""
         self.processed_content = []
+        self.pages_seen = 0
+        self.seen_hashes = set()
+        if self.templates is not None:
+            self.templates.clear()
+        for index in (self.similar_pages, self.similar_chunks):
+            if index is not None:
+                index.clear()
         
         for page in pages:
-            try:
-                html = page["html"]
-                url = page["url"]
-                fetched_at = page["fetched_at"]
-                
-                soup = BeautifulSoup(html, "html.parser")
-                
-                # Remove boilerplate
-                soup = self._remove_boilerplate(soup)
-                
-                # Extract title
-                title = self._extract_title(soup, url)
-                
-                # Extract main content
-                raw_text = self._extract_main_content(soup)
-                text = self._clean_text(raw_text)
-                
-                # Skip if too short (likely not useful content)
-                if len(text) < 100:
-                    logger.warning(f"Skipping page with too little content: {url}")
-                    continue
-                
-                # Chunk the text
-                chunks = self._chunk_text(text, settings.chunk_size, settings.chunk_overlap)
-                
-                # Create chunk documents
-                for idx, chunk_text in enumerate(chunks):
-                    chunk_id = self._generate_chunk_id(url, idx)
-                    
-                    chunk_doc = {
-                        "chunkid": chunk_id,
-                        "url": url,
-                        "title": title,
-                        "text": chunk_text,
-                        "chunk_index": idx,
-                        "total_chunks": len(chunks),
-                        "fetched_at": fetched_at,
-                    }
-                    
-                    self.processed_content.append(chunk_doc)
-                
-                logger.info(f"Processed {url}: {len(chunks)} chunks")
-                
-            except Exception as e:
-                logger.error(f"Error processing page {page.get('url', 'unknown')}: {str(e)}")
-                continue
-        
-        # Deduplicate
-        self.processed_content = self._deduplicate_pages(self.processed_content)
+            self.processed_content.extend(self.add_page(page))
         
-        logger.info(f"Created {len(self.processed_content)} chunks from {len(pages)} pages")
-        return self.processed_content
-
+        return self.finalize()
@@ -0,0 +1,197 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+import httpx
+from app.config import settings
+from app.utils.logger import logger
+
+
+class HostUnavailable(Exception):
+    """Raised when a host's circuit breaker is open"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP-date) into seconds"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class SlotTicket:
+    """Handle for one request slot; mark `failed` for bad responses (429, 5xx)"""
+    
+    def __init__(self):
+        self.failed = False
+
+
+class HostState:
+    """Politeness, adaptive concurrency and circuit-breaker state for one host"""
+    
+    def __init__(self, delay: float, max_in_flight: int):
+        self.delay = delay
+        self.max_in_flight = max_in_flight
+        self.limit = 1.0  # AIMD concurrency window, between 1 and max_in_flight
+        self.in_flight = 0
+        self.capacity = asyncio.Condition()
+        self.next_slot = 0.0  # monotonic time of the next allowed request start
+        self.blocked_until = 0.0  # Retry-After: no request starts before this time
+        self.consecutive_failures = 0
+        self.open_until = 0.0  # circuit is open (host parked) until this time
+        self.half_open = False
+
+
+class CrawlScheduler:
+    """Process-wide per-host politeness scheduler shared by all crawl jobs
+    
+    Requests to the same host are spaced by `delay` seconds, while requests to
+    different hosts run in parallel. Per host, the number of requests in flight
+    follows AIMD: it grows by about one per window of fast successful requests
+    (up to `max_per_host`) and halves on errors or slow responses. A host that
+    keeps failing is parked by a circuit breaker while other hosts continue.
+    """
+    
+    def __init__(self, delay: Optional[float] = None, max_per_host: Optional[int] = None):
+        self.delay = settings.fetch_rate_limit if delay is None else delay
+        self.max_per_host = max_per_host or settings.fetch_max_per_host
+        self.hosts: Dict[str, HostState] = {}
+    
+    def _host_key(self, url: str) -> str:
+        """Get the politeness key (host) for a URL"""
+        return urlparse(url).netloc.lower()
+    
+    def _get_host(self, host: str) -> HostState:
+        """Get or create the state for a host"""
+        state = self.hosts.get(host)
+        if state is None:
+            state = HostState(self.delay, self.max_per_host)
+            self.hosts[host] = state
+        return state
+    
+    def set_host_delay(self, url: str, delay: float):
+        """Raise the politeness delay for a host (e.g. from robots.txt Crawl-delay)"""
+        state = self._get_host(self._host_key(url))
+        state.delay = max(self.delay, delay)
+    
+    def defer_host(self, url: str, seconds: float):
+        """Hold every request to a host for `seconds` (e.g. from Retry-After)"""
+        state = self._get_host(self._host_key(url))
+        state.blocked_until = max(state.blocked_until, time.monotonic() + seconds)
+        logger.info(f"Deferring {self._host_key(url)} for {seconds:.1f}s")
+    
+    def host_window(self, url: str) -> int:
+        """Requests the URL's host takes at once: its AIMD window, a single trial after a cooldown, or none while parked"""
+        state = self.hosts.get(self._host_key(url))
+        if state is None:
+            return 1
+        if state.open_until:
+            if state.half_open or time.monotonic() < state.open_until:
+                return 0
+            return 1
+        return int(state.limit)
+    
+    def ready_in(self, url: str) -> float:
+        """Seconds until the URL's host may start another request: cooldown, Retry-After or politeness delay"""
+        state = self.hosts.get(self._host_key(url))
+        if state is None:
+            return 0.0
+        until = max(state.next_slot, state.blocked_until)
+        if state.open_until and not state.half_open:
+            until = max(until, state.open_until)
+        return max(0.0, until - time.monotonic())
+    
+    def _check_circuit(self, host: str, state: HostState):
+        """Fail fast while a host is parked; let one trial request through after cooldown"""
+        if not state.open_until:
+            return
+        if time.monotonic() < state.open_until or state.half_open:
+            raise HostUnavailable(f"Circuit open for {host}")
+        state.half_open = True
+    
+    def _on_success(self, state: HostState, latency: float):
+        """Additive increase on fast responses, decrease on slow ones"""
+        state.consecutive_failures = 0
+        state.open_until = 0.0
+        state.half_open = False
+        if latency > settings.fetch_slow_latency:
+            state.limit = max(1.0, state.limit / 2)
+        else:
+            state.limit = min(float(state.max_in_flight), state.limit + 1.0 / state.limit)
+    
+    def _on_failure(self, host: str, state: HostState):
+        """Multiplicative decrease, and open the circuit after repeated failures"""
+        state.limit = max(1.0, state.limit / 2)
+        state.consecutive_failures += 1
+        if state.half_open or state.consecutive_failures >= settings.circuit_breaker_threshold:
+            state.open_until = time.monotonic() + settings.circuit_breaker_cooldown
+            state.half_open = False
+            logger.warning(
+                f"Circuit opened for {host} after {state.consecutive_failures} failures, "
+                f"parked for {settings.circuit_breaker_cooldown}s"
+            )
+    
+    @asynccontextmanager
+    async def slot(self, url: str):
+        """Wait for a polite request slot on the URL's host
+        
+        Transport errors raised inside the block, or a ticket marked as
+        failed, count as host failures; other exceptions are neutral.
+        """
+        host = self._host_key(url)
+        state = self._get_host(host)
+        self._check_circuit(host, state)
+        
+        async with state.capacity:
+            await state.capacity.wait_for(lambda: state.in_flight < int(state.limit))
+            # The circuit may have opened while this request was waiting
+            if time.monotonic() < state.open_until:
+                raise HostUnavailable(f"Circuit open for {host}")
+            state.in_flight += 1
+        
+        ticket = SlotTicket()
+        try:
+            # Reserve the next start time before sleeping so concurrent
+            # waiters on the same host queue up behind each other
+            now = time.monotonic()
+            start = max(now, state.next_slot)
+            state.next_slot = start + state.delay
+            if start > now:
+                await asyncio.sleep(start - now)
+            # A Retry-After may have arrived while this request was waiting
+            while time.monotonic() < state.blocked_until:
+                await asyncio.sleep(state.blocked_until - time.monotonic())
+            
+            started = time.monotonic()
+            try:
+                yield ticket
+            except (httpx.TransportError, asyncio.TimeoutError):
+                self._on_failure(host, state)
+                raise
+            except BaseException:
+                if ticket.failed:
+                    self._on_failure(host, state)
+                else:
+                    # Neutral outcome (e.g. 404, cancellation): allow another trial
+                    state.half_open = False
+                raise
+            if ticket.failed:
+                self._on_failure(host, state)
+            else:
+                self._on_success(state, time.monotonic() - started)
+        finally:
+            async with state.capacity:
+                state.in_flight -= 1
+                state.capacity.notify_all()
+
+
+# Global scheduler shared by every WebFetcher in the process
+crawl_scheduler = CrawlScheduler()
@@ -0,0 +1,147 @@
+import asyncio
+import time
+import zlib
+import xml.etree.ElementTree as ET
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+import httpx
+from app.config import settings
+from app.services.crawl_scheduler import CrawlScheduler, HostUnavailable
+from app.utils.logger import logger
+
+
+def _local_name(tag: str) -> str:
+    """Strip the XML namespace from a tag name"""
+    return tag.rsplit("}", 1)[-1]
+
+
+class RobotsCache:
+    """Process-wide cache of parsed robots.txt files, keyed by site root"""
+    
+    def __init__(self, ttl: Optional[int] = None):
+        self.ttl = settings.robots_cache_ttl if ttl is None else ttl
+        self.entries: Dict[str, Tuple[RobotFileParser, float]] = {}
+        self._loading: Dict[str, asyncio.Task] = {}
+    
+    def _site(self, url: str) -> str:
+        """Get the site root (scheme + host) for a URL"""
+        parsed = urlparse(url)
+        return f"{parsed.scheme}://{parsed.netloc.lower()}"
+    
+    async def get(self, url: str, client: httpx.AsyncClient, scheduler: CrawlScheduler) -> RobotFileParser:
+        """Get the parsed robots.txt for the URL's site, fetching it if needed"""
+        site = self._site(url)
+        cached = self.entries.get(site)
+        if cached and time.time() - cached[1] < self.ttl:
+            return cached[0]
+        
+        task = self._loading.get(site)
+        if task is None:
+            task = asyncio.create_task(self._load(site, client, scheduler))
+            self._loading[site] = task
+            task.add_done_callback(lambda _: self._loading.pop(site, None))
+        return await asyncio.shield(task)
+    
+    async def _load(self, site: str, client: httpx.AsyncClient, scheduler: CrawlScheduler) -> RobotFileParser:
+        """Fetch and parse robots.txt, applying its Crawl-delay to the scheduler"""
+        parser = RobotFileParser(f"{site}/robots.txt")
+        try:
+            async with scheduler.slot(site):
+                response = await client.get(f"{site}/robots.txt")
+            if response.status_code in (401, 403):
+                parser.disallow_all = True
+            elif response.status_code >= 400:
+                parser.allow_all = True
+            else:
+                parser.parse(response.text.splitlines())
+        except (httpx.HTTPError, HostUnavailable) as e:
+            logger.warning(f"Could not fetch robots.txt for {site}: {str(e)}")
+            parser.allow_all = True
+        # RobotFileParser.can_fetch() refuses everything until mtime is set
+        parser.modified()
+        
+        crawl_delay = parser.crawl_delay(settings.fetch_user_agent)
+        if crawl_delay:
+            delay = min(float(crawl_delay), settings.robots_max_crawl_delay)
+            scheduler.set_host_delay(site, delay)
+            logger.info(f"Honoring Crawl-delay {delay}s for {site}")
+        
+        self.entries[site] = (parser, time.time())
+        return parser
+    
+    def sitemaps(self, parser: RobotFileParser) -> List[str]:
+        """Get the sitemap URLs declared in a robots.txt"""
+        return list(parser.site_maps() or [])
+
+
+class SitemapReader:
+    """Streaming reader for sitemap.xml files and sitemap indexes"""
+    
+    def __init__(self, client: httpx.AsyncClient, scheduler: CrawlScheduler):
+        self.client = client
+        self.scheduler = scheduler
+        self.files_read = 0
+    
+    async def iter_urls(self, sitemap_urls: List[str]) -> AsyncIterator[str]:
+        """Yield page URLs from sitemaps, expanding sitemap indexes breadth-first"""
+        pending = list(sitemap_urls)
+        seen = set()
+        
+        while pending and self.files_read < settings.sitemap_max_files:
+            sitemap_url = pending.pop(0)
+            if sitemap_url in seen:
+                continue
+            seen.add(sitemap_url)
+            self.files_read += 1
+            
+            async for kind, loc in self._parse(sitemap_url):
+                if kind == "sitemap":
+                    pending.append(urljoin(sitemap_url, loc))
+                else:
+                    yield urljoin(sitemap_url, loc)
+    
+    async def _parse(self, sitemap_url: str) -> AsyncIterator[Tuple[str, str]]:
+        """Stream-parse one sitemap file, yielding ("url"|"sitemap", loc) pairs"""
+        parser = ET.XMLPullParser(events=("end",))
+        decompressor = None
+        parser_fed = 0
+        
+        try:
+            async with self.scheduler.slot(sitemap_url):
+                async with self.client.stream("GET", sitemap_url) as response:
+                    if response.status_code >= 400:
+                        logger.info(f"No sitemap at {sitemap_url} ({response.status_code})")
+                        return
+                    
+                    async for chunk in response.aiter_bytes():
+                        # sitemap.xml.gz files arrive still gzipped (no Content-Encoding)
+                        if decompressor is None and parser_fed == 0 and chunk[:2] == b"\x1f\x8b":
+                            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                        parser_fed += len(chunk)
+                        if decompressor is not None:
+                            chunk = decompressor.decompress(chunk)
+                        parser.feed(chunk)
+                        for entry in self._drain(parser):
+                            yield entry
+        except (httpx.HTTPError, HostUnavailable, ET.ParseError, zlib.error) as e:
+            logger.warning(f"Failed to read sitemap {sitemap_url}: {str(e)}")
+    
+    def _drain(self, parser: ET.XMLPullParser):
+        """Collect completed <url>/<sitemap> entries and free their elements"""
+        for _, element in parser.read_events():
+            name = _local_name(element.tag)
+            if name not in ("url", "sitemap"):
+                continue
+            loc = None
+            for child in element:
+                if _local_name(child.tag) == "loc" and child.text:
+                    loc = child.text.strip()
+            # Drop parsed entries so memory stays flat on large sitemaps
+            element.clear()
+            if loc:
+                yield name, loc
+
+
+# Global robots.txt cache shared by every WebFetcher in the process
+robots_cache = RobotsCache()
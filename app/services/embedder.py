@@ -1,3 +1,4 @@
+import asyncio
 import os
 from typing import List, Optional
 import numpy as np
@@ -5,6 +6,10 @@ from app.config import settings
 from app.utils.logger import logger
 
 
+# Model used by the "local" provider
+LOCAL_EMBEDDING_MODEL = "all-MiniLM-L6-v2"  # 384 dimensions
+
+
 class EmbeddingService:
     """Service for generating embeddings"""
     
@@ -51,7 +56,7 @@ class EmbeddingService:
         try:
             from sentence_transformers import SentenceTransformer
             # Use a lightweight model
-            model_name = "all-MiniLM-L6-v2"  # 384 dimensions
+            model_name = LOCAL_EMBEDDING_MODEL
             self._client = SentenceTransformer(model_name)
             self.dimension = 384  # Override for this model
             logger.info(f"Initialized local embedding model: {model_name}")
@@ -69,7 +74,8 @@ class EmbeddingService:
         elif self.embedding_provider == "gemini":
             return await self._embed_gemini(texts)
         elif self.embedding_provider == "local":
-            return self._embed_local(texts)
+            # The model is CPU-bound; keep the event loop free for the crawl
+            return await asyncio.to_thread(self._embed_local, texts)
         else:
             raise ValueError(f"Unknown embedding provider: {self.embedding_provider}")
     
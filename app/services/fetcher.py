@@ -1,124 +1,310 @@
 import asyncio
+import inspect
 import httpx
+from collections import deque
+from contextlib import aclosing
 from urllib.parse import urljoin, urlparse
-from typing import Set, List, Dict, Optional
+from typing import AsyncIterator, Awaitable, Callable, Deque, List, Dict, Optional, Set, Tuple, Union
 from datetime import datetime
 import hashlib
 from app.config import settings
+from app.services.checkpoint import CrawlCheckpoint
+from app.services.crawl_scheduler import CrawlScheduler, HostUnavailable, crawl_scheduler, parse_retry_after
+from app.services.discovery import SitemapReader, robots_cache
+from app.services.frontier import BestFirstFrontier, CrawlFrontier, FairFrontier
+from app.services.html_parser import link_info, page_links, parse_page
+from app.services.http_client import http_client_pool
+from app.services.http_cache import HttpCache, http_cache
+from app.services.link_scorer import LinkScorer
 from app.utils.logger import logger
+from app.utils.urls import SeenUrlSet, UrlFilter, canonicalize_url, url_host
+
+
+# Links with these extensions are never HTML, so they are skipped without a request
+NON_HTML_EXTENSIONS = frozenset({
+    ".pdf", ".zip", ".gz", ".tgz", ".tar", ".rar", ".7z", ".bz2", ".xz",
+    ".exe", ".msi", ".dmg", ".pkg", ".deb", ".rpm", ".apk", ".iso", ".bin",
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".ico", ".bmp", ".tif", ".tiff",
+    ".mp3", ".wav", ".ogg", ".flac", ".m4a", ".aac",
+    ".mp4", ".m4v", ".mov", ".avi", ".mkv", ".webm", ".wmv", ".flv",
+    ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".odt", ".ods", ".odp",
+    ".css", ".js", ".json", ".xml", ".rss", ".woff", ".woff2", ".ttf", ".otf", ".eot",
+})
+
+
+# Seeds are always fetched first, whatever the crawl strategy
+SEED_SCORE = float("inf")
+
+# Shortest wait before checking again whether a held host is ready
+HOLD_RECHECK = 0.05
+
+Frontier = Union[CrawlFrontier, BestFirstFrontier, FairFrontier]
 
 
 class WebFetcher:
     """Service for fetching and crawling web pages"""
     
-    def __init__(self):
-        self.client = httpx.AsyncClient(
-            timeout=settings.fetch_timeout,
-            follow_redirects=True,
-            headers={"User-Agent": settings.fetch_user_agent}
-        )
-        self.visited_urls: Set[str] = set()
+    def __init__(
+        self,
+        scheduler: Optional[CrawlScheduler] = None,
+        cache: Optional[HttpCache] = None,
+        client: Optional[httpx.AsyncClient] = None
+    ):
+        # The HTTP client is application-scoped: jobs reuse its keep-alive
+        # connections and DNS cache instead of opening their own
+        self.client = client or http_client_pool.get_client()
+        self.visited_urls = SeenUrlSet()
+        # Claimed URLs whose fetch was deferred by an open circuit breaker
+        self.parked_urls: Set[str] = set()
         self.fetched_pages: List[Dict] = []
-        self.rate_limiter = asyncio.Semaphore(1)  # Simple rate limiting
+        # Per-host politeness is shared process-wide so concurrent jobs
+        # crawling the same site don't multiply the load on it
+        self.scheduler = scheduler or crawl_scheduler
+        self.cache = cache or http_cache
+        # With a cassette every exchange must go over the (recorded) wire
+        self.use_cache = settings.http_cache_enabled and settings.http_cassette_mode == "off"
+        self.stats: Dict[str, int] = {"cache_hits": 0, "cache_revalidations": 0, "shared_fetches": 0}
+        self.robots = robots_cache
+        self.discover = False
+        self.on_page: Optional[Callable] = None
+        self.process_page: Optional[Callable[[Dict, bool, bool], Awaitable[Optional[Dict]]]] = None
+        self.checkpoint: Optional[CrawlCheckpoint] = None
+        self.scorer: Optional[LinkScorer] = None
+        self.seed_keys: Set[str] = set()
+        self.budget_split = "none"
+        self.seed_groups: Dict[str, str] = {}
         
     async def __aenter__(self):
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.client.aclose()
-    
-    def _is_allowed_domain(self, url: str, allowlist: List[str]) -> bool:
-        """Check if URL belongs to an allowed domain"""
-        parsed = urlparse(url)
-        domain = parsed.netloc.lower()
-        return any(allowed.lower() in domain for allowed in allowlist)
+        # The shared client outlives the job; it is closed at application shutdown
+        pass
     
     def _normalize_url(self, url: str) -> str:
         """Normalize URL for deduplication"""
-        parsed = urlparse(url)
-        # Remove fragment and normalize
-        normalized = f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
-        if parsed.query:
-            normalized += f"?{parsed.query}"
-        return normalized.lower()
-    
-    async def _fetch_page(self, url: str, allowlist: List[str]) -> Optional[Dict]:
-        """Fetch a single page with retries"""
+        return canonicalize_url(url)
+    
+    def _has_non_html_extension(self, url: str) -> bool:
+        """Check if the URL path ends with a known non-HTML file extension"""
+        path = urlparse(url).path.lower()
+        dot = path.rfind(".")
+        return dot > path.rfind("/") and path[dot:] in NON_HTML_EXTENSIONS
+    
+    async def _fetch_page(self, url: str, scope: UrlFilter) -> Optional[Dict]:
+        """Fetch a single page with retries
+        
+        Raises HostUnavailable when the host's circuit breaker is open; the
+        URL stays claimed in `parked_urls` so it can be fetched later.
+        """
         normalized = self._normalize_url(url)
         
-        if normalized in self.visited_urls:
+        if normalized in self.visited_urls and normalized not in self.parked_urls:
             return None
+        self.parked_urls.discard(normalized)
         
-        if not self._is_allowed_domain(url, allowlist):
+        if not scope.allows_domain(url):
             logger.warning(f"URL not in allowlist: {url}")
             return None
         
-        # Rate limiting
-        async with self.rate_limiter:
-            await asyncio.sleep(settings.fetch_rate_limit)
+        if self._has_non_html_extension(url):
+            logger.info(f"Skipping non-HTML URL: {url}")
+            return None
+        
+        # Claim the URL before fetching so concurrent workers don't fetch it twice
+        self.visited_urls.add(normalized)
+        
+        if self.discover:
+            robots = await self.robots.get(url, self.client, self.scheduler)
+            if not robots.can_fetch(settings.fetch_user_agent, url):
+                logger.info(f"Disallowed by robots.txt: {url}")
+                return None
+        
+        for attempt in range(settings.fetch_max_retries):
+            try:
+                # Jobs asking for the same URL at the same time share one request
+                result, shared = await self.cache.shared_fetch(url, lambda: self._download(url))
+                if shared:
+                    self.stats["shared_fetches"] += 1
+                elif result["cache"] == "hit":
+                    self.stats["cache_hits"] += 1
+                elif result["cache"] == "revalidated":
+                    self.stats["cache_revalidations"] += 1
+                
+                # Non-HTML or oversized responses are rejected while streaming
+                if result["content"] is None:
+                    logger.warning(f"Skipped {url}: {result['skipped']}")
+                    return None
+                
+                # A redirect to an already-seen page is a duplicate fetch
+                final_url = result["final_url"]
+                final_key = self._normalize_url(final_url)
+                if final_key != normalized:
+                    if final_key in self.visited_urls:
+                        logger.info(f"Skipping {url}: redirects to already seen {final_url}")
+                        return None
+                    self.visited_urls.add(final_key)
+                
+                return {
+                    "url": final_url,
+                    "content": result["content"],
+                    "encoding": result["encoding"],
+                    "status_code": result["status_code"],
+                    "content_type": result["content_type"],
+                    "headers": result["headers"],
+                    "fetched_at": datetime.utcnow().isoformat(),
+                }
+                
+            except HostUnavailable as e:
+                logger.info(f"Deferring {url}: {str(e)}")
+                self.parked_urls.add(normalized)
+                raise
             
-            for attempt in range(settings.fetch_max_retries):
-                try:
-                    response = await self.client.get(url)
-                    response.raise_for_status()
-                    
-                    # Check content type
-                    content_type = response.headers.get("content-type", "").lower()
-                    if "text/html" not in content_type:
-                        logger.warning(f"Non-HTML content: {url} ({content_type})")
+            except httpx.HTTPStatusError as e:
+                status_code = e.response.status_code
+                logger.warning(f"HTTP error for {url}: {status_code}")
+                
+                if status_code in (429, 503):
+                    retry_after = parse_retry_after(e.response.headers.get("retry-after"))
+                    if retry_after is not None:
+                        if retry_after > settings.fetch_max_retry_after:
+                            logger.warning(f"Giving up on {url}: Retry-After {retry_after:.0f}s")
+                            return None
+                        # The scheduler already holds the host until Retry-After has passed
+                        if attempt < settings.fetch_max_retries - 1:
+                            continue
                         return None
+                
+                # Other client errors won't change on retry
+                if 400 <= status_code < 500 and status_code not in (408, 429):
+                    return None
+                if attempt < settings.fetch_max_retries - 1:
+                    await asyncio.sleep(2 ** attempt)  # Exponential backoff
+                else:
+                    return None
                     
-                    self.visited_urls.add(normalized)
-                    
-                    return {
-                        "url": url,
-                        "html": response.text,
-                        "status_code": response.status_code,
-                        "content_type": content_type,
-                        "fetched_at": datetime.utcnow().isoformat(),
-                    }
-                    
-                except httpx.HTTPStatusError as e:
-                    logger.warning(f"HTTP error for {url}: {e.response.status_code}")
-                    if e.response.status_code == 404:
-                        return None
-                    if attempt < settings.fetch_max_retries - 1:
-                        await asyncio.sleep(2 ** attempt)  # Exponential backoff
-                    else:
-                        return None
-                        
-                except (httpx.RequestError, asyncio.TimeoutError) as e:
-                    logger.warning(f"Request error for {url}: {str(e)}")
-                    if attempt < settings.fetch_max_retries - 1:
-                        await asyncio.sleep(2 ** attempt)
-                    else:
-                        return None
+            except (httpx.RequestError, asyncio.TimeoutError) as e:
+                logger.warning(f"Request error for {url}: {str(e)}")
+                if attempt < settings.fetch_max_retries - 1:
+                    await asyncio.sleep(2 ** attempt)
+                else:
+                    return None
         
         return None
     
-    def _extract_links(self, html: str, base_url: str, allowlist: List[str]) -> List[str]:
-        """Extract links from HTML that are in the allowlist"""
-        from bs4 import BeautifulSoup
+    async def _download(self, url: str) -> Dict:
+        """Download a URL through the HTTP cache"""
+        entry = await self.cache.load(url) if self.use_cache else None
+        if entry and self.cache.is_fresh(entry):
+            return self._cached_result(entry, "hit")
+        
+        # Per-host politeness (delay + max in-flight), held for the whole download
+        async with self.scheduler.slot(url) as ticket:
+            headers = self.cache.conditional_headers(entry)
+            async with self.client.stream("GET", url, headers=headers) as response:
+                if response.status_code == 304 and entry:
+                    await self.cache.refresh(url, entry, response.headers)
+                    return self._cached_result(entry, "revalidated")
+                
+                # Throttling and server errors shrink the host's window, and an
+                # explicit Retry-After holds every request to the host
+                if response.status_code == 429 or response.status_code >= 500:
+                    ticket.failed = True
+                    retry_after = parse_retry_after(response.headers.get("retry-after"))
+                    if response.status_code in (429, 503) and retry_after is not None:
+                        self.scheduler.defer_host(url, min(retry_after, settings.fetch_max_retry_after))
+                
+                response.raise_for_status()
+                
+                # Decide from the headers alone; leaving the block closes the
+                # connection without transferring the body
+                content_type = response.headers.get("content-type", "").lower()
+                if "text/html" not in content_type:
+                    return self._skipped_result(response, f"non-HTML content ({content_type})")
+                
+                max_bytes = settings.fetch_max_body_bytes
+                content_length = response.headers.get("content-length", "")
+                if content_length.isdigit() and int(content_length) > max_bytes:
+                    return self._skipped_result(response, f"body too large ({content_length} bytes)")
+                
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body.extend(chunk)
+                    if len(body) > max_bytes:
+                        return self._skipped_result(response, f"body exceeds {max_bytes} bytes")
+                body = bytes(body)
+        
+        final_url = str(response.url)
+        # Only the charset declared by the server: response.encoding would
+        # fall back to a default or to charset detection
+        encoding = response.charset_encoding
+        if self.use_cache:
+            await self.cache.store(url, response.headers, content_type, encoding, body, final_url=final_url)
+        
+        # Raw bytes are handed to the parser, which decodes them once
+        return {
+            "status_code": response.status_code,
+            "final_url": final_url,
+            "content_type": content_type,
+            "content": body,
+            "encoding": encoding,
+            "headers": [[name, value] for name, value in response.headers.multi_items()],
+            "cache": None,
+        }
+    
+    def _skipped_result(self, response: httpx.Response, reason: str) -> Dict:
+        """Build a download result for a response that was not read"""
+        return {
+            "status_code": response.status_code,
+            "content_type": response.headers.get("content-type", "").lower(),
+            "content": None,
+            "cache": None,
+            "skipped": reason,
+        }
+    
+    def _cached_result(self, entry: Dict, cache_status: str) -> Dict:
+        """Build a download result from a cache entry"""
+        return {
+            "status_code": 200,
+            "final_url": entry.get("final_url") or entry["url"],
+            "content_type": entry.get("content_type") or "",
+            "content": entry["body"],
+            "encoding": entry.get("encoding"),
+            "headers": entry.get("headers", []),
+            "cache": cache_status,
+        }
+    
+    def _is_canonical_duplicate(self, canonical: Optional[str], page_url: str) -> bool:
+        """Check the page's <link rel=canonical> href: True if the canonical page was already seen
+        
+        Otherwise the canonical URL is marked as seen so it is not fetched again.
+        """
+        if canonical is None:
+            return False
         
-        soup = BeautifulSoup(html, "html.parser")
+        canonical_key = self._normalize_url(urljoin(page_url, canonical))
+        if canonical_key == self._normalize_url(page_url):
+            return False
+        if canonical_key in self.visited_urls:
+            logger.info(f"Skipping {page_url}: duplicate of canonical {canonical}")
+            return True
+        self.visited_urls.add(canonical_key)
+        return False
+    
+    def _extract_links(self, soup, base_url: str, scope: UrlFilter) -> List[str]:
+        """Extract links from a parsed page that are in the crawl scope"""
+        return [url for url, _ in self._scope_links(page_links(soup, base_url), scope)]
+    
+    def _scope_links(self, page_links: List[Tuple[str, str]], scope: UrlFilter) -> List[Tuple[str, str]]:
+        """Keep the in-scope links of a page (resolved by `page_links`), with their anchor text"""
         links = []
         
-        for tag in soup.find_all("a", href=True):
-            href = tag.get("href")
-            if not href:
+        for url, anchor in page_links:
+            if self._has_non_html_extension(url):
                 continue
             
-            # Resolve relative URLs
-            absolute_url = urljoin(base_url, href)
-            
-            # Remove fragment
-            parsed = urlparse(absolute_url)
-            clean_url = f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
-            if parsed.query:
-                clean_url += f"?{parsed.query}"
-            
-            if self._is_allowed_domain(clean_url, allowlist):
-                links.append(clean_url)
+            if scope.allows(url):
+                links.append((url, anchor))
         
         return links
     
@@ -127,33 +313,422 @@ class WebFetcher:
         seed_urls: List[str],
         domain_allowlist: List[str],
         max_pages: int,
-        max_depth: int
+        max_depth: int,
+        discover: bool = False,
+        on_page: Optional[Callable] = None,
+        checkpoint: Optional[CrawlCheckpoint] = None,
+        include_patterns: Optional[List[str]] = None,
+        exclude_patterns: Optional[List[str]] = None,
+        strategy: str = "bfs",
+        user_notes: Optional[str] = None,
+        budget_split: str = "none",
+        budget_weights: Optional[Dict[str, int]] = None,
+        process_page: Optional[Callable[[Dict, bool, bool], Awaitable[Optional[Dict]]]] = None
     ) -> List[Dict]:
-        """Crawl web pages starting from seed URLs"""
+        """Crawl web pages starting from seed URLs
+        
+        With `discover`, robots.txt is honored (rules and Crawl-delay) and
+        URLs listed in the sites' sitemaps are queued alongside the seeds.
+        Discovered links must be on an allowlisted domain (or a subdomain)
+        and pass the include/exclude patterns, which are regular expressions
+        searched in the URL path and query; known crawl traps are excluded
+        by default (see `crawl_trap_patterns`).
+        
+        `strategy` is "bfs" (shallowest pages first) or "best_first", which
+        fetches the links most relevant to `user_notes` and the seed pages
+        first (see LinkScorer), so a page budget goes further.
+        `budget_split` shares `max_pages` between seeds ("seed": each seed
+        and the pages reached from it) or domains ("domain") by taking turns
+        between them; `budget_weights` maps a seed URL or domain to its
+        number of pages per turn (see FairFrontier).
+        
+        Each fetched page is handed to `on_page`, which may be a coroutine
+        function, in which case the crawl waits for it (backpressure). With
+        `process_page(page, links, profile)` the page is parsed off the
+        event loop, in the consumer's workers: it returns the page's
+        `link_info` plus whatever the consumer needs (e.g. its chunks), and
+        `on_page(page, None, processed)` receives that result. Without it,
+        or when it returns None, the page is parsed once here, on the event
+        loop, for its links and for `on_page(page, soup)`. With a consumer
+        the returned pages omit their body (`content`), so the crawl does
+        not hold every page in memory.
+        
+        With a `checkpoint`, progress is journaled and a crawl interrupted
+        earlier resumes where it stopped.
+        """
         self.visited_urls.clear()
+        self.parked_urls.clear()
         self.fetched_pages.clear()
+        self.discover = discover
+        self.on_page = on_page
+        self.process_page = process_page
+        self.checkpoint = checkpoint
+        
+        excludes = list(settings.crawl_trap_patterns) if settings.crawl_exclude_traps else []
+        scope = UrlFilter(domain_allowlist, include_patterns, excludes + list(exclude_patterns or []))
+        
+        if strategy == "best_first":
+            self.scorer = LinkScorer(user_notes)
+            make_frontier = BestFirstFrontier
+        elif strategy == "bfs":
+            self.scorer = None
+            make_frontier = CrawlFrontier
+        else:
+            raise ValueError(f"Unknown crawl strategy: {strategy}")
+        if budget_split == "none":
+            frontier = make_frontier()
+        elif budget_split in ("seed", "domain"):
+            frontier = FairFrontier(make_frontier, budget_weights)
+        else:
+            raise ValueError(f"Unknown budget split: {budget_split}")
+        self.budget_split = budget_split
+        self.seed_keys = {self._normalize_url(url) for url in seed_urls}
+        self.seed_groups = {}
+        for url in seed_urls:
+            self.seed_groups.setdefault(self._normalize_url(url), url)
+        
+        resumed = checkpoint.load() if checkpoint else None
+        if resumed:
+            await self._restore(resumed, frontier)
+        else:
+            for url in seed_urls:
+                self._enqueue(frontier, url, 0, score=SEED_SCORE, group=self._budget_group(url))
+        in_flight: Dict[asyncio.Task, tuple[str, int, str]] = {}
         
-        queue: List[tuple[str, int]] = [(url, 0) for url in seed_urls]
+        try:
+            if discover and not (resumed and resumed["discovered"]):
+                await self._discover_sitemaps(seed_urls, frontier, scope, max_pages)
+                if checkpoint:
+                    checkpoint.record_discovered()
+            await self._crawl_frontier(frontier, in_flight, scope, max_pages, max_depth)
+        finally:
+            frontier.close()
+            if checkpoint:
+                checkpoint.close()
+            # Budget reached (or crawl aborted): drop fetches that are still running
+            for task in in_flight:
+                task.cancel()
+            if in_flight:
+                await asyncio.gather(*in_flight.keys(), return_exceptions=True)
         
-        while queue and len(self.fetched_pages) < max_pages:
-            url, depth = queue.pop(0)
+        logger.info(f"Fetched {len(self.fetched_pages)} pages")
+        return self.fetched_pages
+    
+    async def revisit(self, urls: List[str], domain_allowlist: List[str]) -> AsyncIterator[Tuple[str, Optional[Dict]]]:
+        """Fetch known URLs again, without following links (used by job refreshes)
+        
+        Yields (url, page) as fetches complete, at most `fetch_concurrency`
+        at a time; page is None when the URL could not be fetched.
+        """
+        scope = UrlFilter(domain_allowlist)
+        pending = iter(urls)
+        in_flight: Dict[asyncio.Task, str] = {}
+        try:
+            while True:
+                while len(in_flight) < settings.fetch_concurrency:
+                    url = next(pending, None)
+                    if url is None:
+                        break
+                    in_flight[asyncio.create_task(self._fetch_page(url, scope))] = url
+                if not in_flight:
+                    break
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    url = in_flight.pop(task)
+                    try:
+                        page = task.result()
+                    except HostUnavailable:
+                        page = None
+                    yield url, page
+        finally:
+            for task in in_flight:
+                task.cancel()
+    
+    def _enqueue(self, frontier: Frontier, url: str, depth: int, score: float = 0.0, group: str = "") -> bool:
+        """Push a URL to the frontier, journaling it when checkpointing"""
+        key = self._normalize_url(url)
+        if not frontier.push(url, depth, key=key, score=score, group=group):
+            return False
+        if self.checkpoint:
+            self.checkpoint.record_queued(url, depth, key, score, group)
+        return True
+    
+    def _budget_group(self, url: str, parent: Optional[str] = None) -> str:
+        """Budget group of a URL: its domain, or the seed it was reached from"""
+        if self.budget_split == "domain":
+            return url_host(url)
+        if self.budget_split != "seed":
+            return ""
+        if parent is not None:
+            return parent
+        seed = self.seed_groups.get(self._normalize_url(url))
+        if seed is not None:
+            return seed
+        # Sitemap URLs count against the first seed of their site
+        host = url_host(url)
+        for seed in self.seed_groups.values():
+            if url_host(seed) == host:
+                return seed
+        return host
+    
+    async def _restore(self, state: Dict, frontier: Frontier):
+        """Restore pages, visited URLs and the frontier from a checkpoint"""
+        for key in state["visited"]:
+            self.visited_urls.add(key)
+        
+        # Restored pages go through the page processor like fetched ones, a
+        # window at a time, so a large job is not parsed on the event loop
+        pages = state["pages"]
+        window = max(1, settings.fetch_concurrency)
+        for start in range(0, len(pages), window):
+            batch = pages[start:start + window]
+            results = await asyncio.gather(*(self._process_restored(page) for page in batch))
+            for page, processed in zip(batch, results):
+                self._keep_page(page)
+                soup = None
+                if processed is None:
+                    soup = parse_page(page)
+                    info = link_info(soup, page["url"], links=False, profile=self._is_seed(page))
+                else:
+                    info = processed
+                # Re-marks the page's canonical URL as seen
+                self._is_canonical_duplicate(info["canonical"], page["url"])
+                self._learn_from_seed(info)
+                await self._hand_over(page, soup, processed)
+        
+        for url, depth, score, group in state["frontier"]:
+            frontier.push(url, depth, key=self._normalize_url(url), score=score, group=group)
+        
+        logger.info(
+            f"Resuming crawl from checkpoint: {len(self.fetched_pages)} pages fetched, "
+            f"{len(frontier)} URLs queued"
+        )
+    
+    async def _process_restored(self, page: Dict) -> Optional[Dict]:
+        """Run the page processor on a restored page (its links are already queued), None without one"""
+        if self.process_page is None:
+            return None
+        return await self.process_page(page, False, self._is_seed(page))
+    
+    async def _discover_sitemaps(
+        self,
+        seed_urls: List[str],
+        frontier: Frontier,
+        scope: UrlFilter,
+        max_pages: int
+    ):
+        """Queue sitemap URLs of the seed sites directly into the frontier"""
+        # Queue a margin over the budget to absorb failed or non-HTML URLs
+        limit = max_pages * 2
+        queued = 0
+        reader = SitemapReader(self.client, self.scheduler)
+        sites = list(dict.fromkeys(
+            f"{urlparse(url).scheme}://{urlparse(url).netloc.lower()}" for url in seed_urls
+        ))
+        
+        for site in sites:
+            robots = await self.robots.get(site, self.client, self.scheduler)
+            sitemap_urls = self.robots.sitemaps(robots) or [f"{site}/sitemap.xml"]
             
-            if depth > max_depth:
+            async with aclosing(reader.iter_urls(sitemap_urls)) as urls:
+                async for url in urls:
+                    if not scope.allows(url):
+                        continue
+                    score = self.scorer.score(url) if self.scorer else 0.0
+                    if self._enqueue(frontier, url, 0, score=score, group=self._budget_group(url)):
+                        queued += 1
+                    if queued >= limit:
+                        break
+            
+            if queued >= limit:
+                break
+        
+        logger.info(f"Queued {queued} URLs from {reader.files_read} sitemap files")
+    
+    async def _crawl_frontier(
+        self,
+        frontier: Frontier,
+        in_flight: Dict[asyncio.Task, tuple[str, int, str]],
+        scope: UrlFilter,
+        max_pages: int,
+        max_depth: int
+    ):
+        """Run fetches from the frontier until it is empty or the budget is used"""
+        # URLs whose host had no free request slot, per host
+        held: Dict[str, Deque[tuple[str, int, str]]] = {}
+        host_load: Dict[str, int] = {}
+        
+        while (len(frontier) or held or in_flight) and len(self.fetched_pages) < max_pages:
+            self._dispatch(frontier, held, host_load, in_flight, scope, max_pages, max_depth)
+            
+            if not in_flight and not held:
+                break
+            
+            # Wake up when a held host may take a request again
+            timeout = None
+            if held:
+                timeout = max(HOLD_RECHECK, min(self.scheduler.ready_in(queue[0][0]) for queue in held.values()))
+            if not in_flight:
+                await asyncio.sleep(timeout)
                 continue
             
-            page = await self._fetch_page(url, domain_allowlist)
+            done, _ = await asyncio.wait(in_flight.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
             
-            if page:
-                self.fetched_pages.append(page)
+            for task in done:
+                url, depth, group = in_flight.pop(task)
+                host_load[url_host(url)] -= 1
+                try:
+                    page, processed = task.result()
+                except HostUnavailable:
+                    # The host was parked meanwhile: fetch the URL once it is back
+                    held.setdefault(url_host(url), deque()).appendleft((url, depth, group))
+                    continue
+                
+                if not page or len(self.fetched_pages) >= max_pages:
+                    self._record_done(url)
+                    continue
+                
+                # In discovery mode the sitemaps may already cover the budget,
+                # in which case there is no need to look for more links
+                remaining = max_pages - len(self.fetched_pages) - 1
+                needs_links = (
+                    depth < max_depth
+                    and remaining > 0
+                    and not (self.discover and len(frontier) >= remaining)
+                )
+                if not needs_links and not self.on_page:
+                    self._keep_page(page)
+                    self._record_page(page, url)
+                    continue
+                
+                # Without a page processor, parse here once for canonical
+                # detection, links and the page consumer
+                soup = None
+                if processed is None:
+                    soup = parse_page(page)
+                    info = link_info(soup, page["url"], links=needs_links, profile=self._is_seed(page))
+                else:
+                    info = processed
+                
+                if self._is_canonical_duplicate(info["canonical"], page["url"]):
+                    self._record_done(url)
+                    continue
+                
+                self._keep_page(page)
+                
+                self._learn_from_seed(info)
                 
                 # Extract links for next level if not at max depth
-                if depth < max_depth and len(self.fetched_pages) < max_pages:
-                    links = self._extract_links(page["html"], url, domain_allowlist)
-                    for link in links:
+                if needs_links:
+                    for link, anchor in self._scope_links(info["links"], scope):
                         normalized = self._normalize_url(link)
                         if normalized not in self.visited_urls:
-                            queue.append((link, depth + 1))
+                            score = self.scorer.score(link, anchor) if self.scorer else 0.0
+                            self._enqueue(frontier, link, depth + 1, score=score, group=self._budget_group(link, group))
+                
+                # Hand the same tree, or the processed page, to the consumer
+                # (e.g. the ingestion pipeline)
+                await self._hand_over(page, soup, processed)
+                
+                # Journaled after its links, so a resumed crawl never loses them
+                self._record_page(page, url)
+    
+    def _dispatch(
+        self,
+        frontier: Frontier,
+        held: Dict[str, Deque[tuple[str, int, str]]],
+        host_load: Dict[str, int],
+        in_flight: Dict[asyncio.Task, tuple[str, int, str]],
+        scope: UrlFilter,
+        max_pages: int,
+        max_depth: int
+    ):
+        """Start up to fetch_concurrency fetches, only to hosts ready for a request
         
-        logger.info(f"Fetched {len(self.fetched_pages)} pages")
-        return self.fetched_pages
-
+        A host is ready when it has fewer fetches running than the
+        scheduler's window for it (see `CrawlScheduler.host_window`) and,
+        beyond its first fetch, its politeness delay has passed. Other URLs
+        are held in a per-host queue, so fetches to other hosts start
+        instead of waiting behind a busy one. Held URLs go first once their
+        host is ready; at most `fetch_dispatch_lookahead` URLs are held.
+        """
+        def has_room() -> bool:
+            return (
+                len(in_flight) < settings.fetch_concurrency
+                and len(self.fetched_pages) + len(in_flight) < max_pages
+            )
+        
+        def is_ready(url: str, host: str) -> bool:
+            load = host_load.get(host, 0)
+            return load < self.scheduler.host_window(url) and (load == 0 or self.scheduler.ready_in(url) == 0)
+        
+        def start(url: str, depth: int, group: str, host: str):
+            task = asyncio.create_task(self._fetch_and_process(url, scope, depth < max_depth))
+            in_flight[task] = (url, depth, group)
+            host_load[host] = host_load.get(host, 0) + 1
+        
+        for host in list(held):
+            queue = held[host]
+            while queue and has_room() and is_ready(queue[0][0], host):
+                start(*queue.popleft(), host)
+            if not queue:
+                del held[host]
+        
+        holding = sum(len(queue) for queue in held.values())
+        while len(frontier) and has_room() and holding < settings.fetch_dispatch_lookahead:
+            url, depth = frontier.pop()
+            group = frontier.last_group if isinstance(frontier, FairFrontier) else ""
+            
+            if self._normalize_url(url) in self.visited_urls:
+                continue
+            
+            host = url_host(url)
+            if host in held or not is_ready(url, host):
+                held.setdefault(host, deque()).append((url, depth, group))
+                holding += 1
+                continue
+            
+            start(url, depth, group, host)
+    
+    async def _fetch_and_process(self, url: str, scope: UrlFilter, links: bool) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """Fetch a page and, with a page processor, parse it off the event loop
+        
+        Returns the page and the processor's result (see `link_info`), or
+        None if the page must be parsed here.
+        """
+        page = await self._fetch_page(url, scope)
+        if page is None or self.process_page is None:
+            return page, None
+        return page, await self.process_page(page, links, self._is_seed(page))
+    
+    def _is_seed(self, page: Dict) -> bool:
+        """Whether a page's headings feed the link scorer's profile"""
+        return self.scorer is not None and self._normalize_url(page["url"]) in self.seed_keys
+    
+    def _learn_from_seed(self, info: Dict):
+        """Feed a seed page's headings (see `link_info`) to the link scorer's profile"""
+        if self.scorer and info["profile"]:
+            self.scorer.add_text(info["profile"])
+    
+    def _keep_page(self, page: Dict):
+        """Count a page as fetched; its body is only retained without a consumer"""
+        if self.on_page:
+            page = {key: value for key, value in page.items() if key not in ("content", "html")}
+        self.fetched_pages.append(page)
+    
+    async def _hand_over(self, page: Dict, soup, processed: Optional[Dict] = None):
+        """Pass a page and its parsed tree (or processor result) to the consumer, waiting if it is async"""
+        if self.on_page:
+            result = self.on_page(page, soup) if processed is None else self.on_page(page, soup, processed)
+            if inspect.isawaitable(result):
+                await result
+    
+    def _record_done(self, url: str):
+        """Journal a finished fetch that produced no page"""
+        if self.checkpoint:
+            self.checkpoint.record_done(self._normalize_url(url))
+    
+    def _record_page(self, page: Dict, url: str):
+        """Journal a kept page under the URL it was requested as"""
+        if self.checkpoint:
+            self.checkpoint.record_page(page, self._normalize_url(url))
@@ -0,0 +1,240 @@
+import heapq
+import itertools
+import os
+import tempfile
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple, Union
+from app.config import settings
+from app.utils.logger import logger
+from app.utils.urls import SeenUrlSet
+
+
+class SpillFile:
+    """Append-only FIFO of URLs stored on disk"""
+    
+    def __init__(self, directory: str, depth: int):
+        fd, self.path = tempfile.mkstemp(prefix=f"depth{depth}-", suffix=".txt", dir=directory)
+        os.close(fd)
+        self._writer = open(self.path, "a", encoding="utf-8")
+        self._reader = open(self.path, "r", encoding="utf-8")
+        self.count = 0
+    
+    def append(self, url: str):
+        """Append a URL at the tail of the file"""
+        self._writer.write(url + "\n")
+        self.count += 1
+    
+    def read(self, limit: int) -> list:
+        """Read up to `limit` URLs from the head of the file"""
+        self._writer.flush()
+        urls = []
+        while len(urls) < limit and self.count > 0:
+            line = self._reader.readline()
+            if not line:
+                break
+            urls.append(line.rstrip("\n"))
+            self.count -= 1
+        return urls
+    
+    def close(self):
+        """Close and delete the file"""
+        self._writer.close()
+        self._reader.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class CrawlFrontier:
+    """Crawl frontier with one FIFO bucket per depth
+    
+    Shallower pages are always popped first (BFS order). URLs are deduplicated
+    on enqueue (unless `dedup` is False, when the caller dedups), and once
+    more than `max_in_memory` URLs are queued new entries spill to disk, so
+    memory stays bounded on link-dense sites. Since depth is capped by
+    IngestRequest (max 10), push and pop are constant-time.
+    """
+    
+    def __init__(self, max_in_memory: Optional[int] = None, spill_dir: Optional[str] = None, dedup: bool = True):
+        self.max_in_memory = max_in_memory or settings.frontier_max_in_memory
+        self.spill_dir = spill_dir or os.path.join(settings.data_dir, "frontier")
+        self.buckets: Dict[int, Deque[str]] = {}
+        self.spills: Dict[int, SpillFile] = {}
+        self.enqueued = SeenUrlSet() if dedup else None
+        self.in_memory = 0
+    
+    def __len__(self) -> int:
+        return self.in_memory + sum(spill.count for spill in self.spills.values())
+    
+    def push(self, url: str, depth: int, key: Optional[str] = None, score: float = 0.0, group: str = "") -> bool:
+        """Enqueue a URL at a depth, returns False if it was already seen
+        
+        `score` and `group` are ignored: this frontier is strictly breadth-first.
+        """
+        key = key or url
+        if self.enqueued is not None:
+            if key in self.enqueued:
+                return False
+            self.enqueued.add(key)
+        
+        spill = self.spills.get(depth)
+        # Keep FIFO order: once a depth has spilled, later URLs go to disk too
+        if self.in_memory >= self.max_in_memory or (spill is not None and spill.count > 0):
+            if spill is None:
+                os.makedirs(self.spill_dir, exist_ok=True)
+                spill = SpillFile(self.spill_dir, depth)
+                self.spills[depth] = spill
+                logger.info(f"Frontier spilling depth {depth} to {spill.path}")
+            spill.append(url)
+        else:
+            self.buckets.setdefault(depth, deque()).append(url)
+            self.in_memory += 1
+        return True
+    
+    def pop(self) -> Optional[Tuple[str, int]]:
+        """Pop the next URL from the shallowest non-empty depth"""
+        for depth in sorted(set(self.buckets) | set(self.spills)):
+            bucket = self.buckets.setdefault(depth, deque())
+            if not bucket:
+                self._refill(depth, bucket)
+            if bucket:
+                self.in_memory -= 1
+                return bucket.popleft(), depth
+        return None
+    
+    def _refill(self, depth: int, bucket: Deque[str]):
+        """Load a batch of spilled URLs for a depth back into memory"""
+        spill = self.spills.get(depth)
+        if spill is None or spill.count == 0:
+            return
+        batch = spill.read(max(1, (self.max_in_memory - self.in_memory) // 2))
+        bucket.extend(batch)
+        self.in_memory += len(batch)
+    
+    def close(self):
+        """Release spill files"""
+        for spill in self.spills.values():
+            spill.close()
+        self.spills.clear()
+        self.buckets.clear()
+        self.in_memory = 0
+
+
+class BestFirstFrontier:
+    """Crawl frontier that pops the highest-scoring URL first
+    
+    Scores come from a LinkScorer; ties go to the shallower URL, then to the
+    one queued first. URLs are deduplicated on enqueue (unless `dedup` is
+    False, when the caller dedups). Once more than
+    `max_in_memory` URLs are queued, the lowest-scoring half is dropped:
+    with a page budget those would never be reached anyway.
+    """
+    
+    def __init__(self, max_in_memory: Optional[int] = None, dedup: bool = True):
+        self.max_in_memory = max_in_memory or settings.frontier_max_in_memory
+        self.heap: List[Tuple[float, int, int, str]] = []
+        self.counter = itertools.count()
+        self.enqueued = SeenUrlSet() if dedup else None
+    
+    def __len__(self) -> int:
+        return len(self.heap)
+    
+    def push(self, url: str, depth: int, key: Optional[str] = None, score: float = 0.0, group: str = "") -> bool:
+        """Enqueue a URL with a relevance score, returns False if it was already seen
+        
+        `group` is ignored: wrap the frontier in a FairFrontier to split the budget.
+        """
+        key = key or url
+        if self.enqueued is not None:
+            if key in self.enqueued:
+                return False
+            self.enqueued.add(key)
+        
+        heapq.heappush(self.heap, (-score, depth, next(self.counter), url))
+        if len(self.heap) > self.max_in_memory:
+            self._prune()
+        return True
+    
+    def _prune(self):
+        """Keep the best-scoring half of the queue"""
+        keep = max(1, self.max_in_memory // 2)
+        dropped = len(self.heap) - keep
+        self.heap = heapq.nsmallest(keep, self.heap)
+        heapq.heapify(self.heap)
+        logger.info(f"Frontier full: dropped {dropped} lowest-scoring URLs")
+    
+    def pop(self) -> Optional[Tuple[str, int]]:
+        """Pop the highest-scoring URL"""
+        if not self.heap:
+            return None
+        _, depth, _, url = heapq.heappop(self.heap)
+        return url, depth
+    
+    def close(self):
+        """Release queued URLs"""
+        self.heap.clear()
+
+
+class FairFrontier:
+    """Crawl frontier sharing the page budget between groups of URLs
+    
+    A group is a seed or a domain. Each group gets its own sub-frontier
+    (breadth-first or best-first) and pops take turns between groups, so a
+    link-heavy seed cannot use up the budget before the others get past
+    depth 0. A group with weight N in `weights` gets N pops per turn
+    (default 1). Groups with nothing queued are skipped, which hands their
+    share to the others. URLs are deduplicated across groups here, once:
+    sub-frontiers are built with `make_frontier(dedup=False)`.
+    """
+    
+    def __init__(self, make_frontier: Callable[..., Union[CrawlFrontier, BestFirstFrontier]], weights: Optional[Dict[str, int]] = None):
+        self.make_frontier = make_frontier
+        self.weights = weights or {}
+        self.groups: Dict[str, Union[CrawlFrontier, BestFirstFrontier]] = {}
+        self.rotation: Deque[str] = deque()
+        self.turns_left = 0
+        self.enqueued = SeenUrlSet()
+        self.last_group = ""
+    
+    def __len__(self) -> int:
+        return sum(len(frontier) for frontier in self.groups.values())
+    
+    def push(self, url: str, depth: int, key: Optional[str] = None, score: float = 0.0, group: str = "") -> bool:
+        """Enqueue a URL in its group, returns False if it was already seen in any group"""
+        key = key or url
+        if key in self.enqueued:
+            return False
+        self.enqueued.add(key)
+        
+        frontier = self.groups.get(group)
+        if frontier is None:
+            frontier = self.make_frontier(dedup=False)
+            self.groups[group] = frontier
+            self.rotation.append(group)
+        return frontier.push(url, depth, key=key, score=score)
+    
+    def pop(self) -> Optional[Tuple[str, int]]:
+        """Pop the next URL of the group whose turn it is, sets `last_group`"""
+        for _ in range(len(self.rotation)):
+            group = self.rotation[0]
+            if self.turns_left <= 0:
+                self.turns_left = max(1, self.weights.get(group, 1))
+            entry = self.groups[group].pop()
+            if entry is None:
+                self.turns_left = 0
+                self.rotation.rotate(-1)
+                continue
+            self.turns_left -= 1
+            if self.turns_left == 0:
+                self.rotation.rotate(-1)
+            self.last_group = group
+            return entry
+        return None
+    
+    def close(self):
+        """Release every group's frontier"""
+        for frontier in self.groups.values():
+            frontier.close()
+        self.groups.clear()
+        self.rotation.clear()
@@ -0,0 +1,89 @@
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+from bs4 import BeautifulSoup, FeatureNotFound
+from app.config import settings
+from app.utils.logger import logger
+
+
+_resolved_backends = {}
+
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    """Get a usable BeautifulSoup tree builder, falling back to html.parser"""
+    backend = backend or settings.html_parser
+    if backend not in _resolved_backends:
+        try:
+            BeautifulSoup("", backend)
+            _resolved_backends[backend] = backend
+        except FeatureNotFound:
+            logger.warning(f"HTML parser '{backend}' not available, falling back to html.parser")
+            _resolved_backends[backend] = "html.parser"
+    return _resolved_backends[backend]
+
+
+def parse_html(markup, backend: Optional[str] = None) -> BeautifulSoup:
+    """Parse a page once with the configured backend
+    
+    The returned tree is shared by link extraction (see `link_info`) and
+    content cleaning (ContentCleaner), so a page is never parsed twice.
+    """
+    return BeautifulSoup(markup, resolve_backend(backend))
+
+
+def parse_page(page: Dict, backend: Optional[str] = None) -> BeautifulSoup:
+    """Parse a page from its raw body, decoding it only once
+    
+    Fetched pages carry the body as received ("content") and the charset
+    declared by the Content-Type header ("encoding"), if any. The parser
+    decodes the bytes itself, falling back to the page's <meta charset>, so
+    no separate decoding or charset detection pass is needed. Pages built
+    from text (e.g. by tests or callers that already decoded them) carry
+    "html" instead.
+    """
+    if page.get("content") is not None:
+        return BeautifulSoup(page["content"], resolve_backend(backend), from_encoding=page.get("encoding"))
+    return parse_html(page["html"], backend)
+
+
+def profile_text(soup: BeautifulSoup) -> str:
+    """Title, headings and description of a page (fed to LinkScorer.add_text for seed pages)"""
+    parts = [tag.get_text(" ") for tag in soup.find_all(["title", "h1", "h2", "h3"])]
+    description = soup.find("meta", attrs={"name": "description"})
+    if description and description.get("content"):
+        parts.append(description["content"])
+    return " ".join(parts)
+
+
+def page_links(soup: BeautifulSoup, base_url: str) -> List[Tuple[str, str]]:
+    """Absolute URL (without fragment) and anchor text (plus title attribute) of every link of a page"""
+    links = []
+    for tag in soup.find_all("a", href=True):
+        href = tag.get("href")
+        if not href:
+            continue
+        
+        # Resolve relative URLs and remove the fragment
+        parsed = urlparse(urljoin(base_url, href))
+        url = f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
+        if parsed.query:
+            url += f"?{parsed.query}"
+        
+        anchor = tag.get_text(" ", strip=True)
+        if tag.get("title"):
+            anchor = f"{anchor} {tag['title']}"
+        links.append((url, anchor))
+    return links
+
+
+def link_info(soup: BeautifulSoup, base_url: str, links: bool = True, profile: bool = False) -> Dict:
+    """What the crawler needs from a parsed page: canonical URL, links and seed profile
+    
+    Plain data, so it can be computed in a worker process along with the
+    page's chunks. Must run before cleaning, which drops navigation.
+    """
+    canonical = soup.find("link", rel="canonical", href=True)
+    return {
+        "canonical": canonical["href"] if canonical is not None else None,
+        "links": page_links(soup, base_url) if links else [],
+        "profile": profile_text(soup) if profile else "",
+    }
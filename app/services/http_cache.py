@@ -0,0 +1,222 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from app.config import settings
+from app.utils.logger import logger
+
+
+# Share of max_bytes the cache is brought back to when it overflows
+EVICT_TARGET = 0.9
+
+
+class HttpCache:
+    """On-disk HTTP cache with conditional revalidation, shared by all jobs
+    
+    Each URL is stored as a JSON metadata file (ETag, Last-Modified, content
+    type, store time) next to a body file. Concurrent requests for the same
+    URL are coalesced into a single in-flight fetch. File I/O runs in worker
+    threads, off the event loop. Once the bodies take more than `max_bytes`,
+    the entries least recently stored or revalidated are evicted down to
+    EVICT_TARGET of the limit.
+    """
+    
+    def __init__(self, cache_dir: Optional[str] = None, max_age: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.cache_dir = Path(cache_dir or Path(settings.data_dir) / "http_cache")
+        self.max_age = settings.http_cache_max_age if max_age is None else max_age
+        self.max_bytes = settings.http_cache_max_bytes if max_bytes is None else max_bytes
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._size: Optional[int] = None  # bytes of cached bodies, measured on the first store
+        self._size_lock = threading.Lock()
+    
+    def _key(self, url: str) -> str:
+        """Get the cache key for a URL"""
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+    
+    def _paths(self, url: str) -> Tuple[Path, Path]:
+        """Get the metadata and body paths for a URL"""
+        key = self._key(url)
+        directory = self.cache_dir / key[:2]
+        return directory / f"{key}.json", directory / f"{key}.body"
+    
+    async def load(self, url: str) -> Optional[Dict]:
+        """Load a cached entry (metadata + body), or None"""
+        return await asyncio.to_thread(self._load, url)
+    
+    def _load(self, url: str) -> Optional[Dict]:
+        """Read a cached entry from disk"""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            with open(body_path, "rb") as f:
+                entry["body"] = f.read()
+            return entry
+        except (OSError, ValueError):
+            return None
+    
+    def is_fresh(self, entry: Dict) -> bool:
+        """Check whether an entry can be served without revalidation"""
+        return time.time() - entry.get("stored_at", 0) < self.max_age
+    
+    def conditional_headers(self, entry: Optional[Dict]) -> Dict[str, str]:
+        """Build If-None-Match / If-Modified-Since headers for an entry"""
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+    
+    def _write_meta(self, meta_path: Path, meta: Dict):
+        """Atomically write a metadata file"""
+        tmp_path = meta_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+    
+    async def store(
+        self,
+        url: str,
+        headers,
+        content_type: str,
+        encoding: Optional[str],
+        body: bytes,
+        final_url: Optional[str] = None
+    ):
+        """Store a response body with its validators"""
+        if "no-store" in headers.get("cache-control", "").lower():
+            return
+        await asyncio.to_thread(self._store, url, headers, content_type, encoding, body, final_url)
+    
+    def _store(
+        self,
+        url: str,
+        headers,
+        content_type: str,
+        encoding: Optional[str],
+        body: bytes,
+        final_url: Optional[str] = None
+    ):
+        """Write a response body and its metadata to disk"""
+        meta_path, body_path = self._paths(url)
+        try:
+            meta_path.parent.mkdir(parents=True, exist_ok=True)
+            replaced = self._file_size(body_path)
+            tmp_path = body_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(body)
+            os.replace(tmp_path, body_path)
+            self._write_meta(meta_path, {
+                "url": url,
+                "final_url": final_url or url,
+                "etag": headers.get("etag"),
+                "last_modified": headers.get("last-modified"),
+                "content_type": content_type,
+                "encoding": encoding,
+                "headers": [[name, value] for name, value in headers.multi_items()],
+                "stored_at": time.time(),
+            })
+        except OSError as e:
+            logger.warning(f"Failed to cache {url}: {str(e)}")
+            return
+        self._account(len(body) - replaced)
+    
+    def _file_size(self, path: Path) -> int:
+        """Size of a file, 0 if it does not exist"""
+        try:
+            return path.stat().st_size
+        except OSError:
+            return 0
+    
+    def _account(self, delta: int):
+        """Track the bytes of cached bodies and evict entries past `max_bytes`"""
+        if self.max_bytes <= 0:
+            return
+        with self._size_lock:
+            if self._size is None:
+                self._size = sum(self._file_size(path) for path in self.cache_dir.glob("*/*.body"))
+            else:
+                self._size += delta
+            if self._size > self.max_bytes:
+                self._evict()
+    
+    def _evict(self):
+        """Delete the entries least recently stored or revalidated, down to EVICT_TARGET of `max_bytes`"""
+        entries = []
+        for meta_path in self.cache_dir.glob("*/*.json"):
+            try:
+                entries.append((meta_path.stat().st_mtime, meta_path))
+            except OSError:
+                continue
+        entries.sort()
+        target = int(self.max_bytes * EVICT_TARGET)
+        evicted = 0
+        for _, meta_path in entries:
+            if self._size <= target:
+                break
+            body_path = meta_path.with_suffix(".body")
+            size = self._file_size(body_path)
+            for path in (meta_path, body_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._size -= size
+            evicted += 1
+        logger.info(f"HTTP cache over {self.max_bytes} bytes: evicted {evicted} entries")
+    
+    async def refresh(self, url: str, entry: Dict, headers):
+        """Mark an entry as fresh again after a 304 response"""
+        await asyncio.to_thread(self._refresh, url, entry, headers)
+    
+    def _refresh(self, url: str, entry: Dict, headers):
+        """Rewrite an entry's metadata with its new validators and store time"""
+        meta = {key: value for key, value in entry.items() if key != "body"}
+        meta["etag"] = headers.get("etag") or meta.get("etag")
+        meta["last_modified"] = headers.get("last-modified") or meta.get("last_modified")
+        meta["stored_at"] = time.time()
+        try:
+            self._write_meta(self._paths(url)[0], meta)
+        except OSError as e:
+            logger.warning(f"Failed to refresh cache entry for {url}: {str(e)}")
+    
+    async def shared_fetch(self, url: str, fetch: Callable[[], Awaitable]) -> Tuple[object, bool]:
+        """Run `fetch` once per URL across concurrent callers
+        
+        Returns the result and whether it was shared from another caller's
+        in-flight request.
+        """
+        future = self._in_flight.get(url)
+        while future is not None:
+            await asyncio.wait([future])
+            if not future.cancelled():
+                return future.result(), True
+            # The leading caller was cancelled: take over the fetch
+            future = self._in_flight.get(url)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[url] = future
+        try:
+            result = await fetch()
+            future.set_result(result)
+            return result, False
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[url]
+
+
+# Global cache shared by every WebFetcher in the process
+http_cache = HttpCache()
@@ -0,0 +1,238 @@
+import asyncio
+import ipaddress
+import socket
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import httpcore
+import httpx
+from app.config import settings
+from app.services.cassette import Cassette, RecordingTransport, ReplayTransport
+from app.utils.logger import logger
+
+
+class CachingDNSBackend(httpcore.AsyncNetworkBackend):
+    """Network backend that caches DNS lookups in-process with a TTL
+    
+    Connections are opened to the cached IP address; TLS still uses the
+    original host name for SNI and certificate checks.
+    """
+    
+    def __init__(self, ttl: Optional[int] = None, backend: Optional[httpcore.AsyncNetworkBackend] = None):
+        self.ttl = settings.dns_cache_ttl if ttl is None else ttl
+        self.backend = backend or httpcore.AnyIOBackend()
+        self.entries: Dict[Tuple[str, int], Tuple[List[str], float]] = {}
+    
+    def _is_ip_address(self, host: str) -> bool:
+        """Check if a host is already an IP literal"""
+        try:
+            ipaddress.ip_address(host)
+            return True
+        except ValueError:
+            return False
+    
+    async def _resolve(self, host: str, port: int) -> List[str]:
+        """Resolve a host to IP addresses, using the cache when fresh"""
+        cached = self.entries.get((host, port))
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+        
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except OSError as e:
+            # Surface as a connect error so httpx maps it to httpx.ConnectError
+            raise httpcore.ConnectError(str(e)) from e
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        self.entries[(host, port)] = (addresses, time.monotonic() + self.ttl)
+        return addresses
+    
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        """Connect to the first reachable cached address of a host"""
+        if self._is_ip_address(host):
+            return await self.backend.connect_tcp(host, port, timeout, local_address, socket_options)
+        
+        last_error = None
+        for address in await self._resolve(host, port):
+            try:
+                return await self.backend.connect_tcp(address, port, timeout, local_address, socket_options)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                last_error = e
+        # Every cached address failed: forget them so the next attempt re-resolves
+        self.entries.pop((host, port), None)
+        raise last_error or httpcore.ConnectError(f"No address for {host}")
+    
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        """Delegate Unix socket connections"""
+        return await self.backend.connect_unix_socket(path, timeout, socket_options)
+    
+    async def sleep(self, seconds: float):
+        """Delegate sleeps"""
+        await self.backend.sleep(seconds)
+
+
+# httpcore errors and the httpx errors they surface as (most specific first in the MRO)
+HTTPCORE_ERRORS = {
+    httpcore.TimeoutException: httpx.TimeoutException,
+    httpcore.ConnectTimeout: httpx.ConnectTimeout,
+    httpcore.ReadTimeout: httpx.ReadTimeout,
+    httpcore.WriteTimeout: httpx.WriteTimeout,
+    httpcore.PoolTimeout: httpx.PoolTimeout,
+    httpcore.NetworkError: httpx.NetworkError,
+    httpcore.ConnectError: httpx.ConnectError,
+    httpcore.ReadError: httpx.ReadError,
+    httpcore.WriteError: httpx.WriteError,
+    httpcore.ProxyError: httpx.ProxyError,
+    httpcore.UnsupportedProtocol: httpx.UnsupportedProtocol,
+    httpcore.ProtocolError: httpx.ProtocolError,
+    httpcore.LocalProtocolError: httpx.LocalProtocolError,
+    httpcore.RemoteProtocolError: httpx.RemoteProtocolError,
+}
+
+
+def as_httpx_error(error: Exception) -> Exception:
+    """The httpx exception matching an httpcore one, or the error itself"""
+    for cls in type(error).__mro__:
+        if cls in HTTPCORE_ERRORS:
+            return HTTPCORE_ERRORS[cls](str(error))
+    return error
+
+
+class PoolResponseStream(httpx.AsyncByteStream):
+    """Response body of an httpcore pool, with httpcore errors mapped to httpx ones"""
+    
+    def __init__(self, stream):
+        self.stream = stream
+    
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        try:
+            async for part in self.stream:
+                yield part
+        except Exception as e:
+            mapped = as_httpx_error(e)
+            if mapped is e:
+                raise
+            raise mapped from e
+    
+    async def aclose(self):
+        if hasattr(self.stream, "aclose"):
+            await self.stream.aclose()
+
+
+class ConnectionPoolTransport(httpx.AsyncBaseTransport):
+    """httpx transport over an httpcore connection pool we configure ourselves
+    
+    httpx.AsyncHTTPTransport has no public way to set the network backend,
+    so the pool is built with httpcore's public API and this adapter turns
+    httpx requests into httpcore ones.
+    """
+    
+    def __init__(self, pool: httpcore.AsyncConnectionPool):
+        self.pool = pool
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(
+                scheme=request.url.raw_scheme,
+                host=request.url.raw_host,
+                port=request.url.port,
+                target=request.url.raw_path,
+            ),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions,
+        )
+        try:
+            response = await self.pool.handle_async_request(core_request)
+        except Exception as e:
+            mapped = as_httpx_error(e)
+            if mapped is e:
+                raise
+            raise mapped from e
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=PoolResponseStream(response.stream),
+            extensions=response.extensions,
+        )
+    
+    async def aclose(self):
+        await self.pool.aclose()
+
+
+class HttpClientPool:
+    """Application-scoped HTTP client shared by every crawl job
+    
+    Created at startup and closed at shutdown, so jobs reuse keep-alive
+    connections, TLS sessions and cached DNS answers instead of paying for
+    them on every job.
+    """
+    
+    def __init__(self):
+        self.client: Optional[httpx.AsyncClient] = None
+    
+    def _http2_available(self) -> bool:
+        """HTTP/2 needs the optional h2 package"""
+        if not settings.fetch_http2:
+            return False
+        try:
+            import h2  # noqa: F401
+            return True
+        except ImportError:
+            logger.warning("HTTP/2 requested but h2 is not installed (pip install h2), using HTTP/1.1")
+            return False
+    
+    def _build_transport(self) -> httpx.AsyncBaseTransport:
+        """Build the transport, wrapped for cassette recording or replaced for replay"""
+        mode = settings.http_cassette_mode
+        if mode == "replay":
+            return ReplayTransport(Cassette(settings.http_cassette_path))
+        transport = self._build_network_transport()
+        if mode == "record":
+            logger.info(f"Recording HTTP exchanges to {settings.http_cassette_path}")
+            return RecordingTransport(transport, Cassette(settings.http_cassette_path))
+        if mode != "off":
+            raise ValueError(f"Unknown HTTP cassette mode: {mode}")
+        return transport
+    
+    def _build_network_transport(self) -> httpx.AsyncBaseTransport:
+        """Build a transport with tuned pool limits and the DNS cache"""
+        http2 = self._http2_available()
+        pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(),
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive,
+            keepalive_expiry=settings.http_keepalive_expiry,
+            http1=True,
+            http2=http2,
+            network_backend=CachingDNSBackend(),
+        )
+        return ConnectionPoolTransport(pool)
+    
+    def get_client(self) -> httpx.AsyncClient:
+        """Get the shared client, creating it on first use"""
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                timeout=settings.fetch_timeout,
+                follow_redirects=True,
+                headers={"User-Agent": settings.fetch_user_agent},
+                transport=self._build_transport(),
+            )
+        return self.client
+    
+    async def start(self):
+        """Create the shared client (application startup)"""
+        self.get_client()
+        logger.info(
+            f"HTTP client pool ready (max {settings.http_max_connections} connections, "
+            f"HTTP/2: {self._http2_available()})"
+        )
+    
+    async def close(self):
+        """Close the shared client (application shutdown)"""
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+
+# Global client pool shared by every WebFetcher in the process
+http_client_pool = HttpClientPool()
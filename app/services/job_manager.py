@@ -1,21 +1,38 @@
 import uuid
+import json
+import os
 import asyncio
-from typing import Dict, Optional
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
 from datetime import datetime
+from app.config import settings
 from app.schemas import JobState
 from app.utils.logger import logger
+from app.services.bulk_ingest import BulkIngestor, iter_source_pages
+from app.services.checkpoint import CrawlCheckpoint
 from app.services.fetcher import WebFetcher
-from app.services.cleaner import ContentCleaner
+from app.services.http_cache import HttpCache
 from app.services.embedder import EmbeddingService
+from app.services.page_archive import PageArchive
+from app.services.page_hashes import PageHashes
+from app.services.pipeline import EmbeddingError, IngestionPipeline
+from app.services.push_ingest import PushStream
+from app.services.refresh import JobRefresher
+from app.services.templates import JobTemplates
 from app.services.vector_store import VectorStore
 
 
 class JobManager:
     """Manages ingestion jobs and their state"""
     
-    def __init__(self):
+    def __init__(self, jobs_dir: Optional[str] = None):
         self.jobs: Dict[str, Dict] = {}
         self.embedding_service = None  # Lazy initialization
+        # Job records are persisted so jobs survive a restart
+        self.jobs_dir = Path(jobs_dir or Path(settings.data_dir) / "jobs")
+        self.tasks = set()
+        self.refreshing = set()
+        self.reprocessing = set()
     
     def _get_embedding_service(self):
         """Lazy initialization of embedding service"""
@@ -33,9 +50,21 @@ class JobManager:
         domain_allowlist: list,
         max_pages: int,
         max_depth: int,
-        user_notes: Optional[str] = None
+        user_notes: Optional[str] = None,
+        discover_sitemaps: bool = False,
+        include_patterns: Optional[List[str]] = None,
+        exclude_patterns: Optional[List[str]] = None,
+        crawl_strategy: str = "bfs",
+        refresh_interval_hours: Optional[float] = None,
+        budget_split: str = "seed",
+        budget_weights: Optional[Dict[str, int]] = None,
+        source: Optional[str] = None
     ) -> str:
-        """Create a new ingestion job"""
+        """Create a new ingestion job
+        
+        `source` is set for jobs that index pages without crawling: "push",
+        or the directory or WARC file of a bulk ingestion.
+        """
         job_id = str(uuid.uuid4())
         
         self.jobs[job_id] = {
@@ -46,20 +75,71 @@ class JobManager:
             "max_pages": max_pages,
             "max_depth": max_depth,
             "user_notes": user_notes,
+            "discover_sitemaps": discover_sitemaps,
+            "include_patterns": include_patterns,
+            "exclude_patterns": exclude_patterns,
+            "crawl_strategy": crawl_strategy,
+            "refresh_interval_hours": refresh_interval_hours,
+            "budget_split": budget_split,
+            "budget_weights": budget_weights,
+            "source": source,
+            # Process running the job, to tell a running bulk ingestion from a crashed one
+            "pid": os.getpid() if source else None,
+            "last_refreshed_at": None,
+            "refreshing": False,
+            "reprocessing": False,
+            "last_reprocessed_at": None,
+            "reprocess_error": None,
             "pages_fetched": 0,
             "pages_indexed": 0,
+            "cache_hits": 0,
+            "cache_revalidations": 0,
+            "shared_fetches": 0,
             "error": None,
             "created_at": datetime.utcnow().isoformat(),
             "updated_at": datetime.utcnow().isoformat()
         }
         
+        self._save_job(job_id)
+        
         logger.info(f"Created job {job_id}")
         return job_id
     
     def get_job(self, job_id: str) -> Optional[Dict]:
-        """Get job status"""
+        """Get job status
+        
+        Jobs written by another process (e.g. the bulk ingestion CLI) are
+        loaded from disk on first access, and again on every access until
+        they are finished.
+        """
+        job = self.jobs.get(job_id)
+        if job is None or self._is_external(job):
+            try:
+                if str(uuid.UUID(job_id)) != job_id:
+                    return None
+            except ValueError:
+                return None
+            job = self._read_job(self.jobs_dir / f"{job_id}.json")
+            if job:
+                self.jobs[job_id] = job
         return self.jobs.get(job_id)
     
+    def _is_external(self, job: Dict) -> bool:
+        """Whether an unfinished job is run by another process (bulk ingestions run in the CLI)"""
+        return job["state"] in (JobState.QUEUED, JobState.RUNNING) and job.get("source") not in (None, "push")
+    
+    def _is_process_alive(self, pid: Optional[int]) -> bool:
+        """Check whether a process exists"""
+        if not pid:
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+    
     def update_job_state(self, job_id: str, state: JobState, **kwargs):
         """Update job state and metadata"""
         if job_id in self.jobs:
@@ -67,6 +147,123 @@ class JobManager:
             self.jobs[job_id]["updated_at"] = datetime.utcnow().isoformat()
             for key, value in kwargs.items():
                 self.jobs[job_id][key] = value
+            self._save_job(job_id)
+    
+    def _save_job(self, job_id: str):
+        """Write a job record to disk (atomically, via a temporary file)"""
+        try:
+            self.jobs_dir.mkdir(parents=True, exist_ok=True)
+            path = self.jobs_dir / f"{job_id}.json"
+            tmp_path = path.with_suffix(".json.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.jobs[job_id], f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Failed to persist job {job_id}: {str(e)}")
+    
+    def load_jobs(self) -> List[str]:
+        """Load persisted job records, returns the ids of unfinished jobs"""
+        unfinished = []
+        if not self.jobs_dir.exists():
+            return unfinished
+        
+        for path in sorted(self.jobs_dir.glob("*.json")):
+            job = self._read_job(path)
+            if not job:
+                continue
+            self.jobs[job["job_id"]] = job
+            if job["state"] not in (JobState.QUEUED, JobState.RUNNING):
+                continue
+            if job.get("source") == "push":
+                # The upload died with the previous process and cannot be resumed
+                self.update_job_state(job["job_id"], JobState.FAILED, error="Interrupted during upload")
+            elif job.get("source"):
+                # A bulk ingestion whose CLI process is gone will never finish
+                if not self._is_process_alive(job.get("pid")):
+                    self.update_job_state(job["job_id"], JobState.FAILED, error="Interrupted: the ingestion process exited")
+            else:
+                # Only crawl jobs are resumed; bulk jobs run in their own process
+                unfinished.append(job["job_id"])
+        
+        logger.info(f"Loaded {len(self.jobs)} jobs ({len(unfinished)} unfinished)")
+        return unfinished
+    
+    def _read_job(self, path: Path) -> Optional[Dict]:
+        """Read a persisted job record, None if missing or unreadable"""
+        if not path.exists():
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                job = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Skipping unreadable job record {path}: {str(e)}")
+            return None
+        job["state"] = JobState(job["state"])
+        # Refreshes and reprocesses run in the API process and do not survive it
+        job["refreshing"] = False
+        job["reprocessing"] = False
+        return job
+    
+    def resume_jobs(self):
+        """Reload persisted jobs and restart the unfinished ones from their checkpoints"""
+        for job_id in self.load_jobs():
+            logger.info(f"Job {job_id}: Resuming after restart")
+            task = asyncio.create_task(self.process_job(job_id))
+            # Keep a reference so the task is not garbage collected
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+    
+    def prepare_reprocess(self, job_id: str) -> int:
+        """Mark a finished job as reprocessing from its page archive (see `reprocess_job`)
+        
+        Returns the number of archived pages (0 if there is no archive, in
+        which case the job is left as is).
+        """
+        archived = len(PageArchive(job_id))
+        if archived:
+            self.reprocessing.add(job_id)
+            self.update_job_state(job_id, self.jobs[job_id]["state"], reprocessing=True, reprocess_error=None)
+        return archived
+    
+    async def reprocess_job(self, job_id: str):
+        """Rebuild a job's index from its page archive, without refetching
+        
+        Like a refresh, the job keeps its state and answers /ask from its
+        current index until the rebuilt one is published. A failed
+        reprocess is recorded in `reprocess_error` and leaves the current
+        index in place.
+        """
+        job = self.get_job(job_id)
+        if not job:
+            self.reprocessing.discard(job_id)
+            return
+        
+        logger.info(f"Job {job_id}: Reprocessing from archive")
+        state = job["state"]
+        reprocess = {"last_reprocessed_at": datetime.utcnow().isoformat(), "reprocess_error": None}
+        try:
+            vector_store = VectorStore(job_id)
+            pipeline = IngestionPipeline(self._get_embedding_service(), vector_store)
+            stats = await pipeline.run(PageArchive(job_id).replay)
+            if not stats["chunks_indexed"]:
+                raise RuntimeError("Archived pages produced no chunks, keeping the current index")
+            vector_store.save()
+            PageHashes(job_id).save(pipeline.page_hashes)
+            JobTemplates(job_id).save(pipeline.cleaner.templates)
+            state = JobState.DONE
+            reprocess.update(pages_indexed=stats["chunks_indexed"], error=None)
+        except EmbeddingError as e:
+            reprocess["reprocess_error"] = self._embedding_error_detail(str(e))
+        except Exception as e:
+            reprocess["reprocess_error"] = str(e)
+        finally:
+            self.reprocessing.discard(job_id)
+        
+        if reprocess["reprocess_error"]:
+            logger.error(f"Job {job_id}: Reprocess failed: {reprocess['reprocess_error']}")
+        else:
+            logger.info(f"Job {job_id}: Reprocessed, {reprocess['pages_indexed']} chunks indexed")
+        self.update_job_state(job_id, state, reprocessing=False, **reprocess)
     
     async def process_job(self, job_id: str):
         """Process an ingestion job asynchronously"""
@@ -75,64 +272,76 @@ class JobManager:
             logger.error(f"Job {job_id} not found")
             return
         
+        archive = PageArchive(job_id) if settings.page_archive_enabled else None
+        # Crawl progress is journaled so a restart resumes instead of starting over
+        checkpoint = None
+        if settings.crawl_checkpoints_enabled:
+            checkpoint = CrawlCheckpoint(job_id)
+        
         try:
             self.update_job_state(job_id, JobState.RUNNING)
             
-            # Step 1: Fetch pages
-            logger.info(f"Job {job_id}: Starting fetch phase")
+            # Fetch, clean, embed and index run as concurrent stages: pages are
+            # parsed once in the cleaning pool, for their links and chunks,
+            # and chunks are embedded and indexed batch by batch
+            embedding_service = self._get_embedding_service()
+            vector_store = VectorStore(job_id)
+            pipeline = IngestionPipeline(
+                embedding_service,
+                vector_store,
+                archive=archive,
+                on_progress=lambda stats: self.update_job_state(
+                    job_id,
+                    JobState.RUNNING,
+                    pages_fetched=stats["pages_fetched"],
+                    pages_indexed=stats["chunks_indexed"]
+                )
+            )
+            
+            logger.info(f"Job {job_id}: Starting ingestion pipeline")
             async with WebFetcher() as fetcher:
-                pages = await fetcher.crawl(
+                crawl = lambda on_page: fetcher.crawl(
                     seed_urls=job["seed_urls"],
                     domain_allowlist=job["domain_allowlist"],
                     max_pages=job["max_pages"],
-                    max_depth=job["max_depth"]
+                    max_depth=job["max_depth"],
+                    discover=job.get("discover_sitemaps", False),
+                    on_page=on_page,
+                    checkpoint=checkpoint,
+                    include_patterns=job.get("include_patterns"),
+                    exclude_patterns=job.get("exclude_patterns"),
+                    strategy=job.get("crawl_strategy", "bfs"),
+                    user_notes=job.get("user_notes"),
+                    budget_split=job.get("budget_split", "seed"),
+                    budget_weights=job.get("budget_weights"),
+                    process_page=pipeline.process_page
                 )
+                try:
+                    stats = await pipeline.run(crawl)
+                except EmbeddingError as e:
+                    error_detail = self._embedding_error_detail(str(e))
+                    logger.error(f"Job {job_id}: {error_detail}")
+                    self.update_job_state(job_id, JobState.FAILED, error=error_detail)
+                    return
             
-            self.update_job_state(job_id, JobState.RUNNING, pages_fetched=len(pages))
+            self.update_job_state(job_id, JobState.RUNNING, pages_fetched=stats["pages_fetched"], **fetcher.stats)
             
-            if not pages:
+            if not stats["pages_fetched"]:
                 self.update_job_state(job_id, JobState.FAILED, error="No pages fetched")
                 return
             
-            # Step 2: Clean and chunk
-            logger.info(f"Job {job_id}: Starting cleaning phase")
-            cleaner = ContentCleaner()
-            chunks = cleaner.clean_and_chunk(pages)
-            
-            if not chunks:
+            if not stats["chunks_indexed"]:
                 self.update_job_state(job_id, JobState.FAILED, error="No chunks created")
                 return
             
-            # Step 3: Generate embeddings
-            logger.info(f"Job {job_id}: Starting embedding phase ({len(chunks)} chunks)")
-            texts = [chunk["text"] for chunk in chunks]
-            embedding_service = self._get_embedding_service()
-            try:
-                embeddings = await embedding_service.embed_texts(texts)
-            except Exception as e:
-                error_msg = str(e)
-                # Check for quota/rate limit errors
-                if "429" in error_msg or "insufficient_quota" in error_msg.lower() or "rate_limit" in error_msg.lower():
-                    error_detail = "OpenAI API quota exceeded. Please check your API key billing or switch to local embeddings (set EMBEDDING_PROVIDER=local in .env and install sentence-transformers)"
-                elif "no embedding provider" in error_msg.lower() or "sentence-transformers" in error_msg.lower():
-                    error_detail = "No embedding provider available. Install sentence-transformers: pip install sentence-transformers"
-                else:
-                    error_detail = f"Embedding error: {error_msg}"
-                
-                logger.error(f"Job {job_id}: {error_detail}")
-                self.update_job_state(job_id, JobState.FAILED, error=error_detail)
-                return
-            
-            # Step 4: Index in vector store
-            logger.info(f"Job {job_id}: Starting indexing phase")
-            vector_store = VectorStore(job_id)
-            vector_store.add_chunks(chunks, embeddings)
             vector_store.save()
+            PageHashes(job_id).save(pipeline.page_hashes)
+            JobTemplates(job_id).save(pipeline.cleaner.templates)
             
             self.update_job_state(
                 job_id,
                 JobState.DONE,
-                pages_indexed=len(chunks)
+                pages_indexed=stats["chunks_indexed"]
             )
             
             logger.info(f"Job {job_id}: Completed successfully")
@@ -141,6 +350,141 @@ class JobManager:
             error_msg = str(e)
             logger.error(f"Job {job_id}: Failed with error: {error_msg}")
             self.update_job_state(job_id, JobState.FAILED, error=error_msg)
+        
+        finally:
+            # Keep the checkpoint if the job was interrupted (e.g. shutdown)
+            if checkpoint and self.jobs[job_id]["state"] in (JobState.DONE, JobState.FAILED):
+                checkpoint.clear()
+    
+    async def ingest_local(
+        self,
+        source: str,
+        base_url: Optional[str] = None,
+        user_notes: Optional[str] = None,
+        workers: Optional[int] = None,
+        batch_size: Optional[int] = None
+    ) -> str:
+        """Index a local HTML directory or WARC file as a regular job, without crawling
+        
+        Returns the job id, which /status and /ask accept like any other.
+        """
+        job_id = self.create_job([source], [], max_pages=0, max_depth=0, user_notes=user_notes, source=source)
+        
+        async def run(vector_store: VectorStore) -> Dict[str, int]:
+            ingestor = BulkIngestor(self._get_embedding_service(), vector_store, workers=workers, batch_size=batch_size)
+            return await ingestor.run(iter_source_pages(source, base_url))
+        
+        await self._index_job(job_id, source, run)
+        return job_id
+    
+    async def ingest_push(self, job_id: str, stream: PushStream) -> Dict:
+        """Clean, embed and index pages pushed by a client as they are uploaded
+        
+        Pages go through the same streaming pipeline as crawled ones, so the
+        upload is throttled by the clean and embed stages rather than
+        buffered. Returns the job record.
+        """
+        async def receive(on_page: Callable) -> List[Dict]:
+            pages = []
+            async for page in stream.pages():
+                await on_page(page, None)
+                pages.append({key: value for key, value in page.items() if key not in ("html", "text")})
+            return pages
+        
+        async def run(vector_store: VectorStore) -> Dict[str, int]:
+            pipeline = IngestionPipeline(
+                self._get_embedding_service(),
+                vector_store,
+                archive=PageArchive(job_id) if settings.page_archive_enabled else None,
+                on_progress=lambda stats: self.update_job_state(
+                    job_id,
+                    JobState.RUNNING,
+                    pages_fetched=stats["pages_fetched"],
+                    pages_indexed=stats["chunks_indexed"]
+                )
+            )
+            return await pipeline.run(receive)
+        
+        await self._index_job(job_id, "push", run)
+        return self.jobs[job_id]
+    
+    async def _index_job(self, job_id: str, source: str, run: Callable[[VectorStore], Awaitable[Dict]]):
+        """Run a job that indexes pages without crawling, and record its outcome"""
+        self.update_job_state(job_id, JobState.RUNNING, source=source)
+        
+        try:
+            vector_store = VectorStore(job_id)
+            stats = await run(vector_store)
+        except EmbeddingError as e:
+            error_detail = self._embedding_error_detail(str(e))
+            logger.error(f"Job {job_id}: {error_detail}")
+            self.update_job_state(job_id, JobState.FAILED, error=error_detail)
+            return
+        except Exception as e:
+            logger.error(f"Job {job_id}: Failed with error: {str(e)}")
+            self.update_job_state(job_id, JobState.FAILED, error=str(e))
+            return
+        
+        self.update_job_state(job_id, JobState.RUNNING, pages_fetched=stats["pages_fetched"])
+        if not stats["chunks_indexed"]:
+            error = "No pages found" if not stats["pages_fetched"] else "No chunks created"
+            self.update_job_state(job_id, JobState.FAILED, error=error)
+            return
+        
+        vector_store.save()
+        self.update_job_state(job_id, JobState.DONE, pages_indexed=stats["chunks_indexed"])
+        logger.info(f"Job {job_id}: Indexed {stats['pages_fetched']} pages from {source}")
+    
+    def is_refreshable(self, job: Dict) -> bool:
+        """Only finished crawl jobs can be refreshed (pushed and local pages have no URL to refetch)"""
+        return job["state"] == JobState.DONE and not job.get("source") and not job.get("reprocessing")
+    
+    async def refresh_job(self, job_id: str):
+        """Re-crawl a finished job and re-index the pages that changed
+        
+        The job stays DONE and keeps answering /ask from its current index
+        until the refreshed one is published.
+        """
+        job = self.get_job(job_id)
+        if not job or not self.is_refreshable(job) or job_id in self.refreshing:
+            return
+        
+        self.refreshing.add(job_id)
+        self.update_job_state(job_id, job["state"], refreshing=True)
+        logger.info(f"Job {job_id}: Refreshing")
+        refresh = {"last_refreshed_at": datetime.utcnow().isoformat(), "refresh_error": None}
+        try:
+            # max_age=0: every page is revalidated with a conditional request
+            async with WebFetcher(cache=HttpCache(max_age=0)) as fetcher:
+                archive = PageArchive(job_id)
+                refresher = JobRefresher(
+                    self._get_embedding_service(),
+                    fetcher,
+                    # An existing archive is kept current even if archiving was since disabled
+                    archive=archive if settings.page_archive_enabled or len(archive) else None
+                )
+                # A reprocess started meanwhile rebuilds the index; it must not be overwritten
+                stats = await refresher.refresh(job, can_publish=lambda: job_id not in self.reprocessing)
+            refresh.update(refresh_stats=stats, pages_indexed=stats["chunks_total"])
+        except EmbeddingError as e:
+            refresh["refresh_error"] = self._embedding_error_detail(str(e))
+        except Exception as e:
+            refresh["refresh_error"] = str(e)
+        finally:
+            self.refreshing.discard(job_id)
+        
+        if refresh["refresh_error"]:
+            logger.error(f"Job {job_id}: Refresh failed: {refresh['refresh_error']}")
+        self.update_job_state(job_id, job["state"], refreshing=False, **refresh)
+    
+    def _embedding_error_detail(self, error_msg: str) -> str:
+        """User-facing explanation of an embedding failure"""
+        # Check for quota/rate limit errors
+        if "429" in error_msg or "insufficient_quota" in error_msg.lower() or "rate_limit" in error_msg.lower():
+            return "OpenAI API quota exceeded. Please check your API key billing or switch to local embeddings (set EMBEDDING_PROVIDER=local in .env and install sentence-transformers)"
+        elif "no embedding provider" in error_msg.lower() or "sentence-transformers" in error_msg.lower():
+            return "No embedding provider available. Install sentence-transformers: pip install sentence-transformers"
+        return f"Embedding error: {error_msg}"
     
     def get_vector_store(self, job_id: str) -> Optional[VectorStore]:
         """Get vector store for a job"""
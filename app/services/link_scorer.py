@@ -0,0 +1,69 @@
+import math
+import re
+from collections import Counter
+from typing import List, Optional
+from urllib.parse import unquote, urlsplit
+
+
+TOKEN_PATTERN = re.compile(r"[^\W\d_]{3,}")
+
+# Common English and French words that say nothing about a page's topic
+STOPWORDS = frozenset({
+    "the", "and", "for", "with", "from", "that", "this", "are", "was", "you", "your",
+    "our", "not", "but", "all", "can", "has", "have", "how", "what", "when", "where",
+    "who", "why", "will", "more", "about", "into", "out", "www", "http", "https",
+    "html", "htm", "php", "aspx", "index", "les", "des", "une", "pour", "dans", "par",
+    "sur", "avec", "est", "sont", "pas", "plus", "que", "qui", "aux", "ces", "son",
+})
+
+# Listing and navigation pages rarely answer questions themselves
+LISTING_PATTERN = re.compile(
+    r"/(category|categories|categorie|tag|tags|archive|archives|author|authors|page|search|feed|login|signup|cart)(/|$)",
+    re.IGNORECASE,
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens, without digits, short words or stopwords"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class LinkScorer:
+    """Cheap lexical relevance score for candidate links (best-first crawling)
+    
+    The job's profile is a bag of words built from `user_notes` and from the
+    titles, headings and descriptions of the seed pages. A link scores by
+    how many profile words appear in its anchor text (weighted double) and
+    URL path, normalized by the number of distinct words so long anchors are
+    not favored. Listing pages (categories, tags, archives, ...) score half.
+    """
+    
+    ANCHOR_WEIGHT = 2.0
+    NOTES_WEIGHT = 2.0
+    LISTING_FACTOR = 0.5
+    
+    def __init__(self, notes: Optional[str] = None):
+        self.profile: Counter = Counter()
+        if notes:
+            self.add_text(notes, weight=self.NOTES_WEIGHT)
+    
+    def add_text(self, text: str, weight: float = 1.0):
+        """Add the words of a text to the profile"""
+        for token in set(tokenize(text)):
+            self.profile[token] += weight
+    
+    def score(self, url: str, anchor: str = "") -> float:
+        """Relevance of a link from its URL and anchor text"""
+        path = unquote(urlsplit(url).path)
+        url_tokens = set(tokenize(re.sub(r"[-_/.+]", " ", path)))
+        anchor_tokens = set(tokenize(anchor))
+        if not url_tokens and not anchor_tokens:
+            return 0.0
+        
+        matched = sum(self.profile.get(token, 0.0) for token in url_tokens)
+        matched += self.ANCHOR_WEIGHT * sum(self.profile.get(token, 0.0) for token in anchor_tokens)
+        score = matched / math.sqrt(len(url_tokens | anchor_tokens))
+        
+        if LISTING_PATTERN.search(path):
+            score *= self.LISTING_FACTOR
+        return score
@@ -0,0 +1,101 @@
+import zlib
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.config import settings
+
+
+SHINGLE_SIZE = 5
+# Odd multipliers combining the hashes of the words of a shingle
+SHINGLE_MIX = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93, 0xFF51AFD7ED558CCD], dtype=np.uint64)
+
+
+def shingles(text: str) -> np.ndarray:
+    """Distinct 64-bit hashes of the word 5-grams of a text (lowercased, split on whitespace)"""
+    words = np.fromiter(map(zlib.crc32, text.lower().encode().split()), dtype=np.uint64)
+    if not len(words):
+        words = np.zeros(1, dtype=np.uint64)
+    count = max(1, len(words) - SHINGLE_SIZE + 1)
+    hashes = np.zeros(count, dtype=np.uint64)
+    for offset, mix in enumerate(SHINGLE_MIX[:len(words)]):
+        hashes += words[offset:offset + count] * mix
+    return np.unique(hashes)
+
+
+def lsh_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """(bands, rows) with the most rows per band that still finds pairs at `threshold` 95% of the time
+    
+    More rows per band means fewer candidates to verify; a pair with
+    similarity s shares at least one band with probability
+    1 - (1 - s^rows)^bands.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        if 1 - (1 - threshold ** rows) ** bands >= 0.95:
+            best = (bands, rows)
+    return best
+
+
+class NearDuplicateIndex:
+    """MinHash LSH index of texts, to find near-duplicates before embedding
+    
+    Each text is reduced to `num_perm` MinHash values over its word
+    5-grams (shingles); the fraction of equal values estimates the Jaccard similarity
+    of two texts. Signatures are split into bands, and only texts sharing a
+    band bucket are compared, so a lookup costs about the same with 100
+    texts indexed or 100k.
+    """
+    
+    def __init__(self, threshold: Optional[float] = None, num_perm: Optional[int] = None):
+        self.threshold = settings.near_dup_threshold if threshold is None else threshold
+        self.num_perm = num_perm or settings.near_dup_num_perm
+        self.bands, self.rows = lsh_bands(self.threshold, self.num_perm)
+        # Fixed seed: signatures must be comparable across calls and jobs
+        rng = np.random.default_rng(1)
+        self.a = rng.integers(0, 2 ** 63, self.num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, self.num_perm, dtype=np.uint64)
+        self.buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(self.bands)]
+        self.signatures: Dict[str, np.ndarray] = {}
+    
+    def __len__(self) -> int:
+        return len(self.signatures)
+    
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature of a text
+        
+        Each of the `num_perm` hash functions is a multiply-shift hash
+        (a * x + b modulo 2**64, top 32 bits), which numpy computes with
+        wrapping integer arithmetic instead of a modulo.
+        """
+        hashes = shingles(text)
+        return ((self.a[:, None] * hashes[None, :] + self.b[:, None]) >> np.uint64(32)).min(axis=1).astype(np.uint32)
+    
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+    
+    def add(self, key: str, text: str) -> Optional[str]:
+        """Index a text, unless it is a near-duplicate of an indexed one
+        
+        Returns the key of the similar text (the new one is not indexed),
+        or None.
+        """
+        signature = self.signature(text)
+        band_keys = self._band_keys(signature)
+        checked = set()
+        for bucket, band_key in zip(self.buckets, band_keys):
+            for candidate in bucket.get(band_key, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                if np.mean(self.signatures[candidate] == signature) >= self.threshold:
+                    return candidate
+        
+        self.signatures[key] = signature
+        for bucket, band_key in zip(self.buckets, band_keys):
+            bucket.setdefault(band_key, []).append(key)
+        return None
+    
+    def clear(self):
+        """Forget every indexed text"""
+        self.buckets = [{} for _ in range(self.bands)]
+        self.signatures.clear()
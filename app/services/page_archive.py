@@ -0,0 +1,270 @@
+import gzip
+import json
+import uuid
+import zlib
+from http import HTTPStatus
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional
+from app.config import settings
+from app.utils.logger import logger
+
+
+# Describe the stored body rather than the original transfer; the body is
+# archived as received, minus any content-encoding (gzip, br...)
+DROPPED_HEADERS = frozenset({"content-type", "content-length", "content-encoding", "transfer-encoding"})
+
+# WARC field holding the title pushed with a page, if any
+TITLE_HEADER = "X-Page-Title"
+
+
+class PageArchive:
+    """Append-only archive of a job's fetched pages, used to reprocess without refetching
+    
+    Pages are written as WARC/1.1 response records (HTTP status line, headers
+    and body), each compressed as its own gzip member, so the file is a
+    regular .warc.gz that standard WARC tools can read. A JSONL index holds
+    the offset and length of every record for direct access. A later index
+    entry for a URL supersedes the earlier ones, which is how refreshed
+    pages replace their old body without rewriting the file.
+    """
+    
+    def __init__(self, job_id: str, archive_dir: Optional[str] = None):
+        directory = Path(archive_dir or Path(settings.data_dir) / "archives")
+        self.path = directory / f"{job_id}.warc.gz"
+        self.index_path = directory / f"{job_id}.idx.jsonl"
+        self.urls = set(entry["url"] for entry in self._read_index())
+    
+    def __len__(self) -> int:
+        return len(self.urls)
+    
+    def _read_index(self) -> List[Dict]:
+        """Read the current record of every URL, in first fetch order, ignoring a torn last line"""
+        entries: Dict[str, Dict] = {}
+        if not self.index_path.exists():
+            return []
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                if entry.get("removed"):
+                    entries.pop(entry["url"], None)
+                else:
+                    entries[entry["url"]] = entry
+        return list(entries.values())
+    
+    def _write_index_entry(self, entry: Dict):
+        """Append an entry to the offset index"""
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+    
+    def _build_record(self, page: Dict) -> bytes:
+        """Serialize a page as a WARC response record"""
+        default_type = "text/html"
+        if page.get("content") is not None:
+            body = page["content"]
+            encoding = page.get("encoding")
+        elif page.get("html") is not None:
+            body = page["html"].encode("utf-8")
+            encoding = "utf-8"
+        else:
+            # Pages pushed as plain text are kept as text/plain responses
+            body = page["text"].encode("utf-8")
+            encoding = "utf-8"
+            default_type = "text/plain"
+        status = page.get("status_code", 200)
+        try:
+            reason = HTTPStatus(status).phrase
+        except ValueError:
+            reason = ""
+        
+        media_type = (page.get("content_type") or default_type).split(";")[0].strip()
+        http_lines = [f"HTTP/1.1 {status} {reason}"]
+        http_lines += [
+            f"{name}: {value}"
+            for name, value in page.get("headers", [])
+            if name.lower() not in DROPPED_HEADERS
+        ]
+        content_type = f"{media_type}; charset={encoding}" if encoding else media_type
+        http_lines += [f"Content-Type: {content_type}", f"Content-Length: {len(body)}"]
+        block = ("\r\n".join(http_lines) + "\r\n\r\n").encode("utf-8") + body
+        
+        warc_lines = [
+            "WARC/1.1",
+            "WARC-Type: response",
+            f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>",
+            f"WARC-Date: {page['fetched_at'][:19]}Z",
+            f"WARC-Target-URI: {page['url']}",
+            "Content-Type: application/http; msgtype=response",
+            f"Content-Length: {len(block)}",
+        ]
+        if page.get("title"):
+            # A title pushed with the page wins over the extracted one
+            warc_lines.append(f"{TITLE_HEADER}: {' '.join(page['title'].split())}")
+        return ("\r\n".join(warc_lines) + "\r\n\r\n").encode("utf-8") + block + b"\r\n\r\n"
+    
+    def _parse_record(self, record: bytes) -> Dict:
+        """Rebuild a page from a WARC response record"""
+        warc_head, _, rest = record.partition(b"\r\n\r\n")
+        warc_headers = _parse_headers(warc_head.decode("utf-8").split("\r\n")[1:])
+        return _parse_response(warc_headers, rest[:int(warc_headers["content-length"])])
+    
+    def append(self, page: Dict, replace: bool = False):
+        """Archive a page, once per URL unless `replace` supersedes its previous record"""
+        if page["url"] in self.urls and not replace:
+            return
+        if all(page.get(key) is None for key in ("content", "html", "text")):
+            return
+        record = gzip.compress(self._build_record(page))
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "ab") as f:
+                offset = f.tell()
+                f.write(record)
+            # The index is written after the record, so it never points past the data
+            self._write_index_entry({
+                "url": page["url"],
+                "offset": offset,
+                "length": len(record),
+                "fetched_at": page["fetched_at"],
+            })
+        except OSError as e:
+            logger.warning(f"Failed to archive {page['url']}: {str(e)}")
+            return
+        self.urls.add(page["url"])
+    
+    def remove(self, url: str):
+        """Drop a URL from the archive (its record stays in the file but is no longer indexed)"""
+        if url not in self.urls:
+            return
+        try:
+            self._write_index_entry({"url": url, "removed": True})
+        except OSError as e:
+            logger.warning(f"Failed to remove {url} from the archive: {str(e)}")
+            return
+        self.urls.discard(url)
+    
+    def iter_pages(self) -> Iterator[Dict]:
+        """Read archived pages in fetch order"""
+        if not self.path.exists():
+            return
+        with open(self.path, "rb") as f:
+            for entry in self._read_index():
+                f.seek(entry["offset"])
+                try:
+                    yield self._parse_record(gzip.decompress(f.read(entry["length"])))
+                except (OSError, EOFError, ValueError, KeyError, IndexError) as e:
+                    logger.warning(f"Skipping unreadable archive record for {entry['url']}: {str(e)}")
+    
+    async def replay(self, on_page: Callable) -> List[Dict]:
+        """Feed archived pages to `on_page(page, soup)` like a crawl without network
+        
+        Returns the replayed pages without their body, like WebFetcher.crawl
+        with a page consumer.
+        """
+        pages = []
+        for page in self.iter_pages():
+            await on_page(page, None)
+            pages.append({key: value for key, value in page.items() if key not in ("content", "text")})
+        logger.info(f"Replayed {len(pages)} pages from {self.path}")
+        return pages
+
+
+def _parse_headers(lines: List[str]) -> Dict[str, str]:
+    """Parse 'Name: value' lines into a dict with lowercase names"""
+    headers = {}
+    for line in lines:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return headers
+
+
+def _parse_response(warc_headers: Dict[str, str], block: bytes) -> Dict:
+    """Rebuild a page from the headers and HTTP block of a WARC response record"""
+    http_head, _, body = block.partition(b"\r\n\r\n")
+    http_lines = http_head.decode("utf-8", errors="replace").split("\r\n")
+    headers = [[name, value.strip()] for name, _, value in (line.partition(":") for line in http_lines[1:])]
+    http_headers = _parse_headers(http_lines[1:])
+    content_type = http_headers.get("content-type", "")
+    _, _, charset = content_type.partition("charset=")
+    
+    encoding = charset.split(";")[0].strip().strip('"') or None
+    
+    date = warc_headers.get("warc-date", "")
+    page = {
+        "url": warc_headers["warc-target-uri"],
+        "content": _decode_body(body, http_headers),
+        "encoding": encoding,
+        "status_code": int(http_lines[0].split(" ")[1]),
+        "content_type": content_type,
+        "headers": headers,
+        "fetched_at": date.rstrip("Z"),
+    }
+    if content_type.split(";")[0].strip().lower() == "text/plain":
+        page["text"] = page.pop("content").decode(encoding or "utf-8", errors="replace")
+    if TITLE_HEADER.lower() in warc_headers:
+        page["title"] = warc_headers[TITLE_HEADER.lower()]
+    return page
+
+
+def _decode_body(body: bytes, headers: Dict[str, str]) -> bytes:
+    """Undo the transfer and content encodings kept by tools that archive raw responses"""
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        chunks = []
+        position = 0
+        while True:
+            line_end = body.index(b"\r\n", position)
+            size = int(body[position:line_end].split(b";")[0], 16)
+            if size == 0:
+                break
+            start = line_end + 2
+            chunks.append(body[start:start + size])
+            position = start + size + 2
+        body = b"".join(chunks)
+    
+    content_encoding = headers.get("content-encoding", "").lower()
+    if content_encoding in ("gzip", "x-gzip"):
+        body = gzip.decompress(body)
+    elif content_encoding == "deflate":
+        body = zlib.decompress(body)
+    return body
+
+
+def _read_warc_head(f: BinaryIO) -> Optional[List[str]]:
+    """Read the header lines of the next WARC record, or None at the end of the file"""
+    lines = []
+    for line in f:
+        line = line.rstrip(b"\r\n")
+        if not line:
+            if lines:
+                return lines
+            # Blank lines separating records
+            continue
+        lines.append(line.decode("utf-8", errors="replace"))
+    return lines or None
+
+
+def read_warc(path: str) -> Iterator[Dict]:
+    """Read the successful HTML responses of a WARC file (.warc or .warc.gz)
+    
+    Works on archives written by other tools (wget, crawlers) as well as on
+    PageArchive files; other record types and non-HTML responses are skipped.
+    """
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "rb") as f:
+        while True:
+            head = _read_warc_head(f)
+            if head is None:
+                break
+            warc_headers = _parse_headers(head[1:])
+            block = f.read(int(warc_headers.get("content-length", 0)))
+            if warc_headers.get("warc-type") != "response" or not block.startswith(b"HTTP/"):
+                continue
+            try:
+                page = _parse_response(warc_headers, block)
+            except (OSError, EOFError, ValueError, KeyError, IndexError, zlib.error) as e:
+                logger.warning(f"Skipping unreadable WARC record for {warc_headers.get('warc-target-uri')}: {str(e)}")
+                continue
+            if 200 <= page["status_code"] < 300 and "html" in page["content_type"].lower():
+                yield page
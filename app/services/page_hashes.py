@@ -0,0 +1,45 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional
+from app.config import settings
+from app.utils.logger import logger
+
+
+def content_hash(page: Dict) -> str:
+    """Hash of a page's body as fetched, used to detect changes on refresh"""
+    if page.get("content") is not None:
+        body = page["content"]
+    else:
+        body = (page.get("html") or page.get("text") or "").encode("utf-8")
+    return hashlib.sha256(body).hexdigest()
+
+
+class PageHashes:
+    """Content hash of every page indexed by a job, keyed by page URL"""
+    
+    def __init__(self, job_id: str, hashes_dir: Optional[str] = None):
+        self.path = Path(hashes_dir or Path(settings.data_dir) / "page_hashes") / f"{job_id}.json"
+    
+    def load(self) -> Dict[str, str]:
+        """Read the recorded hashes, empty if the job has none"""
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable page hashes {self.path}: {str(e)}")
+            return {}
+    
+    def save(self, hashes: Dict[str, str]):
+        """Write the hashes (atomically, via a temporary file)"""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".json.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(hashes, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Failed to save page hashes {self.path}: {str(e)}")
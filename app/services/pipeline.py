@@ -0,0 +1,192 @@
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from bs4 import BeautifulSoup
+from app.config import settings
+from app.services.clean_pool import CleaningPool, cleaning_pool
+from app.services.cleaner import ContentCleaner
+from app.services.page_archive import PageArchive
+from app.services.page_hashes import content_hash
+from app.utils.logger import logger
+
+
+class EmbeddingError(Exception):
+    """Raised when the embedding stage of the pipeline fails"""
+
+
+class IngestionPipeline:
+    """Streaming fetch -> clean -> embed -> index pipeline for one job
+    
+    The stages run concurrently, connected by bounded queues: pages are
+    cleaned as the crawler hands them over, chunks are embedded as soon as a
+    batch fills, and vectors are appended to the index batch by batch. When a
+    stage falls behind its input queue fills up and pauses the stages before
+    it, so memory is bounded by the queue sizes rather than the crawl size.
+    
+    Pages are cleaned in the worker processes of `pool` (unless it has no
+    workers), so parsing does not block the event loop; their chunks are
+    still deduplicated and batched in page order. A crawl given
+    `process_page` has each page parsed once in the pool, for its links and
+    its chunks together.
+    """
+    
+    def __init__(
+        self,
+        embedding_service,
+        vector_store,
+        cleaner: Optional[ContentCleaner] = None,
+        archive: Optional[PageArchive] = None,
+        pool: Optional[CleaningPool] = None,
+        queue_size: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        on_progress: Optional[Callable[[Dict], None]] = None
+    ):
+        self.embedding_service = embedding_service
+        self.vector_store = vector_store
+        self.cleaner = cleaner or ContentCleaner()
+        self.archive = archive
+        self.pool = pool or cleaning_pool
+        self.batch_size = batch_size or settings.embedding_batch_size
+        self.pages: asyncio.Queue = asyncio.Queue(maxsize=queue_size or settings.pipeline_queue_size)
+        self.batches: asyncio.Queue = asyncio.Queue(maxsize=settings.pipeline_max_pending_batches)
+        self.on_progress = on_progress
+        self.stats: Dict[str, int] = {"pages_fetched": 0, "pages_cleaned": 0, "chunks_indexed": 0}
+        # Body hash of each page, so a later refresh can tell which ones changed
+        self.page_hashes: Dict[str, str] = {}
+        self.batch: List[Dict] = []
+    
+    async def on_page(self, page: Dict, soup: Optional[BeautifulSoup] = None, processed: Optional[Dict] = None):
+        """Crawler callback: hand a fetched page to the clean stage
+        
+        Waits while the clean stage is behind, which slows the crawl down.
+        `processed` is the result of `process_page` for the page, if any.
+        """
+        self.stats["pages_fetched"] += 1
+        if self.pool.workers > 0:
+            # The pool parses the page again, so the tree would only hold memory
+            soup = None
+        await self.pages.put((page, soup, processed))
+    
+    async def process_page(self, page: Dict, links: bool, profile: bool) -> Optional[Dict]:
+        """Crawler hook: parse a page in the pool for its links and chunks (see WebFetcher.crawl)
+        
+        Returns None when the pool has no workers or failed, in which case
+        the crawler parses the page itself.
+        """
+        if self.pool.workers <= 0:
+            return None
+        try:
+            return await self.pool.process(page, self.cleaner.template_blocks(page["url"]), links, profile)
+        except Exception as e:
+            logger.warning(f"Error processing page {page['url']} in the pool: {str(e) or type(e).__name__}")
+            return None
+    
+    async def _fetch_stage(self, crawl: Callable[[Callable], Awaitable[List[Dict]]]):
+        """Run the crawl, then signal the end of the page stream"""
+        pages = await crawl(self.on_page)
+        self.stats["pages_fetched"] = len(pages)
+        await self.pages.put(None)
+    
+    async def _clean_stage(self):
+        """Clean and chunk pages, emitting fixed-size chunk batches
+        
+        Up to twice as many pages as the pool has workers are cleaned at
+        once; results are taken in page order as soon as the oldest is done.
+        """
+        pending: Deque[Tuple[str, asyncio.Future]] = deque()
+        try:
+            while True:
+                item = await self.pages.get()
+                if item is None:
+                    break
+                page, soup, processed = item
+                # Raw pages are kept so the job can be reprocessed without refetching
+                if self.archive is not None:
+                    self.archive.append(page)
+                self.page_hashes[page["url"]] = content_hash(page)
+                if self.pool.workers <= 0:
+                    # Inline cleaning reuses the tree parsed by the crawler
+                    await self._emit(self.cleaner.add_page(page, soup))
+                    continue
+                
+                if processed is not None:
+                    # Already cleaned along with the crawler's link extraction
+                    future = asyncio.get_running_loop().create_future()
+                    future.set_result((processed["chunks"], processed["blocks"]))
+                else:
+                    template = self.cleaner.template_blocks(page["url"])
+                    future = asyncio.ensure_future(self.pool.clean(page, template))
+                pending.append((page["url"], future))
+                while pending and (len(pending) >= self.pool.workers * 2 or pending[0][1].done()):
+                    await self._collect(*pending.popleft())
+            
+            while pending:
+                await self._collect(*pending.popleft())
+        finally:
+            for _, future in pending:
+                future.cancel()
+        
+        if self.batch:
+            await self.batches.put(self.batch)
+            self.batch = []
+        await self.batches.put(None)
+    
+    async def _collect(self, url: str, future: asyncio.Future):
+        """Wait for a page cleaned by the pool and emit its new chunks"""
+        try:
+            chunks, blocks = await future
+        except Exception as e:
+            # Only this page is lost (e.g. its worker crashed), not the job
+            logger.error(f"Error processing page {url}: {str(e) or type(e).__name__}")
+            chunks, blocks = [], []
+        await self._emit(self.cleaner.add_cleaned(chunks, url, blocks))
+    
+    async def _emit(self, chunks: List[Dict]):
+        """Add a cleaned page's chunks to the current batch, queuing full batches"""
+        self.stats["pages_cleaned"] += 1
+        self.batch.extend(chunks)
+        while len(self.batch) >= self.batch_size:
+            await self.batches.put(self.batch[:self.batch_size])
+            self.batch = self.batch[self.batch_size:]
+    
+    async def _embed_stage(self):
+        """Embed chunk batches and append them to the index"""
+        while True:
+            batch = await self.batches.get()
+            if batch is None:
+                break
+            try:
+                embeddings = await self.embedding_service.embed_texts([chunk["text"] for chunk in batch])
+            except Exception as e:
+                raise EmbeddingError(str(e)) from e
+            self.vector_store.add_chunks(batch, embeddings)
+            self.stats["chunks_indexed"] += len(batch)
+            if self.on_progress:
+                self.on_progress(self.stats)
+    
+    async def run(self, crawl: Callable[[Callable], Awaitable[List[Dict]]]) -> Dict[str, int]:
+        """Run all stages until the crawl is exhausted and every chunk is indexed
+        
+        `crawl(on_page)` must run the crawl, calling `on_page(page, soup)` for
+        each page kept. If a stage fails the others are cancelled and the
+        error is raised.
+        """
+        stages = [
+            asyncio.create_task(self._fetch_stage(crawl)),
+            asyncio.create_task(self._clean_stage()),
+            asyncio.create_task(self._embed_stage()),
+        ]
+        try:
+            done, _ = await asyncio.wait(stages, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            for task in stages:
+                task.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+        
+        logger.info(
+            f"Pipeline finished: {self.stats['pages_fetched']} pages fetched, "
+            f"{self.stats['chunks_indexed']} chunks indexed"
+        )
+        return self.stats
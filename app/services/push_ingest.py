@@ -0,0 +1,81 @@
+import json
+from datetime import datetime
+from typing import AsyncIterator, Dict, Optional
+from pydantic import ValidationError
+from app.config import settings
+from app.schemas import PushRecord
+from app.utils.logger import logger
+
+
+class PushFormatError(ValueError):
+    """Raised when a pushed NDJSON stream cannot be read any further"""
+
+
+class PushStream:
+    """Pages decoded from an NDJSON upload as its body arrives
+    
+    Each line is one `PushRecord`. Only the current, incomplete line is
+    buffered, so memory does not grow with the size of the upload. Invalid
+    records are counted and skipped; a line longer than `max_record_bytes`
+    stops the stream, and the error is kept in `error` for the caller.
+    """
+    
+    def __init__(self, chunks: AsyncIterator[bytes], max_record_bytes: Optional[int] = None):
+        self.chunks = chunks
+        self.max_record_bytes = max_record_bytes or settings.push_max_record_bytes
+        self.accepted = 0
+        self.rejected = 0
+        self.line_number = 0
+        self.error: Optional[PushFormatError] = None
+    
+    async def _lines(self) -> AsyncIterator[bytes]:
+        """Split the body into lines"""
+        buffer = bytearray()
+        async for chunk in self.chunks:
+            buffer.extend(chunk)
+            start = 0
+            while True:
+                end = buffer.find(b"\n", start)
+                if end == -1:
+                    break
+                yield bytes(buffer[start:end])
+                start = end + 1
+            del buffer[:start]
+            if len(buffer) > self.max_record_bytes:
+                self.error = PushFormatError(
+                    f"Record on line {self.line_number + 1} exceeds {self.max_record_bytes} bytes"
+                )
+                raise self.error
+        if buffer:
+            yield bytes(buffer)
+    
+    def _to_page(self, record: PushRecord) -> Dict:
+        """Build a page as the cleaner expects it"""
+        page = {
+            "url": record.url,
+            "status_code": 200,
+            "content_type": "text/html" if record.html is not None else "text/plain",
+            "fetched_at": record.fetched_at or datetime.utcnow().isoformat(),
+        }
+        if record.html is not None:
+            page["html"] = record.html
+        else:
+            page["text"] = record.text
+        if record.title:
+            page["title"] = record.title
+        return page
+    
+    async def pages(self) -> AsyncIterator[Dict]:
+        """Yield a page for each valid record, in upload order"""
+        async for line in self._lines():
+            self.line_number += 1
+            if not line.strip():
+                continue
+            try:
+                record = PushRecord.model_validate(json.loads(line))
+            except (ValueError, ValidationError) as e:
+                self.rejected += 1
+                logger.warning(f"Rejected pushed record on line {self.line_number}: {str(e).splitlines()[0]}")
+                continue
+            self.accepted += 1
+            yield self._to_page(record)
@@ -0,0 +1,132 @@
+from typing import Callable, Dict, List, Optional, Set
+import numpy as np
+from app.config import settings
+from app.services.clean_pool import cleaning_pool
+from app.services.cleaner import ContentCleaner
+from app.services.fetcher import WebFetcher
+from app.services.page_archive import PageArchive
+from app.services.page_hashes import PageHashes, content_hash
+from app.services.pipeline import EmbeddingError
+from app.services.templates import JobTemplates
+from app.services.vector_store import VectorStore
+from app.utils.logger import logger
+from app.utils.urls import url_host
+
+
+class JobRefresher:
+    """Re-crawl a finished job's pages and re-index only the ones that changed
+    
+    Every page of the job is fetched again, without following links. Requests
+    are conditional (a 304 reuses the cached body), and each body is hashed
+    and compared with the hash recorded when the page was indexed. Only
+    changed pages are cleaned and embedded; the chunks and vectors of the
+    others are carried over, and the new index is published atomically.
+    Pages that cannot be fetched keep their current chunks. Changed pages
+    are cleaned without the site templates learned when the job was
+    indexed, and replace their record in the job's page archive, so a
+    later reprocess starts from the current bodies.
+    """
+    
+    def __init__(
+        self,
+        embedding_service,
+        fetcher: WebFetcher,
+        batch_size: Optional[int] = None,
+        archive: Optional[PageArchive] = None
+    ):
+        self.embedding_service = embedding_service
+        self.fetcher = fetcher
+        self.batch_size = batch_size or settings.embedding_batch_size
+        self.archive = archive
+        self.cleaner = ContentCleaner()
+    
+    async def refresh(self, job: Dict, can_publish: Optional[Callable[[], bool]] = None) -> Dict[str, int]:
+        """Refresh a job's index, returns counts of checked, changed and failed pages
+        
+        `can_publish` is checked right before the new index is saved; when it
+        returns False the refresh is discarded (e.g. the job is being rebuilt).
+        """
+        job_id = job["job_id"]
+        store = VectorStore(job_id)
+        if not store.load():
+            raise RuntimeError("No index to refresh")
+        
+        page_hashes = PageHashes(job_id)
+        hashes = page_hashes.load()
+        # Changed pages are cleaned without the site chrome the first ingest learned
+        templates = JobTemplates(job_id).load()
+        # Jobs indexed before hashes were recorded are fully re-embedded once
+        urls = list(dict.fromkeys(list(hashes) + [chunk["url"] for chunk in store.chunks]))
+        stats = {
+            "pages_checked": len(urls),
+            "pages_changed": 0,
+            "pages_unchanged": 0,
+            "pages_failed": 0,
+            "chunks_embedded": 0,
+            "chunks_total": len(store.chunks),
+        }
+        
+        replaced: Set[str] = set()
+        new_hashes: Dict[str, str] = {}
+        new_chunks: List[Dict] = []
+        async for url, page in self.fetcher.revisit(urls, job["domain_allowlist"]):
+            if page is None:
+                stats["pages_failed"] += 1
+                continue
+            page_hash = content_hash(page)
+            if page["url"] == url and hashes.get(url) == page_hash:
+                stats["pages_unchanged"] += 1
+                continue
+            
+            stats["pages_changed"] += 1
+            replaced.update((url, page["url"]))
+            new_hashes[page["url"]] = page_hash
+            if self.archive is not None:
+                self.archive.append(page, replace=True)
+                if page["url"] != url:
+                    self.archive.remove(url)
+            try:
+                chunks, _ = await cleaning_pool.clean(page, templates.get(url_host(page["url"]), frozenset()))
+                new_chunks.extend(chunks)
+            except Exception as e:
+                logger.error(f"Error processing page {page['url']}: {str(e) or type(e).__name__}")
+        
+        if not replaced:
+            logger.info(f"Job {job_id}: No page changed out of {len(urls)}")
+            return stats
+        
+        kept = [chunk["url"] not in replaced for chunk in store.chunks]
+        kept_chunks = [chunk for chunk, keep in zip(store.chunks, kept) if keep]
+        # Chunks identical to a carried-over one are still skipped
+        new_chunks = self.cleaner.deduplicate(new_chunks, known=kept_chunks)
+        
+        updated = VectorStore(job_id)
+        if kept_chunks:
+            updated.add_chunks(kept_chunks, store.get_vectors()[np.array(kept)])
+        for start in range(0, len(new_chunks), self.batch_size):
+            batch = new_chunks[start:start + self.batch_size]
+            try:
+                embeddings = await self.embedding_service.embed_texts([chunk["text"] for chunk in batch])
+            except Exception as e:
+                raise EmbeddingError(str(e)) from e
+            updated.add_chunks(batch, embeddings)
+            stats["chunks_embedded"] += len(batch)
+        
+        if not updated.chunks:
+            raise RuntimeError("Refreshed pages produced no chunks, keeping the current index")
+        
+        if can_publish and not can_publish():
+            raise RuntimeError("Job changed during the refresh, discarding it")
+        
+        updated.save()
+        for url in replaced:
+            hashes.pop(url, None)
+        hashes.update(new_hashes)
+        page_hashes.save(hashes)
+        
+        stats["chunks_total"] = len(updated.chunks)
+        logger.info(
+            f"Job {job_id}: Refreshed {stats['pages_changed']} of {len(urls)} pages, "
+            f"{stats['chunks_embedded']} chunks re-embedded"
+        )
+        return stats
@@ -0,0 +1,72 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import List, Optional
+from app.config import settings
+from app.services.job_manager import JobManager, job_manager
+from app.utils.logger import logger
+
+
+class RefreshScheduler:
+    """Background loop refreshing the jobs created with a refresh interval
+    
+    Every `check_interval` seconds, finished crawl jobs whose
+    `refresh_interval_hours` have passed since their last refresh (or since
+    they finished) are refreshed, at most `refresh_max_concurrent_jobs` at
+    a time.
+    """
+    
+    def __init__(self, manager: JobManager, check_interval: Optional[int] = None):
+        self.manager = manager
+        self.check_interval = check_interval or settings.refresh_check_interval
+        self.task: Optional[asyncio.Task] = None
+    
+    def due_jobs(self, now: Optional[datetime] = None) -> List[str]:
+        """Ids of the jobs due for a refresh"""
+        now = now or datetime.utcnow()
+        due = []
+        for job_id, job in self.manager.jobs.items():
+            interval = job.get("refresh_interval_hours")
+            if not interval or not self.manager.is_refreshable(job) or job_id in self.manager.refreshing:
+                continue
+            last = datetime.fromisoformat(job.get("last_refreshed_at") or job["updated_at"])
+            if now - last >= timedelta(hours=interval):
+                due.append(job_id)
+        return due
+    
+    async def run_due(self):
+        """Refresh every job that is due"""
+        due = self.due_jobs()
+        if not due:
+            return
+        logger.info(f"Refreshing {len(due)} jobs")
+        semaphore = asyncio.Semaphore(max(1, settings.refresh_max_concurrent_jobs))
+        
+        async def refresh(job_id: str):
+            async with semaphore:
+                await self.manager.refresh_job(job_id)
+        
+        await asyncio.gather(*(refresh(job_id) for job_id in due))
+    
+    async def _run(self):
+        while True:
+            try:
+                await self.run_due()
+            except Exception as e:
+                logger.error(f"Refresh scheduler error: {str(e)}")
+            await asyncio.sleep(self.check_interval)
+    
+    def start(self):
+        """Start the background loop"""
+        if settings.refresh_scheduler_enabled and self.task is None:
+            self.task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop the background loop, cancelling running refreshes"""
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+
+# Global refresh scheduler instance
+refresh_scheduler = RefreshScheduler(job_manager)
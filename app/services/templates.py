@@ -0,0 +1,136 @@
+import hashlib
+import json
+import math
+import os
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set
+from app.config import settings
+from app.utils.logger import logger
+from app.utils.urls import url_host
+
+
+# Block-level elements: each one starts a new text block
+BLOCK_TAGS = frozenset({
+    "address", "article", "blockquote", "dd", "details", "dialog", "div", "dl", "dt",
+    "fieldset", "figcaption", "figure", "form", "h1", "h2", "h3", "h4", "h5", "h6",
+    "hr", "li", "main", "ol", "p", "pre", "section", "summary", "table", "td", "th",
+    "tr", "ul", "button", "br",
+})
+
+
+def block_fingerprint(text: str) -> Optional[int]:
+    """64-bit fingerprint of a text block (case and whitespace insensitive), None if empty"""
+    normalized = " ".join(text.lower().split())
+    if not normalized:
+        return None
+    return int.from_bytes(hashlib.blake2b(normalized.encode(), digest_size=8).digest(), "big")
+
+
+class SiteTemplates:
+    """Text blocks repeated across a site's pages, learned while a job is cleaned
+    
+    For each host, counts how many pages each block fingerprint appears on.
+    Once `min_pages` pages of a host have been seen, blocks found on more
+    than `ratio` of them (cookie banners, "related articles" widgets, calls
+    to action) form the host's template and are left out of its next pages.
+    Pages cleaned before that keep their blocks, since their chunks have
+    already been emitted.
+    
+    Most blocks appear on a single page, so counts use lossy counting:
+    every `prune_pages` pages of a host, blocks whose count (plus the pages
+    they may have been missed on) is below one per `prune_pages` pages are
+    dropped. A host's table then stays around `prune_pages * log(pages /
+    prune_pages)` entries, and counts are low by at most one per
+    `prune_pages` pages, which only makes templates more conservative.
+    """
+    
+    def __init__(
+        self,
+        ratio: Optional[float] = None,
+        min_pages: Optional[int] = None,
+        prune_pages: Optional[int] = None
+    ):
+        self.ratio = settings.template_block_ratio if ratio is None else ratio
+        self.min_pages = min_pages or settings.template_min_pages
+        self.prune_pages = prune_pages or settings.template_prune_pages
+        self.pages: Dict[str, int] = {}
+        self.counts: Dict[str, Dict[int, int]] = {}
+        # Upper bound of the pages a block was on before it was (re)counted
+        self.missed: Dict[str, Dict[int, int]] = {}
+        self.templates: Dict[str, Set[int]] = {}
+    
+    def blocks_for(self, url: str) -> FrozenSet[int]:
+        """Fingerprints of the template blocks of a URL's site"""
+        host = url_host(url)
+        if self.pages.get(host, 0) < self.min_pages:
+            return frozenset()
+        return frozenset(self.templates.get(host, ()))
+    
+    def add(self, url: str, blocks: Iterable[int]):
+        """Record the block fingerprints of a cleaned page (template blocks included)"""
+        host = url_host(url)
+        pages = self.pages[host] = self.pages.get(host, 0) + 1
+        counts = self.counts.setdefault(host, {})
+        missed = self.missed.setdefault(host, {})
+        template = self.templates.setdefault(host, set())
+        limit = self.ratio * pages
+        bucket = math.ceil(pages / self.prune_pages)
+        for block in set(blocks):
+            if block in counts:
+                counts[block] += 1
+            else:
+                counts[block] = 1
+                missed[block] = bucket - 1
+            if counts[block] > limit:
+                template.add(block)
+        # More pages raise the bar: drop blocks that are no longer frequent enough
+        template.difference_update([block for block in template if counts.get(block, 0) <= limit])
+        
+        if pages % self.prune_pages == 0:
+            for block in [block for block, count in counts.items() if count + missed[block] <= bucket]:
+                del counts[block]
+                del missed[block]
+    
+    def snapshot(self) -> Dict[str, List[int]]:
+        """Template block fingerprints of every site whose template is applied"""
+        return {
+            host: sorted(self.templates[host])
+            for host, pages in self.pages.items()
+            if pages >= self.min_pages and self.templates.get(host)
+        }
+    
+    def clear(self):
+        """Forget every site"""
+        self.pages.clear()
+        self.counts.clear()
+        self.missed.clear()
+        self.templates.clear()
+
+
+class JobTemplates:
+    """Site templates learned while a job was indexed, so its refreshed pages are cleaned the same way"""
+    
+    def __init__(self, job_id: str, templates_dir: Optional[str] = None):
+        self.path = Path(templates_dir or Path(settings.data_dir) / "templates") / f"{job_id}.json"
+    
+    def load(self) -> Dict[str, FrozenSet[int]]:
+        """Read the template blocks of each host, empty if the job has none"""
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return {host: frozenset(blocks) for host, blocks in json.load(f).items()}
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable site templates {self.path}: {str(e)}")
+            return {}
+    
+    def save(self, templates: Optional[SiteTemplates]):
+        """Write the templates learned so far (atomically, via a temporary file)"""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".json.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(templates.snapshot() if templates is not None else {}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Failed to save site templates {self.path}: {str(e)}")
@@ -1,6 +1,8 @@
 import os
 import json
 import pickle
+import shutil
+import time
 import numpy as np
 from typing import List, Dict, Optional, Tuple
 from pathlib import Path
@@ -9,7 +11,16 @@ from app.utils.logger import logger
 
 
 class VectorStore:
-    """Service for managing vector storage and retrieval"""
+    """Service for managing vector storage and retrieval
+    
+    Each save writes the index, chunks and info to a new version directory
+    under the job's index path, then switches the CURRENT pointer to it with
+    an atomic rename, so readers never see an index and chunks from two
+    different saves (e.g. while a refresh publishes an updated index).
+    """
+    
+    # Versions kept on disk: the current one and the one readers may still be loading
+    KEPT_VERSIONS = 2
     
     def __init__(self, job_id: str):
         self.job_id = job_id
@@ -21,7 +32,7 @@ class VectorStore:
         
         self.index = None
         self.chunks: List[Dict] = []
-        self.embeddings: Optional[np.ndarray] = None
+        self.dimension: Optional[int] = None
     
     def _initialize_faiss(self, dimension: int):
         """Initialize FAISS index"""
@@ -35,17 +46,21 @@ class VectorStore:
             raise RuntimeError("FAISS not available")
     
     def add_chunks(self, chunks: List[Dict], embeddings: np.ndarray):
-        """Add chunks and their embeddings to the store"""
+        """Append chunks and their embeddings to the store
+        
+        Can be called repeatedly, e.g. once per embedding batch.
+        """
         if len(chunks) != len(embeddings):
             raise ValueError("Chunks and embeddings must have the same length")
-        
-        self.chunks = chunks
-        self.embeddings = embeddings
+        if not chunks:
+            return
         
         # Initialize index if needed
         if self.index is None:
-            dimension = embeddings.shape[1]
-            self._initialize_faiss(dimension)
+            self.dimension = embeddings.shape[1]
+            self._initialize_faiss(self.dimension)
+        
+        self.chunks.extend(chunks)
         
         # Normalize embeddings for cosine similarity (L2 normalization)
         norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
@@ -57,6 +72,12 @@ class VectorStore:
         
         logger.info(f"Added {len(chunks)} chunks to vector store")
     
+    def get_vectors(self) -> np.ndarray:
+        """Stored (normalized) embeddings, in chunk order"""
+        if self.index is None:
+            return np.zeros((0, self.dimension or 0), dtype='float32')
+        return self.index.reconstruct_n(0, self.index.ntotal)
+    
     def search(self, query_embedding: np.ndarray, top_k: int) -> List[Tuple[Dict, float]]:
         """Search for similar chunks"""
         if self.index is None or len(self.chunks) == 0:
@@ -80,53 +101,84 @@ class VectorStore:
         
         return results
     
+    def _current_version(self) -> Optional[Path]:
+        """Directory of the published version, None for the legacy flat layout"""
+        pointer = self.index_path / "CURRENT"
+        if not pointer.exists():
+            return None
+        return self.index_path / pointer.read_text().strip()
+    
     def save(self):
-        """Persist the index and chunks to disk"""
+        """Persist the index and chunks to disk and publish them atomically"""
+        version = f"v{time.time_ns()}"
+        version_path = self.index_path / version
+        version_path.mkdir(parents=True)
+        
         # Save FAISS index
         if self.index is not None:
-            faiss_path = self.index_path / "index.faiss"
+            faiss_path = version_path / "index.faiss"
             import faiss
             faiss.write_index(self.index, str(faiss_path))
             logger.info(f"Saved FAISS index to {faiss_path}")
         
         # Save chunks metadata
-        with open(self.chunks_path, 'w', encoding='utf-8') as f:
+        chunks_path = version_path / "chunks.json"
+        with open(chunks_path, 'w', encoding='utf-8') as f:
             json.dump(self.chunks, f, indent=2, ensure_ascii=False)
-        logger.info(f"Saved chunks metadata to {self.chunks_path}")
+        logger.info(f"Saved chunks metadata to {chunks_path}")
         
         # Save embeddings info (dimension)
-        if self.embeddings is not None:
+        if self.dimension is not None:
             info = {
-                "dimension": self.embeddings.shape[1],
+                "dimension": self.dimension,
                 "num_chunks": len(self.chunks)
             }
-            info_path = self.index_path / "info.json"
+            info_path = version_path / "info.json"
             with open(info_path, 'w') as f:
                 json.dump(info, f)
+        
+        # Publish: readers switch to the new version in one rename
+        pointer_tmp = self.index_path / f"CURRENT.{os.getpid()}.tmp"
+        pointer_tmp.write_text(version)
+        os.replace(pointer_tmp, self.index_path / "CURRENT")
+        self._prune_versions()
+    
+    def _prune_versions(self):
+        """Delete versions older than the last KEPT_VERSIONS"""
+        versions = sorted(
+            (path for path in self.index_path.iterdir() if path.is_dir() and path.name.startswith("v")),
+            key=lambda path: int(path.name[1:]) if path.name[1:].isdigit() else 0
+        )
+        for path in versions[:-self.KEPT_VERSIONS]:
+            shutil.rmtree(path, ignore_errors=True)
     
     def load(self) -> bool:
-        """Load the index and chunks from disk"""
+        """Load the published index and chunks from disk"""
         try:
+            version_path = self._current_version()
+            base_path = version_path or self.index_path
+            chunks_path = version_path / "chunks.json" if version_path else self.chunks_path
+            
             # Load chunks
-            if self.chunks_path.exists():
-                with open(self.chunks_path, 'r', encoding='utf-8') as f:
+            if chunks_path.exists():
+                with open(chunks_path, 'r', encoding='utf-8') as f:
                     self.chunks = json.load(f)
-                logger.info(f"Loaded {len(self.chunks)} chunks from {self.chunks_path}")
+                logger.info(f"Loaded {len(self.chunks)} chunks from {chunks_path}")
             else:
                 return False
             
             # Load index info
-            info_path = self.index_path / "info.json"
+            info_path = base_path / "info.json"
             if not info_path.exists():
                 return False
             
             with open(info_path, 'r') as f:
                 info = json.load(f)
             
-            dimension = info["dimension"]
+            self.dimension = info["dimension"]
             
             # Load FAISS index
-            faiss_path = self.index_path / "index.faiss"
+            faiss_path = base_path / "index.faiss"
             if faiss_path.exists():
                 import faiss
                 self.index = faiss.read_index(str(faiss_path))
@@ -144,6 +196,6 @@ class VectorStore:
         return {
             "num_chunks": len(self.chunks),
             "index_loaded": self.index is not None,
-            "dimension": self.embeddings.shape[1] if self.embeddings is not None else None
+            "dimension": self.dimension
         }
 
@@ -0,0 +1,242 @@
+import hashlib
+import math
+import re
+from typing import Dict, List, Optional, Pattern, Set
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from app.config import settings
+
+
+# Query parameters that only track the visitor and never change the page
+TRACKING_PARAMS = frozenset({
+    "gclid", "gclsrc", "dclid", "fbclid", "msclkid", "yclid", "igshid", "twclid",
+    "mc_cid", "mc_eid", "_ga", "_gl", "_hsenc", "_hsmi", "mkt_tok", "ref_src",
+    "spm", "scid", "oly_anon_id", "oly_enc_id", "vero_id", "wickedid",
+})
+TRACKING_PREFIXES = ("utm_", "pk_", "hsa_")
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+_PERCENT_ESCAPE = re.compile(r"%[0-9a-fA-F]{2}")
+_UNRESERVED = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+
+
+def _normalize_escapes(value: str) -> str:
+    """Uppercase percent-escapes and decode the ones for unreserved characters"""
+    def replace(match):
+        char = chr(int(match.group(0)[1:], 16))
+        return char if char in _UNRESERVED else match.group(0).upper()
+    return _PERCENT_ESCAPE.sub(replace, value)
+
+
+def _is_tracking_param(name: str) -> bool:
+    """Check if a query parameter is a known tracking parameter"""
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonicalize_url(url: str) -> str:
+    """Canonicalize a URL for deduplication
+    
+    Lowercases scheme and host, drops default ports, fragments, tracking
+    parameters and trailing slashes, sorts the query and normalizes
+    percent-escapes. Path and query case are preserved since servers treat
+    them as significant.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    
+    host = (parts.hostname or "").rstrip(".")
+    if ":" in host:
+        host = f"[{host}]"  # IPv6 literal
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host
+    if port and port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{port}"
+    
+    path = _normalize_escapes(parts.path) or "/"
+    if len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/") or "/"
+    
+    params = [
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking_param(name)
+    ]
+    query = urlencode(sorted(params), doseq=True)
+    
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter sized for a capacity and false-positive rate"""
+    
+    def __init__(self, capacity: int, error_rate: float):
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+    
+    def _positions(self, key: str):
+        """Bit positions for a key (Kirsch-Mitzenmacher double hashing)"""
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+    
+    def add(self, key: str):
+        """Set the bits for a key"""
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+    
+    def __contains__(self, key: str) -> bool:
+        """Check if a key was (probably) added"""
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class SeenUrlSet:
+    """Set of already-seen URL keys with a configurable memory footprint
+    
+    Backends:
+    - "set": exact canonical URL strings (default)
+    - "fingerprint": 64-bit hashes, exact up to hash collisions
+    - "bloom": Bloom filter, a couple of bytes per URL with a small
+      false-positive rate (a new URL is occasionally skipped)
+    """
+    
+    def __init__(self, backend: Optional[str] = None):
+        self.backend = backend or settings.seen_url_backend
+        if self.backend not in ("set", "fingerprint", "bloom"):
+            raise ValueError(f"Unknown seen URL backend: {self.backend}")
+        self.clear()
+    
+    def clear(self):
+        """Forget all keys"""
+        self.count = 0
+        self._items: Set = set()
+        self._bloom: Optional[BloomFilter] = None
+        if self.backend == "bloom":
+            self._bloom = BloomFilter(settings.seen_url_bloom_capacity, settings.seen_url_bloom_error_rate)
+    
+    def _fingerprint(self, key: str) -> int:
+        """64-bit hash of a key"""
+        return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+    
+    def add(self, key: str):
+        """Mark a key as seen"""
+        if key in self:
+            return
+        self.count += 1
+        if self._bloom is not None:
+            self._bloom.add(key)
+        elif self.backend == "fingerprint":
+            self._items.add(self._fingerprint(key))
+        else:
+            self._items.add(key)
+    
+    def __contains__(self, key: str) -> bool:
+        """Check if a key was seen"""
+        if self._bloom is not None:
+            return key in self._bloom
+        if self.backend == "fingerprint":
+            return self._fingerprint(key) in self._items
+        return key in self._items
+    
+    def __len__(self) -> int:
+        return self.count
+
+
+def url_host(url: str) -> str:
+    """Lowercase host of a URL, without port or trailing dot"""
+    try:
+        return (urlsplit(url).hostname or "").rstrip(".")
+    except ValueError:
+        return ""
+
+
+class DomainMatcher:
+    """Suffix trie over allowlisted domains
+    
+    An entry matches the domain itself and all of its subdomains, on label
+    boundaries: "example.com" allows "docs.example.com" but not
+    "evil-example.com". A lookup walks the host's labels right to left, so
+    it costs the same whatever the size of the allowlist.
+    """
+    
+    _END = ""  # marks a node where an allowlisted domain ends
+    
+    def __init__(self, domains: List[str]):
+        self.root: Dict = {}
+        for domain in domains:
+            labels = self._normalize(domain).split(".")
+            if not labels[-1]:
+                continue
+            node = self.root
+            for label in reversed(labels):
+                node = node.setdefault(label, {})
+            node[self._END] = True
+    
+    def _normalize(self, domain: str) -> str:
+        """Accept bare domains, wildcard entries and full URLs"""
+        domain = domain.strip().lower()
+        if "://" in domain:
+            domain = url_host(domain)
+        else:
+            domain = domain.split("/")[0].split(":")[0]
+        return domain.lstrip("*").strip(".")
+    
+    def matches(self, host: str) -> bool:
+        """Check if a host is an allowlisted domain or one of its subdomains"""
+        node = self.root
+        for label in reversed(host.lower().rstrip(".").split(".")):
+            node = node.get(label)
+            if node is None:
+                return False
+            if self._END in node:
+                return True
+        return False
+
+
+def compile_patterns(patterns: Optional[List[str]]) -> Optional[Pattern]:
+    """Compile regular expressions into a single alternation, or None"""
+    patterns = [pattern for pattern in patterns or [] if pattern]
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+
+
+class UrlFilter:
+    """Compiled crawl scope: allowlisted domains plus include/exclude URL rules
+    
+    Include and exclude patterns are regular expressions searched in the
+    URL's path and query. When include patterns are given a URL must match
+    one of them; a URL matching an exclude pattern is always rejected.
+    """
+    
+    def __init__(
+        self,
+        domain_allowlist: List[str],
+        include_patterns: Optional[List[str]] = None,
+        exclude_patterns: Optional[List[str]] = None
+    ):
+        self.domains = DomainMatcher(domain_allowlist)
+        self.include = compile_patterns(include_patterns)
+        self.exclude = compile_patterns(exclude_patterns)
+    
+    def allows_domain(self, url: str) -> bool:
+        """Check the domain allowlist only"""
+        return self.domains.matches(url_host(url))
+    
+    def allows(self, url: str) -> bool:
+        """Check the domain allowlist and the include/exclude rules"""
+        if not self.allows_domain(url):
+            return False
+        if self.include is None and self.exclude is None:
+            return True
+        parts = urlsplit(url)
+        target = f"{parts.path}?{parts.query}" if parts.query else parts.path
+        if self.include is not None and not self.include.search(target):
+            return False
+        return self.exclude is None or not self.exclude.search(target)
@@ -0,0 +1,128 @@
+"""
+Benchmark: boilerplate removal and main-content extraction per page
+
+Compares the old cleaning path (one soup.select sweep per boilerplate
+selector, decompose, then one more sweep per main-content selector and a
+get_text) against the single walk of ContentCleaner._extract_content. Both
+run on pre-parsed trees, so only cleaning is measured, and their output is
+checked to be identical.
+
+Usage:
+    python scripts/benchmark_cleaning.py                 # synthetic pages
+    python scripts/benchmark_cleaning.py path/to/html/   # your own *.html files
+"""
+import sys
+import time
+import logging
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bs4 import BeautifulSoup
+from benchmark_parsing import load_pages, synthetic_page
+from app.services.cleaner import ContentCleaner
+from app.services.html_parser import parse_page, resolve_backend
+from app.utils.logger import logger
+
+
+BOILERPLATE_SELECTORS = [
+    "nav", "footer", "header", "aside",
+    "[class*='nav']", "[class*='menu']",
+    "[class*='footer']", "[class*='sidebar']",
+    "[id*='nav']", "[id*='menu']",
+    "[id*='footer']", "[id*='sidebar']",
+]
+CONTENT_SELECTORS = [
+    "main", "article", "[role='main']",
+    ".content", ".post", ".entry",
+    "#content", "#main", "#article",
+]
+
+
+def blog_page(i: int) -> str:
+    """Build a CMS-style page: deep div nesting, many classes, cookie banner, comments"""
+    menu = "".join(f'<li class="menu-item menu-item-{j}"><a href="/c/{j}">Category {j}</a></li>' for j in range(30))
+    widgets = "".join(
+        f'<div class="widget widget-{j}"><h3 class="widget-title">Widget {j}</h3>'
+        f'<ul>{"".join(f"<li><a href=/p/{k}>Post {k}</a></li>" for k in range(8))}</ul></div>'
+        for j in range(6)
+    )
+    paragraphs = "".join(
+        f'<div class="block"><div class="inner"><p class="text">Paragraph {j} of post {i}. '
+        + "The quick brown fox jumps over the lazy dog. " * 10 + "</p></div></div>"
+        for j in range(20)
+    )
+    comments = "".join(
+        f'<div class="comment"><span class="author">User {j}</span><p>Comment {j} on post {i}.</p></div>'
+        for j in range(15)
+    )
+    return (
+        f"<html><head><title>Post {i}</title><script>var tracking = {i};</script></head><body>"
+        f'<div id="cookie-banner">We use cookies. <button>Accept</button></div>'
+        f'<div class="site-header"><ul class="menu">{menu}</ul></div>'
+        f'<div class="wrapper"><div class="container"><div class="row">'
+        f'<div class="col post"><div class="entry-content">{paragraphs}</div>'
+        f'<div class="comments">{comments}</div></div>'
+        f'<div class="col sidebar">{widgets}</div>'
+        f"</div></div></div>"
+        f'<div class="site-footer">Copyright</div>'
+        f"</body></html>"
+    )
+
+
+def old_clean(soup: BeautifulSoup) -> Tuple[str, str]:
+    """Old path: decompose script/style, one select per selector, then the content selectors"""
+    for element in soup(["script", "style", "noscript", "iframe"]):
+        element.decompose()
+    for selector in BOILERPLATE_SELECTORS:
+        for element in soup.select(selector):
+            element.decompose()
+    
+    title_tag = soup.find("title") or soup.find("h1")
+    title = title_tag.get_text().strip() if title_tag else None
+    for selector in CONTENT_SELECTORS:
+        elements = soup.select(selector)
+        if elements:
+            return title, " ".join([elem.get_text() for elem in elements])
+    body = soup.find("body")
+    return title, body.get_text() if body else soup.get_text()
+
+
+def measure(name: str, run: Callable, soups: List[BeautifulSoup]) -> Tuple[float, list]:
+    """Run one path over all trees and print the time per page"""
+    started = time.perf_counter()
+    results = [run(soup) for soup in soups]
+    elapsed = time.perf_counter() - started
+    per_page = elapsed / len(soups) * 1000
+    print(f"{name:<40} {per_page:8.2f} ms/page  ({elapsed:.2f}s for {len(soups)} pages)")
+    return per_page, results
+
+
+def main():
+    logger.setLevel(logging.WARNING)
+    if len(sys.argv) > 1:
+        pages = load_pages(sys.argv[1])
+    else:
+        bodies = [synthetic_page(i) for i in range(100)] + [blog_page(i) for i in range(100)]
+        pages = [{"url": f"https://example.com/{i}", "html": body} for i, body in enumerate(bodies)]
+    
+    print("=" * 70)
+    print(f"CLEANING BENCHMARK ({len(pages)} pages, backend: {resolve_backend()})")
+    print("=" * 70)
+    
+    # The old path decomposes elements, so each path gets its own trees
+    old_soups = [parse_page(page) for page in pages]
+    new_soups = [parse_page(page) for page in pages]
+    cleaner = ContentCleaner()
+    
+    old_ms, old_results = measure("old: 12 selects + 9 content selects", old_clean, old_soups)
+    new_ms, new_results = measure("new: single walk", lambda soup: cleaner._extract_content(soup)[:2], new_soups)
+    
+    print(f"\nSpeedup: {old_ms / new_ms:.2f}x per page")
+    print(f"Identical output: {old_results == new_results}")
+
+
+if __name__ == "__main__":
+    main()
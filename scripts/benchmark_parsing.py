@@ -0,0 +1,108 @@
+"""
+Benchmark: HTML parsing throughput of the ingestion pipeline
+
+Compares the old path (body decoded to text, then two html.parser parses
+per page: one for link extraction, one for cleaning) against the
+parse-once path (the raw bytes parsed once with the configured backend,
+shared by link extraction and cleaning).
+
+Usage:
+    python scripts/benchmark_parsing.py                 # synthetic pages
+    python scripts/benchmark_parsing.py path/to/html/   # your own *.html files
+"""
+import sys
+import time
+import logging
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bs4 import BeautifulSoup
+from app.services.cleaner import ContentCleaner
+from app.services.fetcher import WebFetcher
+from app.services.html_parser import parse_page, resolve_backend
+from app.utils.logger import logger
+from app.utils.urls import UrlFilter
+
+
+SCOPE = UrlFilter(["example.com"])
+
+
+def synthetic_page(i: int) -> str:
+    """Build a documentation-like page with navigation, sidebar and footer"""
+    nav = "".join(f'<li><a href="/section/{j}">Section {j}</a></li>' for j in range(40))
+    sidebar = "".join(f'<a href="/related/{i}-{j}">Related article {j}</a>' for j in range(20))
+    paragraphs = "".join(
+        f"<h2>Heading {j}</h2><p>This is paragraph {j} of page {i}. " + "Lorem ipsum dolor sit amet, " * 12
+        + f'see <a href="/page/{i + j}">page {i + j}</a> for details.</p>'
+        for j in range(25)
+    )
+    return (
+        f"<html><head><title>Page {i}</title><style>body{{margin:0}}</style>"
+        f"<script>var x = {i};</script></head><body>"
+        f'<header><nav class="main-nav"><ul>{nav}</ul></nav></header>'
+        f'<div class="sidebar">{sidebar}</div>'
+        f'<main><article>{paragraphs}</article></main>'
+        f'<footer id="footer">Copyright <a href="/about">About</a></footer>'
+        f"</body></html>"
+    )
+
+
+def load_pages(directory: str = None) -> List[dict]:
+    """Load pages from a directory of .html files, or generate synthetic ones"""
+    if directory:
+        files = sorted(Path(directory).rglob("*.html"))
+        bodies = [f.read_bytes() for f in files]
+    else:
+        bodies = [synthetic_page(i).encode("utf-8") for i in range(200)]
+    return [
+        {"url": f"https://example.com/page/{i}", "content": body, "encoding": None, "fetched_at": "2024-01-01T00:00:00"}
+        for i, body in enumerate(bodies)
+    ]
+
+
+def old_path(fetcher: WebFetcher, cleaner: ContentCleaner, page: dict):
+    """Decode to text, then two html.parser parses: links, then cleaning"""
+    html = page["content"].decode("utf-8", errors="replace")
+    links_soup = BeautifulSoup(html, "html.parser")
+    fetcher._extract_links(links_soup, page["url"], SCOPE)
+    cleaner.clean_page(page, BeautifulSoup(html, "html.parser"))
+
+
+def new_path(fetcher: WebFetcher, cleaner: ContentCleaner, page: dict):
+    """One parse of the raw bytes with the configured backend, shared by links and cleaning"""
+    soup = parse_page(page)
+    fetcher._extract_links(soup, page["url"], SCOPE)
+    cleaner.clean_page(page, soup)
+
+
+def measure(name: str, run: Callable, pages: List[dict]) -> float:
+    """Run one path over all pages and print pages/sec"""
+    fetcher = WebFetcher()
+    cleaner = ContentCleaner()
+    started = time.perf_counter()
+    for page in pages:
+        run(fetcher, cleaner, page)
+    elapsed = time.perf_counter() - started
+    rate = len(pages) / elapsed
+    print(f"{name:<40} {rate:8.1f} pages/sec  ({elapsed:.2f}s for {len(pages)} pages)")
+    return rate
+
+
+def main():
+    logger.setLevel(logging.WARNING)
+    pages = load_pages(sys.argv[1] if len(sys.argv) > 1 else None)
+    
+    print("=" * 70)
+    print(f"PARSING BENCHMARK ({len(pages)} pages, backend: {resolve_backend()})")
+    print("=" * 70)
+    
+    old_rate = measure("old: decode + html.parser x2", old_path, pages)
+    new_rate = measure(f"new: {resolve_backend()} x1 (parse once)", new_path, pages)
+    
+    print(f"\nSpeedup: {new_rate / old_rate:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Offline bulk ingestion of a local HTML directory or WARC file
+
+Runs the same cleaning -> embedding -> indexing pipeline as POST /ingest,
+without crawling: pages are cleaned by a pool of worker processes and
+embedded in large batches. The result is a regular job that /status and
+/ask accept (the API server picks it up without a restart).
+
+Usage:
+    python scripts/bulk_ingest.py path/to/mirror/ --base-url https://docs.example.com/
+    python scripts/bulk_ingest.py crawl.warc.gz --workers 8 --batch-size 1024
+"""
+import sys
+import argparse
+import asyncio
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.schemas import JobState
+from app.services.job_manager import JobManager
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Index a local HTML directory or WARC file as a NexTraction job")
+    parser.add_argument("source", help="Directory of .html files, or a .warc / .warc.gz file")
+    parser.add_argument("--base-url", help="URL of the mirrored site root, used to build page URLs for a directory")
+    parser.add_argument("--notes", help="Optional text tag for this ingestion")
+    parser.add_argument("--workers", type=int, help="Cleaning processes (default: BULK_INGEST_WORKERS or one per CPU)")
+    parser.add_argument("--batch-size", type=int, help="Chunks per embedding request (default: BULK_EMBEDDING_BATCH_SIZE)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if not Path(args.source).exists():
+        print(f"Source not found: {args.source}")
+        sys.exit(1)
+    
+    manager = JobManager()
+    job_id = asyncio.run(manager.ingest_local(
+        args.source,
+        base_url=args.base_url,
+        user_notes=args.notes,
+        workers=args.workers,
+        batch_size=args.batch_size,
+    ))
+    job = manager.get_job(job_id)
+    
+    print(f"Job {job_id}: {job['state'].value}")
+    print(f"  Pages read:     {job['pages_fetched']}")
+    print(f"  Chunks indexed: {job['pages_indexed']}")
+    if job["state"] != JobState.DONE:
+        print(f"  Error: {job['error']}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Measurement: /status latency while a crawl is being ingested
+
+Runs a crawl of synthetic blog pages (served by a mock transport, so only
+our own CPU work is measured) through the ingestion pipeline, and polls
+GET /status/{job_id} on the same event loop every few milliseconds,
+timing each request from when it was due. Pages are parsed and cleaned
+on the event loop (no cleaning pool), parsed on the event loop for their
+links and again in a worker to be cleaned, or parsed once in a worker for
+both (the crawler's `process_page` hook). Embeddings are a constant
+vector, so no model is needed.
+
+Usage:
+    python scripts/measure_status_latency.py [pages]
+"""
+import sys
+import time
+import asyncio
+import logging
+from pathlib import Path
+from statistics import median
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+import numpy as np
+from fastapi import FastAPI
+from benchmark_cleaning import blog_page
+from app.routers import status
+from app.schemas import JobState
+from app.services.clean_pool import CleaningPool
+from app.services.crawl_scheduler import CrawlScheduler
+from app.services.discovery import RobotsCache
+from app.services.fetcher import WebFetcher
+from app.services.http_cache import HttpCache
+from app.services.job_manager import job_manager
+from app.services.pipeline import IngestionPipeline
+from app.utils.logger import logger
+
+
+POLL_INTERVAL = 0.005
+
+
+class ConstantEmbeddings:
+    """Embedding service returning the same vector for every text"""
+    
+    async def embed_texts(self, texts: List[str]) -> np.ndarray:
+        return np.ones((len(texts), 8), dtype="float32")
+
+
+class MemoryStore:
+    """Vector store counting appended chunks"""
+    
+    def __init__(self):
+        self.chunks = 0
+    
+    def add_chunks(self, chunks: List[Dict], embeddings):
+        self.chunks += len(chunks)
+
+
+def make_site(pages: int):
+    """Mock transport handler serving blog pages that link to the next ones, built in advance"""
+    bodies = {}
+    for i in range(pages + 3):
+        links = "".join(f'<a href="/{j}">Post {j}</a>' for j in range(i + 1, i + 4))
+        bodies[f"/{i}"] = blog_page(i).replace("</body>", f"{links}</body>").encode()
+    
+    def site(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"content-type": "text/html"}, content=bodies[request.url.path])
+    
+    return site
+
+
+async def measure(pages: int, workers: int, in_pool: bool, cache_dir: str) -> Dict[str, float]:
+    """Crawl `pages` pages with a pool of `workers` processes, returns /status latencies in ms
+    
+    Without `in_pool` the crawler parses pages itself for their links, and
+    the pool parses them again to clean them.
+    """
+    job_id = job_manager.create_job(["https://blog.example/0"], ["blog.example"], pages, pages)
+    api = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api")
+    fetcher = WebFetcher(
+        scheduler=CrawlScheduler(delay=0, max_per_host=8),
+        cache=HttpCache(cache_dir=cache_dir, max_age=0),
+        client=httpx.AsyncClient(transport=httpx.MockTransport(make_site(pages))),
+    )
+    fetcher.robots = RobotsCache()
+    pool = CleaningPool(workers=workers)
+    pipeline = IngestionPipeline(
+        ConstantEmbeddings(),
+        MemoryStore(),
+        pool=pool,
+        on_progress=lambda stats: job_manager.update_job_state(
+            job_id, JobState.RUNNING, pages_fetched=stats["pages_fetched"]
+        )
+    )
+    if workers:
+        # Start the processes before timing, as a running server would have
+        await pool.clean({"url": "https://blog.example/warmup", "html": blog_page(0), "fetched_at": ""})
+    
+    latencies = []
+    
+    async def poll():
+        # A request is due every POLL_INTERVAL; its latency runs from then,
+        # so time spent waiting for a blocked event loop is counted
+        while True:
+            due = time.perf_counter() + POLL_INTERVAL
+            await asyncio.sleep(POLL_INTERVAL)
+            response = await api.get(f"/status/{job_id}")
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - due) * 1000)
+    
+    poller = asyncio.create_task(poll())
+    start = time.perf_counter()
+    try:
+        await pipeline.run(lambda on_page: fetcher.crawl(
+            ["https://blog.example/0"], ["blog.example"], max_pages=pages, max_depth=pages,
+            include_patterns=[r"^/\d+$"], on_page=on_page, process_page=pipeline.process_page if in_pool else None
+        ))
+    finally:
+        elapsed = time.perf_counter() - start
+        poller.cancel()
+        pool.close()
+        await api.aclose()
+    
+    latencies.sort()
+    return {
+        "polls": len(latencies),
+        "p50": median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95)],
+        "max": latencies[-1],
+        "crawl_s": elapsed,
+    }
+
+
+app = FastAPI()
+app.include_router(status.router)
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    logger.setLevel(logging.WARNING)
+    cache_dir = str(Path(job_manager.jobs_dir).parent / "latency_cache")
+    
+    print(f"/status latency during a {pages}-page crawl (ms)")
+    print(f"{'parsing':<28}{'polls':>8}{'p50':>10}{'p95':>10}{'max':>10}{'crawl (s)':>12}")
+    modes = (
+        ("event loop", 0, False),
+        ("links on loop, clean in pool", 2, False),
+        ("once in pool (2 workers)", 2, True),
+    )
+    for label, workers, in_pool in modes:
+        result = asyncio.run(measure(pages, workers, in_pool, cache_dir))
+        print(
+            f"{label:<28}{result['polls']:>8}{result['p50']:>10.2f}{result['p95']:>10.2f}"
+            f"{result['max']:>10.2f}{result['crawl_s']:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -8,9 +8,91 @@ from pathlib import Path
 # Add app directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+import httpx
+import numpy as np
+from app.services.crawl_scheduler import CrawlScheduler
+from app.services.discovery import RobotsCache
+from app.services.fetcher import WebFetcher
+from app.services.http_cache import HttpCache
+
+
+class FakeEmbeddings:
+    """Embedding service returning constant vectors, recording what it embeds"""
+    
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.texts = []
+        self.batches = []
+        # Shared with tests that interleave their own events
+        self.events = []
+    
+    async def embed_texts(self, texts):
+        if self.fail:
+            raise RuntimeError("insufficient_quota")
+        self.texts.extend(texts)
+        self.batches.append(len(texts))
+        self.events.append(("embed", len(texts)))
+        return np.ones((len(texts), 4), dtype="float32")
+
+
+class FakeStore:
+    """Vector store keeping appended chunks in memory"""
+    
+    def __init__(self):
+        self.chunks = []
+    
+    def add_chunks(self, chunks, embeddings):
+        assert len(chunks) == len(embeddings)
+        self.chunks.extend(chunks)
+
+
+def build_page_html(topic):
+    """A page long enough to produce a chunk, titled after its topic"""
+    text = f"This page explains {topic} in detail. " * 8
+    return f"<html><head><title>{topic}</title></head><body><p>{text}</p></body></html>"
+
+
 # Configuration pytest
 @pytest.fixture(scope="session")
 def base_url():
     """URL de base pour les tests d'intégration"""
     import os
     return os.getenv("BASE_URL", "http://localhost:8000")
+
+
+@pytest.fixture
+def embeddings():
+    """Embedding service returning constant vectors"""
+    return FakeEmbeddings()
+
+
+@pytest.fixture
+def failing_embeddings():
+    """Embedding service failing like an exhausted API quota"""
+    return FakeEmbeddings(fail=True)
+
+
+@pytest.fixture
+def store():
+    """In-memory vector store"""
+    return FakeStore()
+
+
+@pytest.fixture
+def page_html():
+    """Build the HTML of a page long enough to produce a chunk"""
+    return build_page_html
+
+
+@pytest.fixture
+def make_fetcher(tmp_path):
+    """Build fetchers backed by a mock transport and a private cache"""
+    def make(handler, max_age=0):
+        fetcher = WebFetcher(
+            scheduler=CrawlScheduler(delay=0, max_per_host=4),
+            cache=HttpCache(cache_dir=str(tmp_path / "http_cache"), max_age=max_age),
+            client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+        fetcher.robots = RobotsCache()
+        return fetcher
+    return make
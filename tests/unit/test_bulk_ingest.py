@@ -0,0 +1,141 @@
+"""
+Tests unitaires pour l'ingestion hors ligne (dossiers HTML et fichiers WARC)
+"""
+import asyncio
+import gzip
+import subprocess
+import sys
+import pytest
+from app.config import settings
+from app.schemas import JobState
+from app.services.bulk_ingest import BulkIngestor, iter_directory_pages
+from app.services.job_manager import JobManager
+from app.services.page_archive import read_warc
+from app.services.pipeline import EmbeddingError
+
+
+def warc_record(warc_type, uri, block):
+    """Serialize one WARC record"""
+    head = f"WARC/1.0\r\nWARC-Type: {warc_type}\r\nWARC-Target-URI: {uri}\r\nContent-Length: {len(block)}\r\n\r\n"
+    return head.encode() + block + b"\r\n\r\n"
+
+
+def test_read_warc_decodes_raw_responses(tmp_path, page_html):
+    """Only HTML responses are read, with chunked and gzip bodies decoded"""
+    body = gzip.compress(page_html(1).encode())
+    chunked = f"{len(body):x}\r\n".encode() + body + b"\r\n0\r\n\r\n"
+    ok = (
+        b"HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n"
+        b"Transfer-Encoding: chunked\r\nContent-Encoding: gzip\r\n\r\n" + chunked
+    )
+    missing = b"HTTP/1.1 404 Not Found\r\nContent-Type: text/html\r\n\r\nnope"
+    path = tmp_path / "crawl.warc"
+    path.write_bytes(
+        warc_record("request", "https://example.com/1", b"GET /1 HTTP/1.1\r\n\r\n")
+        + warc_record("response", "https://example.com/1", ok)
+        + warc_record("response", "https://example.com/2", missing)
+    )
+    
+    pages = list(read_warc(str(path)))
+    
+    assert [page["url"] for page in pages] == ["https://example.com/1"]
+    assert pages[0]["content"] == page_html(1).encode()
+    assert pages[0]["encoding"] == "utf-8"
+
+
+def test_directory_pages_get_site_urls(tmp_path, page_html):
+    """Files of a mirror are mapped under the base URL"""
+    (tmp_path / "guide").mkdir()
+    (tmp_path / "index.html").write_text(page_html(0))
+    (tmp_path / "guide" / "intro.htm").write_text(page_html(1))
+    (tmp_path / "guide" / "faq #2.html").write_text(page_html(2))
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG")
+    
+    pages = list(iter_directory_pages(str(tmp_path), base_url="https://docs.example.com/"))
+    
+    assert [page["url"] for page in pages] == [
+        "https://docs.example.com/guide/faq%20%232.html",
+        "https://docs.example.com/guide/intro.htm",
+        "https://docs.example.com/index.html",
+    ]
+
+
+def test_bulk_ingestor_cleans_in_workers_and_batches_embeddings(page_html, embeddings, store):
+    """Chunks come back in input order, deduplicated, in full embedding batches"""
+    pages = [
+        {"url": f"https://example.com/{i}", "content": page_html(i).encode(), "fetched_at": "2024-01-01T00:00:00"}
+        for i in range(5)
+    ]
+    pages.append(dict(pages[0], url="https://example.com/copy"))
+    pages.append({"url": "https://example.com/broken", "fetched_at": "2024-01-01T00:00:00"})
+    
+    stats = asyncio.run(BulkIngestor(embeddings, store, workers=2, batch_size=2).run(pages))
+    
+    assert [chunk["url"] for chunk in store.chunks] == [f"https://example.com/{i}" for i in range(5)]
+    assert embeddings.batches == [2, 2, 1]
+    assert stats["pages_fetched"] == 7
+    assert stats["chunks_indexed"] == 5
+
+
+def test_bulk_embedding_failure_stops_the_run(page_html, failing_embeddings, store):
+    """A failing embed stage cancels the cleaning and surfaces the error"""
+    pages = (
+        {"url": f"https://example.com/{i}", "content": page_html(i).encode(), "fetched_at": "2024-01-01T00:00:00"}
+        for i in range(1000)
+    )
+    
+    async def run():
+        ingestor = BulkIngestor(failing_embeddings, store, workers=1, batch_size=1)
+        await asyncio.wait_for(ingestor.run(pages), timeout=30)
+    
+    with pytest.raises(EmbeddingError, match="insufficient_quota"):
+        asyncio.run(run())
+
+
+def test_local_ingest_creates_queryable_job(tmp_path, monkeypatch, page_html, embeddings):
+    """The job is written to disk and found by another job manager"""
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path / "data"))
+    mirror = tmp_path / "mirror"
+    mirror.mkdir()
+    for i in range(3):
+        (mirror / f"{i}.html").write_text(page_html(i))
+    
+    manager = JobManager(jobs_dir=str(tmp_path / "jobs"))
+    manager.embedding_service = embeddings
+    job_id = asyncio.run(manager.ingest_local(str(mirror), base_url="https://example.com", workers=1))
+    
+    server = JobManager(jobs_dir=str(tmp_path / "jobs"))
+    job = server.get_job(job_id)
+    
+    assert job["state"] == JobState.DONE
+    assert job["pages_fetched"] == 3
+    assert job["pages_indexed"] == 3
+    assert server.get_vector_store(job_id).get_stats()["num_chunks"] == 3
+    assert server.get_job("../jobs/x") is None
+
+
+def test_bulk_job_is_reloaded_until_finished(tmp_path):
+    """The server sees a bulk job finish in the CLI, and fails one whose CLI died"""
+    cli = JobManager(jobs_dir=str(tmp_path))
+    job_id = cli.create_job(["/mirror"], [], max_pages=0, max_depth=0, source="/mirror")
+    cli.update_job_state(job_id, JobState.RUNNING)
+    server = JobManager(jobs_dir=str(tmp_path))
+    
+    running = server.get_job(job_id)["state"]
+    cli.update_job_state(job_id, JobState.DONE, pages_indexed=3)
+    done = server.get_job(job_id)
+    
+    assert (running, done["state"], done["pages_indexed"]) == (JobState.RUNNING, JobState.DONE, 3)
+    
+    exited = subprocess.Popen([sys.executable, "-c", ""])
+    exited.wait()
+    crashed = cli.create_job(["/mirror"], [], max_pages=0, max_depth=0, source="/mirror")
+    cli.update_job_state(crashed, JobState.RUNNING, pid=exited.pid)
+    live = cli.create_job(["/mirror"], [], max_pages=0, max_depth=0, source="/mirror")
+    cli.update_job_state(live, JobState.RUNNING)
+    
+    restarted = JobManager(jobs_dir=str(tmp_path))
+    
+    assert restarted.load_jobs() == []
+    assert restarted.get_job(crashed)["state"] == JobState.FAILED
+    assert restarted.get_job(live)["state"] == JobState.RUNNING
@@ -0,0 +1,61 @@
+"""
+Tests unitaires pour l'enregistrement et le rejeu HTTP (cassettes)
+"""
+import asyncio
+import gzip
+import time
+import httpx
+from app.services.cassette import Cassette, RecordingTransport, ReplayTransport
+
+
+PAGE = b"<html><body><p>Recorded page</p></body></html>"
+
+
+def handler(request):
+    """Live server stand-in returning a gzip-encoded page"""
+    if request.url.path == "/page":
+        return httpx.Response(
+            200,
+            headers={"content-type": "text/html", "content-encoding": "gzip", "etag": '"v1"'},
+            content=gzip.compress(PAGE),
+        )
+    return httpx.Response(404)
+
+
+def test_replay_reproduces_recorded_exchanges(tmp_path):
+    """A replayed response matches the recorded one byte for byte"""
+    path = str(tmp_path / "cassette.jsonl")
+    
+    async def record():
+        transport = RecordingTransport(httpx.MockTransport(handler), Cassette(path))
+        async with httpx.AsyncClient(transport=transport) as client:
+            page = await client.get("https://example.com/page")
+            missing = await client.get("https://example.com/missing")
+        return page, missing
+    
+    async def replay():
+        async with httpx.AsyncClient(transport=ReplayTransport(Cassette(path), latency=0)) as client:
+            return await client.get("https://example.com/page"), await client.get("https://example.com/missing")
+    
+    recorded_page, recorded_missing = asyncio.run(record())
+    page, missing = asyncio.run(replay())
+    
+    assert recorded_page.content == page.content == PAGE
+    assert page.headers["etag"] == '"v1"'
+    assert recorded_missing.status_code == missing.status_code == 404
+
+
+def test_replay_misses_and_latency(tmp_path):
+    """Unrecorded URLs fail fast with a 404 and latency is simulated"""
+    async def replay():
+        transport = ReplayTransport(Cassette(str(tmp_path / "empty.jsonl")), latency=0.05)
+        async with httpx.AsyncClient(transport=transport) as client:
+            started = time.monotonic()
+            response = await client.get("https://example.com/never-recorded")
+            return response, time.monotonic() - started
+    
+    response, elapsed = asyncio.run(replay())
+    
+    assert response.status_code == 404
+    assert response.headers["x-cassette"] == "miss"
+    assert elapsed >= 0.05
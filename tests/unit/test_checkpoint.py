@@ -0,0 +1,126 @@
+"""
+Tests unitaires pour les checkpoints de crawl
+"""
+import asyncio
+import httpx
+from app.schemas import JobState
+from app.services import fetcher as fetcher_module
+from app.services.checkpoint import CrawlCheckpoint
+from app.services.clean_pool import process_page_in_worker
+from app.services.job_manager import JobManager
+
+
+def site_handler(requests):
+    """A home page linking to five articles, recording every requested path"""
+    def handler(request):
+        path = request.url.path
+        requests.append(path)
+        if path == "/":
+            links = "".join(f'<a href="/article/{i}">Article {i}</a>' for i in range(5))
+            body = f"<html><body>{links}</body></html>"
+        else:
+            body = f"<html><body><p>Content of {path}</p></body></html>"
+        return httpx.Response(200, headers={"content-type": "text/html"}, text=body)
+    return handler
+
+
+def test_interrupted_crawl_resumes_without_refetching(tmp_path, make_fetcher):
+    """A resumed crawl keeps earlier pages and only requests the rest"""
+    requests = []
+    handler = site_handler(requests)
+    
+    async def crawl(max_pages):
+        checkpoint = CrawlCheckpoint("job", checkpoint_dir=str(tmp_path / "checkpoints"))
+        fetcher = make_fetcher(handler)
+        return await fetcher.crawl(
+            seed_urls=["https://example.com/"],
+            domain_allowlist=["example.com"],
+            max_pages=max_pages,
+            max_depth=1,
+            checkpoint=checkpoint,
+        )
+    
+    # The first run stops early, like a process killed mid-crawl
+    first = asyncio.run(crawl(max_pages=3))
+    first_urls = {page["url"] for page in first}
+    requested_first = list(requests)
+    requests.clear()
+    
+    second = asyncio.run(crawl(max_pages=6))
+    urls = [page["url"] for page in second]
+    
+    assert len(urls) == 6
+    assert len(set(urls)) == 6
+    assert first_urls <= set(urls)
+    # Pages kept by the first run are not requested again
+    fetched_paths = {url.replace("https://example.com", "") for url in first_urls}
+    assert not fetched_paths & set(requests)
+    assert len(requested_first) + len(requests) <= 6 + 2  # at most the in-flight fetches are repeated
+
+
+def test_restored_pages_are_processed_off_the_loop(tmp_path, monkeypatch, make_fetcher):
+    """With a page processor, a resumed crawl hands it the restored pages instead of parsing them itself"""
+    requests = []
+    handler = site_handler(requests)
+    processed = []
+    
+    async def process_page(page, links, profile):
+        processed.append(page["url"])
+        return process_page_in_worker(page, frozenset(), links, profile)
+    
+    async def crawl(max_pages):
+        checkpoint = CrawlCheckpoint("job", checkpoint_dir=str(tmp_path / "checkpoints"))
+        fetcher = make_fetcher(handler)
+        return await fetcher.crawl(
+            seed_urls=["https://example.com/"],
+            domain_allowlist=["example.com"],
+            max_pages=max_pages,
+            max_depth=1,
+            checkpoint=checkpoint,
+            process_page=process_page,
+        )
+    
+    first = asyncio.run(crawl(max_pages=3))
+    processed.clear()
+    
+    def no_parsing(page):
+        raise AssertionError(f"{page['url']} parsed on the event loop")
+    
+    monkeypatch.setattr(fetcher_module, "parse_page", no_parsing)
+    second = asyncio.run(crawl(max_pages=6))
+    
+    assert len(second) == 6
+    assert {page["url"] for page in first} <= set(processed)
+
+
+def test_torn_journal_line_is_ignored(tmp_path):
+    """A partially written last event does not prevent resuming"""
+    checkpoint = CrawlCheckpoint("job", checkpoint_dir=str(tmp_path))
+    checkpoint.record_queued("https://example.com/", 0, "https://example.com/")
+    checkpoint.record_queued("https://example.com/a", 1, "https://example.com/a")
+    checkpoint.record_page({"url": "https://example.com/", "content": "<p>café</p>".encode("latin-1")}, "https://example.com/")
+    checkpoint.close()
+    with open(checkpoint.path, "a", encoding="utf-8") as f:
+        f.write('{"event": "page", "key": "https://exa')
+    
+    state = CrawlCheckpoint("job", checkpoint_dir=str(tmp_path)).load()
+    
+    assert [page["url"] for page in state["pages"]] == ["https://example.com/"]
+    assert state["pages"][0]["content"] == "<p>café</p>".encode("latin-1")
+    assert state["frontier"] == [("https://example.com/a", 1, 0.0, "")]
+
+
+def test_job_records_survive_restart(tmp_path):
+    """Persisted jobs are reloaded and unfinished ones reported for resuming"""
+    manager = JobManager(jobs_dir=str(tmp_path))
+    running = manager.create_job(["https://example.com/"], ["example.com"], 10, 1)
+    done = manager.create_job(["https://example.org/"], ["example.org"], 10, 1)
+    manager.update_job_state(running, JobState.RUNNING, pages_fetched=3)
+    manager.update_job_state(done, JobState.DONE)
+    
+    restarted = JobManager(jobs_dir=str(tmp_path))
+    unfinished = restarted.load_jobs()
+    
+    assert unfinished == [running]
+    assert restarted.get_job(running)["pages_fetched"] == 3
+    assert restarted.get_job(done)["state"] == JobState.DONE
@@ -0,0 +1,93 @@
+"""
+Tests unitaires pour le découpage en chunks par phrases et budget de tokens
+"""
+from app.config import settings
+from app.services.chunker import ESTIMATE_MARGIN, SentenceChunker, TokenCounter, sentence_spans, token_counter
+
+
+class WordCounter:
+    """Token counter counting words, for predictable budgets"""
+    
+    model = "test-model"
+    
+    def count(self, text):
+        return len(text.split())
+
+
+def sentence(i, words=5):
+    """A sentence of `words` words"""
+    return " ".join([f"S{i}"] + ["word"] * (words - 1)) + "."
+
+
+def test_sentence_spans_cover_the_text():
+    """Sentences end on terminal punctuation or line breaks"""
+    text = 'He said "stop!" Then left.\nNew line? Yes'
+    
+    spans = sentence_spans(text)
+    
+    assert [text[start:end] for start, end in spans] == ['He said "stop!" ', "Then left.\n", "New line? ", "Yes"]
+
+
+def test_sentences_are_packed_up_to_the_budget_with_overlap():
+    """Chunks hold whole sentences, never exceed the budget and repeat the last sentence"""
+    text = " ".join(sentence(i) for i in range(10))
+    chunker = SentenceChunker(max_tokens=16, overlap_tokens=5, counter=WordCounter())
+    
+    chunks = chunker.chunk(text)
+    
+    assert chunks[0] == " ".join(sentence(i) for i in range(3))
+    assert chunks[1].startswith(sentence(2))
+    assert all(len(chunk.split()) <= 16 for chunk in chunks)
+    assert chunks[-1].endswith(sentence(9))
+
+
+def test_long_sentence_is_split_between_words():
+    """A sentence over the budget is cut into pieces that fit"""
+    text = sentence(0, words=25) + " " + sentence(1)
+    chunker = SentenceChunker(max_tokens=10, overlap_tokens=0, counter=WordCounter())
+    
+    chunks = chunker.chunk(text)
+    
+    assert [len(chunk.split()) for chunk in chunks] == [10, 10, 10]
+    assert chunks[-1].endswith(sentence(1))
+
+
+class FakeTokenizer:
+    """Tokenizer splitting on spaces, recording how it was called"""
+    
+    def __init__(self):
+        self.calls = []
+    
+    def encode(self, text, add_special_tokens=True, verbose=True):
+        self.calls.append(add_special_tokens)
+        return text.split() + (["[CLS]", "[SEP]"] if add_special_tokens else [])
+
+
+def test_budget_is_capped_by_the_embedding_model(monkeypatch):
+    """The local model's limit, less [CLS]/[SEP], lowers the budget, with a margin when estimating"""
+    monkeypatch.setattr(settings, "embedding_provider", "local")
+    counter = TokenCounter()
+    counter.tokenizer = None
+    
+    estimated = SentenceChunker(max_tokens=1000, counter=counter)
+    counter.tokenizer = FakeTokenizer()
+    exact = SentenceChunker(max_tokens=1000, counter=counter)
+    
+    assert estimated.max_tokens == int(254 * ESTIMATE_MARGIN)
+    assert exact.max_tokens == 254
+    assert counter.count("two words") == 2
+    assert counter.tokenizer.calls == [False]
+    assert TokenCounter("unknown-model").count("Hello, world") == 3
+
+
+def test_chunkers_share_one_counter_per_model(monkeypatch):
+    """The tokenizer is loaded once per model, not once per chunker"""
+    monkeypatch.setattr(settings, "embedding_provider", "openai")
+    monkeypatch.setattr(settings, "embedding_model", "unknown-model")
+    
+    first = SentenceChunker()
+    second = SentenceChunker()
+    
+    assert first.counter is second.counter
+    assert first.counter is token_counter("unknown-model")
+    assert token_counter("other-model") is not first.counter
@@ -77,3 +77,48 @@ def test_clean_and_chunk_minimal():
     # Should return empty if content is too short
     assert isinstance(chunks, list)
 
+
+
+def test_clean_page_reuses_parsed_tree():
+    """clean_page works on a tree that was already parsed by the fetcher"""
+    from app.services.html_parser import parse_html
+    
+    cleaner = ContentCleaner()
+    html = (
+        "<html><head><title>Doc</title></head><body>"
+        "<nav>Home | About</nav>"
+        "<main><p>" + "Useful documentation content. " * 10 + "</p></main>"
+        "</body></html>"
+    )
+    page = {"url": "https://example.com/doc", "html": html, "fetched_at": "2024-01-01T00:00:00"}
+    
+    chunks = cleaner.clean_page(page, parse_html(html))
+    
+    assert len(chunks) == 1
+    assert chunks[0]["title"] == "Doc"
+    assert "Home" not in chunks[0]["text"]
+
+
+def test_single_pass_extraction_follows_selector_rules():
+    """Boilerplate matched by tag, class or id substring is skipped; main content wins by priority"""
+    from app.services.html_parser import parse_html
+    
+    cleaner = ContentCleaner()
+    soup = parse_html(
+        "<html><head><title> Guide </title><style>p {}</style></head><body>"
+        "<header><h1>Site name</h1></header>"
+        "<div class='top-navbar'>Home</div><div id='main-menu'>Menu</div>"
+        "<div class='content'>Teaser</div>"
+        "<article>First <span class='sidebar-ad'>Ad</span>part</article>"
+        "<!-- comment --><article>Second part</article>"
+        "<aside>Related</aside></body></html>"
+    )
+    
+    title, text, _ = cleaner._extract_content(soup)
+    
+    assert title == "Guide"
+    assert text == "First part Second part"
+    assert soup.find("style") is not None  # the tree is not modified
+    
+    no_title = parse_html("<body><header><h1>Site</h1></header><h1>Topic</h1><p>Body text</p></body>")
+    assert cleaner._extract_content(no_title)[:2] == ("Topic", "TopicBody text")
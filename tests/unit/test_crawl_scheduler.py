@@ -0,0 +1,110 @@
+"""
+Tests unitaires pour l'ordonnanceur de crawl par hôte
+"""
+import asyncio
+import time
+from app.services.crawl_scheduler import CrawlScheduler
+
+
+async def _timed_slots(scheduler, urls):
+    """Acquire one slot per URL concurrently and return the start times"""
+    starts = {}
+    
+    async def acquire(url):
+        async with scheduler.slot(url):
+            starts[url] = time.monotonic()
+            await asyncio.sleep(0.01)
+    
+    await asyncio.gather(*(acquire(url) for url in urls))
+    return starts
+
+
+def test_same_host_is_spaced():
+    """Requests to one host respect the politeness delay"""
+    scheduler = CrawlScheduler(delay=0.1, max_per_host=1)
+    urls = [f"https://example.com/page{i}" for i in range(3)]
+    
+    starts = asyncio.run(_timed_slots(scheduler, urls))
+    
+    ordered = sorted(starts.values())
+    assert ordered[1] - ordered[0] >= 0.09
+    assert ordered[2] - ordered[1] >= 0.09
+
+
+def test_different_hosts_run_in_parallel():
+    """Requests to different hosts don't wait for each other"""
+    scheduler = CrawlScheduler(delay=0.2, max_per_host=1)
+    urls = [f"https://host{i}.example.com/" for i in range(5)]
+    
+    began = time.monotonic()
+    starts = asyncio.run(_timed_slots(scheduler, urls))
+    
+    assert max(starts.values()) - began < 0.1
+    assert len(scheduler.hosts) == 5
+
+
+def test_aimd_window():
+    """The per-host window grows on fast successes and halves on failures"""
+    scheduler = CrawlScheduler(delay=0, max_per_host=4)
+    
+    async def run(fail: bool):
+        async with scheduler.slot("https://example.com/") as ticket:
+            ticket.failed = fail
+    
+    async def scenario():
+        for _ in range(10):
+            await run(False)
+        grown = scheduler.hosts["example.com"].limit
+        await run(True)
+        return grown, scheduler.hosts["example.com"].limit
+    
+    grown, shrunk = asyncio.run(scenario())
+    
+    assert grown == 4.0
+    assert shrunk == 2.0
+
+
+def test_circuit_breaker_parks_failing_host(monkeypatch):
+    """A host that keeps failing is skipped while other hosts continue"""
+    import pytest
+    from app.config import settings
+    from app.services.crawl_scheduler import HostUnavailable
+    
+    monkeypatch.setattr(settings, "circuit_breaker_threshold", 3)
+    monkeypatch.setattr(settings, "circuit_breaker_cooldown", 60.0)
+    scheduler = CrawlScheduler(delay=0, max_per_host=2)
+    
+    async def request(url, fail=False):
+        async with scheduler.slot(url) as ticket:
+            ticket.failed = fail
+    
+    async def scenario():
+        for _ in range(3):
+            await request("https://down.example.com/", fail=True)
+        with pytest.raises(HostUnavailable):
+            await request("https://down.example.com/")
+        await request("https://up.example.com/")
+    
+    asyncio.run(scenario())
+
+
+def test_retry_after_holds_host():
+    """defer_host delays every request to the host"""
+    from app.services.crawl_scheduler import parse_retry_after
+    
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after(None) is None
+    
+    scheduler = CrawlScheduler(delay=0, max_per_host=1)
+    
+    async def scenario():
+        scheduler.defer_host("https://example.com/", 0.2)
+        began = time.monotonic()
+        async with scheduler.slot("https://example.com/page"):
+            waited = time.monotonic() - began
+        async with scheduler.slot("https://other.com/"):
+            pass
+        return waited
+    
+    assert asyncio.run(scenario()) >= 0.19
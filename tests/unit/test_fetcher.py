@@ -0,0 +1,392 @@
+"""
+Tests unitaires pour le service de récupération web
+"""
+import asyncio
+import os
+import httpx
+from app.config import settings
+from app.services.html_parser import parse_page
+from app.services.http_cache import HttpCache
+from app.utils.urls import UrlFilter
+
+
+SCOPE = UrlFilter(["example.com"])
+PAGE = "<html><head><title>Page</title></head><body><p>Hello</p></body></html>"
+
+
+def test_conditional_revalidation(make_fetcher):
+    """A second fetch sends the ETag and reuses the cached body on 304"""
+    seen_headers = []
+    
+    def handler(request):
+        seen_headers.append(request.headers.get("if-none-match"))
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304, headers={"etag": '"v1"'})
+        return httpx.Response(200, headers={"content-type": "text/html", "etag": '"v1"'}, text=PAGE)
+    
+    async def run():
+        first = make_fetcher(handler)
+        page1 = await first._fetch_page("https://example.com/", SCOPE)
+        second = make_fetcher(handler)
+        page2 = await second._fetch_page("https://example.com/", SCOPE)
+        return page1, page2, second.stats
+    
+    page1, page2, stats = asyncio.run(run())
+    
+    assert seen_headers == [None, '"v1"']
+    assert page1["content"] == page2["content"] == PAGE.encode()
+    assert stats == {"cache_hits": 0, "cache_revalidations": 1, "shared_fetches": 0}
+
+
+def test_concurrent_requests_share_one_fetch(tmp_path, make_fetcher):
+    """Two jobs asking for the same URL at once trigger a single request"""
+    calls = []
+    
+    async def handler(request):
+        calls.append(request.url)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, headers={"content-type": "text/html"}, text=PAGE)
+    
+    async def run():
+        cache = HttpCache(cache_dir=str(tmp_path / "http_cache"), max_age=0)
+        fetchers = [make_fetcher(handler) for _ in range(2)]
+        for fetcher in fetchers:
+            fetcher.cache = cache
+        pages = await asyncio.gather(*(
+            fetcher._fetch_page("https://example.com/doc", SCOPE) for fetcher in fetchers
+        ))
+        return pages, fetchers
+    
+    pages, fetchers = asyncio.run(run())
+    
+    assert len(calls) == 1
+    assert all(page["content"] == PAGE.encode() for page in pages)
+    assert sum(fetcher.stats["shared_fetches"] for fetcher in fetchers) == 1
+    assert sum(fetcher.stats["cache_hits"] for fetcher in fetchers) == 0
+
+
+def test_cache_evicts_oldest_entries_past_its_size_limit(tmp_path):
+    """Once the cached bodies exceed max_bytes, the least recently stored entries are deleted"""
+    cache = HttpCache(cache_dir=str(tmp_path / "http_cache"), max_bytes=250)
+    headers = httpx.Headers({"content-type": "text/html"})
+    
+    async def run():
+        for i in range(4):
+            await cache.store(f"https://example.com/{i}", headers, "text/html", None, bytes(100))
+            # Distinct modification times, oldest first
+            meta_path = cache._paths(f"https://example.com/{i}")[0]
+            os.utime(meta_path, (i, i))
+        return [await cache.load(f"https://example.com/{i}") for i in range(4)]
+    
+    entries = asyncio.run(run())
+    
+    assert [entry is not None for entry in entries] == [False, False, True, True]
+    assert cache._size == 200
+
+
+def test_sitemap_discovery(make_fetcher):
+    """Discovery mode seeds the frontier from robots.txt sitemaps and honors its rules"""
+    robots = (
+        "User-agent: *\n"
+        "Disallow: /private/\n"
+        "Crawl-delay: 0.01\n"
+        "Sitemap: https://docs.example.com/sitemap_index.xml\n"
+    )
+    index = (
+        '<?xml version="1.0"?><sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        "<sitemap><loc>https://docs.example.com/sitemap1.xml</loc></sitemap></sitemapindex>"
+    )
+    sitemap = (
+        '<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        "<url><loc>https://docs.example.com/guide</loc></url>"
+        "<url><loc>https://docs.example.com/private/secret</loc></url>"
+        "<url><loc>https://other.org/page</loc></url>"
+        "</urlset>"
+    )
+    requested = []
+    
+    def handler(request):
+        path = request.url.path
+        requested.append(path)
+        if path == "/robots.txt":
+            return httpx.Response(200, text=robots)
+        if path == "/sitemap_index.xml":
+            return httpx.Response(200, headers={"content-type": "application/xml"}, text=index)
+        if path == "/sitemap1.xml":
+            return httpx.Response(200, headers={"content-type": "application/xml"}, text=sitemap)
+        return httpx.Response(200, headers={"content-type": "text/html"}, text=PAGE)
+    
+    async def run():
+        fetcher = make_fetcher(handler)
+        return await fetcher.crawl(
+            seed_urls=["https://docs.example.com/"],
+            domain_allowlist=["docs.example.com"],
+            max_pages=10,
+            max_depth=0,
+            discover=True,
+        )
+    
+    pages = asyncio.run(run())
+    
+    assert sorted(page["url"] for page in pages) == [
+        "https://docs.example.com/",
+        "https://docs.example.com/guide",
+    ]
+    assert "/private/secret" not in requested
+
+
+def test_streaming_rejects_without_reading_body(monkeypatch, make_fetcher):
+    """Non-HTML, oversized and binary-looking URLs are dropped early"""
+    monkeypatch.setattr(settings, "fetch_max_body_bytes", 1000)
+    requested = []
+    chunks_sent = {"/video": 0, "/huge": 0}
+    
+    class CountingStream(httpx.AsyncByteStream):
+        def __init__(self, path):
+            self.path = path
+        
+        async def __aiter__(self):
+            for _ in range(100):
+                chunks_sent[self.path] += 1
+                yield b"x" * 500
+    
+    def handler(request):
+        path = request.url.path
+        requested.append(path)
+        content_type = "video/mp4" if path == "/video" else "text/html"
+        return httpx.Response(200, headers={"content-type": content_type}, stream=CountingStream(path))
+    
+    async def run():
+        fetcher = make_fetcher(handler)
+        return [
+            await fetcher._fetch_page(f"https://example.com{path}", SCOPE)
+            for path in ("/report.pdf", "/video", "/huge")
+        ]
+    
+    results = asyncio.run(run())
+    
+    assert results == [None, None, None]
+    assert requested == ["/video", "/huge"]
+    assert chunks_sent["/video"] == 0
+    assert chunks_sent["/huge"] <= 3
+
+
+def test_crawl_hands_parsed_tree_to_consumer(make_fetcher):
+    """Each page is parsed once and the tree is passed to on_page"""
+    def handler(request):
+        links = '<a href="/a">A</a><a href="/b">B</a>' if request.url.path == "/" else ""
+        return httpx.Response(200, headers={"content-type": "text/html"}, text=f"<html><body>{links}</body></html>")
+    
+    received = []
+    
+    async def run():
+        fetcher = make_fetcher(handler)
+        return await fetcher.crawl(
+            seed_urls=["https://example.com/"],
+            domain_allowlist=["example.com"],
+            max_pages=10,
+            max_depth=1,
+            on_page=lambda page, soup: received.append((page["url"], soup)),
+        )
+    
+    pages = asyncio.run(run())
+    
+    assert len(pages) == 3
+    assert sorted(url for url, _ in received) == [
+        "https://example.com/",
+        "https://example.com/a",
+        "https://example.com/b",
+    ]
+    assert all(soup.find("body") is not None for _, soup in received)
+
+
+def test_redirects_and_canonical_links_are_deduplicated(make_fetcher):
+    """Redirect targets and rel=canonical pages are only kept once"""
+    def handler(request):
+        path = request.url.path
+        if path == "/":
+            links = '<a href="/old">old</a><a href="/print">print</a><a href="/article/?utm_source=nav">article</a>'
+            return httpx.Response(200, headers={"content-type": "text/html"}, text=f"<html><body>{links}</body></html>")
+        if path == "/old":
+            return httpx.Response(301, headers={"location": "https://example.com/article"})
+        if path == "/print":
+            head = '<link rel="canonical" href="https://example.com/article">'
+            return httpx.Response(200, headers={"content-type": "text/html"}, text=f"<html><head>{head}</head><body>Print</body></html>")
+        return httpx.Response(200, headers={"content-type": "text/html"}, text="<html><body>Article</body></html>")
+    
+    async def run():
+        fetcher = make_fetcher(handler)
+        fetcher.client = httpx.AsyncClient(transport=httpx.MockTransport(handler), follow_redirects=True)
+        return await fetcher.crawl(
+            seed_urls=["https://example.com/"],
+            domain_allowlist=["example.com"],
+            max_pages=10,
+            max_depth=1,
+            on_page=lambda page, soup: None,
+        )
+    
+    pages = asyncio.run(run())
+    
+    assert sorted(page["url"] for page in pages) == ["https://example.com/", "https://example.com/article"]
+
+
+def test_retry_after_is_honored(monkeypatch, make_fetcher):
+    """A 429 with Retry-After is retried after exactly that delay"""
+    import time
+    monkeypatch.setattr(settings, "fetch_max_retries", 3)
+    attempts = []
+    
+    def handler(request):
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            return httpx.Response(429, headers={"retry-after": "1"})
+        return httpx.Response(200, headers={"content-type": "text/html"}, text=PAGE)
+    
+    async def run():
+        fetcher = make_fetcher(handler)
+        return await fetcher._fetch_page("https://example.com/", SCOPE)
+    
+    page = asyncio.run(run())
+    
+    assert page is not None
+    assert len(attempts) == 2
+    assert 0.9 <= attempts[1] - attempts[0] < 1.5
+
+
+def test_best_first_crawl_follows_relevant_links(make_fetcher):
+    """Best-first crawling fetches the link matching the notes before the others"""
+    def handler(request):
+        if request.url.path == "/":
+            links = (
+                '<a href="/about">About us</a>'
+                '<a href="/category/news">News</a>'
+                '<a href="/guides/asyncio">Python asyncio tutorial</a>'
+            )
+        else:
+            links = ""
+        return httpx.Response(200, headers={"content-type": "text/html"}, text=f"<html><body>{links}</body></html>")
+    
+    async def run():
+        fetcher = make_fetcher(handler)
+        return await fetcher.crawl(
+            seed_urls=["https://example.com/"],
+            domain_allowlist=["example.com"],
+            max_pages=2,
+            max_depth=1,
+            strategy="best_first",
+            user_notes="python asyncio tutorial",
+        )
+    
+    pages = asyncio.run(run())
+    
+    assert [page["url"] for page in pages] == ["https://example.com/", "https://example.com/guides/asyncio"]
+
+
+def test_pages_keep_raw_bytes_and_honor_meta_charset(make_fetcher):
+    """Bodies are kept as bytes and decoded by the parser from <meta charset>"""
+    body = '<html><head><meta charset="iso-8859-1"></head><body><p>Déjà vu</p></body></html>'.encode("iso-8859-1")
+    
+    def handler(request):
+        return httpx.Response(200, headers={"content-type": "text/html"}, content=body)
+    
+    received = []
+    
+    async def run():
+        fetcher = make_fetcher(handler)
+        page = await fetcher._fetch_page("https://example.com/", SCOPE)
+        received.append(parse_page(page).get_text())
+        return page
+    
+    page = asyncio.run(run())
+    
+    assert page["content"] == body
+    assert page["encoding"] is None
+    assert received == ["Déjà vu"]
+
+
+def test_budget_is_shared_between_seeds(monkeypatch, make_fetcher):
+    """A link-heavy first seed does not use up the budget of the second one"""
+    monkeypatch.setattr(settings, "fetch_concurrency", 1)
+    
+    def handler(request):
+        path = request.url.path
+        links = "".join(f'<a href="{path}/{i}">Link</a>' for i in range(10)) if path in ("/a", "/b") else ""
+        return httpx.Response(200, headers={"content-type": "text/html"}, text=f"<html><body>{links}</body></html>")
+    
+    async def run(budget_split):
+        fetcher = make_fetcher(handler)
+        return await fetcher.crawl(
+            seed_urls=["https://example.com/a", "https://example.com/b"],
+            domain_allowlist=["example.com"],
+            max_pages=6,
+            max_depth=1,
+            budget_split=budget_split,
+        )
+    
+    shared = [page["url"] for page in asyncio.run(run("none"))]
+    fair = [page["url"] for page in asyncio.run(run("seed"))]
+    
+    assert not any("/b/" in url for url in shared)
+    assert fair == [
+        "https://example.com/a",
+        "https://example.com/b",
+        "https://example.com/a/0",
+        "https://example.com/b/0",
+        "https://example.com/a/1",
+        "https://example.com/b/1",
+    ]
+
+
+def test_busy_host_does_not_block_other_hosts(monkeypatch, make_fetcher):
+    """URLs of a host without a free slot are held while other hosts are fetched"""
+    monkeypatch.setattr(settings, "fetch_concurrency", 2)
+    requested = []
+    
+    def handler(request):
+        requested.append(request.url.host)
+        return httpx.Response(200, headers={"content-type": "text/html"}, text=PAGE)
+    
+    async def run():
+        fetcher = make_fetcher(handler)
+        fetcher.scheduler.set_host_delay("https://slow.example.com/", 0.1)
+        return await fetcher.crawl(
+            seed_urls=[f"https://slow.example.com/{i}" for i in range(4)] + [f"https://fast.example.com/{i}" for i in range(4)],
+            domain_allowlist=["slow.example.com", "fast.example.com"],
+            max_pages=8,
+            max_depth=0,
+        )
+    
+    pages = asyncio.run(run())
+    
+    assert len(pages) == 8
+    # The fast host is done while the slow one is still on its first pages
+    slow = [i for i, host in enumerate(requested) if host == "slow.example.com"]
+    fast = [i for i, host in enumerate(requested) if host == "fast.example.com"]
+    assert slow[2] > fast[-1]
+
+
+def test_parked_host_urls_wait_for_the_cooldown(monkeypatch, make_fetcher):
+    """URLs of a host parked by its circuit breaker are fetched after the cooldown, not dropped"""
+    monkeypatch.setattr(settings, "fetch_max_retries", 1)
+    monkeypatch.setattr(settings, "circuit_breaker_threshold", 2)
+    monkeypatch.setattr(settings, "circuit_breaker_cooldown", 0.1)
+    requested = []
+    
+    def handler(request):
+        requested.append(request.url.path)
+        if len(requested) <= 2:
+            return httpx.Response(503)
+        return httpx.Response(200, headers={"content-type": "text/html"}, text=PAGE)
+    
+    async def run():
+        fetcher = make_fetcher(handler)
+        return await fetcher.crawl(
+            seed_urls=[f"https://example.com/{i}" for i in range(6)],
+            domain_allowlist=["example.com"],
+            max_pages=10,
+            max_depth=0,
+        )
+    
+    pages = asyncio.run(run())
+    
+    assert sorted(page["url"] for page in pages) == [f"https://example.com/{i}" for i in range(2, 6)]
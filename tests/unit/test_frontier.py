@@ -0,0 +1,105 @@
+"""
+Tests unitaires pour la frontière de crawl
+"""
+from app.services.frontier import BestFirstFrontier, CrawlFrontier, FairFrontier
+
+
+def test_pop_shallowest_first(tmp_path):
+    """URLs are popped by depth, FIFO within a depth"""
+    frontier = CrawlFrontier(max_in_memory=100, spill_dir=str(tmp_path))
+    frontier.push("https://example.com/b", 1)
+    frontier.push("https://example.com/a", 0)
+    frontier.push("https://example.com/c", 1)
+    
+    assert frontier.pop() == ("https://example.com/a", 0)
+    assert frontier.pop() == ("https://example.com/b", 1)
+    assert frontier.pop() == ("https://example.com/c", 1)
+    assert frontier.pop() is None
+
+
+def test_dedup_on_enqueue(tmp_path):
+    """The same URL is only queued once"""
+    frontier = CrawlFrontier(max_in_memory=100, spill_dir=str(tmp_path))
+    assert frontier.push("https://example.com/a", 1)
+    assert not frontier.push("https://example.com/a", 2)
+    assert len(frontier) == 1
+
+
+def test_spill_to_disk(tmp_path):
+    """URLs beyond the memory cap spill to disk and keep FIFO order"""
+    frontier = CrawlFrontier(max_in_memory=10, spill_dir=str(tmp_path))
+    urls = [f"https://example.com/{i}" for i in range(50)]
+    for url in urls:
+        frontier.push(url, 1)
+    
+    assert frontier.in_memory == 10
+    assert len(frontier) == 50
+    
+    popped = []
+    while True:
+        entry = frontier.pop()
+        if entry is None:
+            break
+        popped.append(entry[0])
+        assert frontier.in_memory <= 10
+    
+    assert popped == urls
+    frontier.close()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_best_first_pops_highest_score():
+    """Best-first frontier pops by score, shallowest first on ties"""
+    frontier = BestFirstFrontier(max_in_memory=100)
+    frontier.push("https://example.com/about", 1, score=0.5)
+    frontier.push("https://example.com/deep", 2, score=3.0)
+    frontier.push("https://example.com/near", 1, score=3.0)
+    assert not frontier.push("https://example.com/about", 1, score=9.0)
+    
+    assert frontier.pop() == ("https://example.com/near", 1)
+    assert frontier.pop() == ("https://example.com/deep", 2)
+    assert frontier.pop() == ("https://example.com/about", 1)
+    assert frontier.pop() is None
+
+
+def test_best_first_prunes_lowest_scores():
+    """Past the memory cap the lowest-scored URLs are dropped"""
+    frontier = BestFirstFrontier(max_in_memory=10)
+    for i in range(30):
+        frontier.push(f"https://example.com/{i}", 1, score=float(i))
+    
+    assert len(frontier) <= 10
+    assert frontier.pop() == ("https://example.com/29", 1)
+
+
+def test_fair_frontier_takes_turns_between_groups(tmp_path):
+    """Groups are popped in turn, by weight, and an empty group yields its turn"""
+    frontier = FairFrontier(lambda dedup: CrawlFrontier(spill_dir=str(tmp_path), dedup=dedup), weights={"b": 2})
+    for i in range(4):
+        frontier.push(f"https://a.example.com/{i}", 1, group="a")
+    frontier.push("https://b.example.com/0", 1, group="b")
+    frontier.push("https://b.example.com/1", 1, group="b")
+    frontier.push("https://b.example.com/2", 1, group="b")
+    
+    assert not frontier.push("https://a.example.com/0", 1, group="b")
+    order = [frontier.pop()[0] for _ in range(len(frontier))]
+    assert order == [
+        "https://a.example.com/0",
+        "https://b.example.com/0",
+        "https://b.example.com/1",
+        "https://a.example.com/1",
+        "https://b.example.com/2",
+        "https://a.example.com/2",
+        "https://a.example.com/3",
+    ]
+    assert frontier.pop() is None
+
+
+def test_fair_frontier_groups_share_one_seen_set(tmp_path):
+    """Only the fair frontier keeps a dedup set, not each of its groups"""
+    frontier = FairFrontier(lambda dedup: CrawlFrontier(spill_dir=str(tmp_path), dedup=dedup))
+    frontier.push("https://a.example.com/", 0, group="a")
+    frontier.push("https://b.example.com/", 0, group="b")
+    
+    assert all(group.enqueued is None for group in frontier.groups.values())
+    assert not frontier.push("https://b.example.com/", 1, group="a")
@@ -0,0 +1,63 @@
+"""
+Tests unitaires pour le pool HTTP partagé
+"""
+import asyncio
+import socket
+import httpcore
+import httpx
+import pytest
+from app.services.http_client import CachingDNSBackend, ConnectionPoolTransport, HttpClientPool
+
+
+def test_dns_answers_are_cached():
+    """Repeated connections to a host resolve it only once within the TTL"""
+    lookups = []
+    
+    async def getaddrinfo(host, port, **kwargs):
+        lookups.append(host)
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("192.0.2.1", port))]
+    
+    async def run():
+        asyncio.get_running_loop().getaddrinfo = getaddrinfo
+        backend = CachingDNSBackend(ttl=60, backend=httpcore.AsyncMockBackend([]))
+        await backend.connect_tcp("example.com", 443)
+        await backend.connect_tcp("example.com", 443)
+        await backend.connect_tcp("127.0.0.1", 443)
+    
+    asyncio.run(run())
+    assert lookups == ["example.com"]
+
+
+def test_pool_reuses_one_client():
+    """Every caller gets the same client until the pool is closed"""
+    async def run():
+        pool = HttpClientPool()
+        first = pool.get_client()
+        assert pool.get_client() is first
+        await pool.close()
+        assert pool.get_client() is not first
+        await pool.close()
+    
+    asyncio.run(run())
+
+
+def test_pool_transport_serves_requests_and_maps_errors():
+    """Requests go through the httpcore pool and its errors surface as httpx ones"""
+    async def run():
+        pool = httpcore.AsyncConnectionPool(network_backend=httpcore.AsyncMockBackend([
+            b"HTTP/1.1 200 OK\r\n",
+            b"Content-Length: 5\r\n",
+            b"\r\n",
+            b"hello",
+        ]))
+        async with httpx.AsyncClient(transport=ConnectionPoolTransport(pool)) as client:
+            response = await client.get("http://example.com/page")
+            assert response.status_code == 200
+            assert response.text == "hello"
+        # The mock connection is exhausted, so the server "disconnects"
+        pool = httpcore.AsyncConnectionPool(network_backend=httpcore.AsyncMockBackend([]))
+        async with httpx.AsyncClient(transport=ConnectionPoolTransport(pool)) as client:
+            with pytest.raises(httpx.RemoteProtocolError):
+                await client.get("http://example.com/page")
+    
+    asyncio.run(run())
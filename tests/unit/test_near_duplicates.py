@@ -0,0 +1,58 @@
+"""
+Tests unitaires pour la détection de quasi-doublons (MinHash LSH)
+"""
+import random
+from app.services.cleaner import ContentCleaner
+from app.services.near_duplicates import NearDuplicateIndex, lsh_bands
+
+
+def random_text(seed, words=150):
+    """Text of random words, unrelated to other seeds"""
+    rng = random.Random(seed)
+    return " ".join(f"word{rng.randrange(10000)}" for _ in range(words))
+
+
+def test_index_finds_near_duplicates_only():
+    """A one-word edit is found; an unrelated or heavily edited text is not"""
+    index = NearDuplicateIndex(threshold=0.85)
+    original = random_text(0)
+    for i in range(200):
+        index.add(f"doc{i}", random_text(i))
+    
+    edited = original.split()
+    edited[75] = "changed"
+    rewritten = original.split()
+    rewritten[20:60] = ["other"] * 40
+    
+    assert index.add("edited", " ".join(edited)) == "doc0"
+    assert index.add("rewritten", " ".join(rewritten)) is None
+    assert index.add("new", random_text(1000)) is None
+    assert len(index) == 202
+
+
+def test_bands_find_pairs_at_the_threshold():
+    """Banding keeps a 95% chance of comparing texts at the threshold"""
+    bands, rows = lsh_bands(0.85, 128)
+    
+    assert bands * rows <= 128
+    assert 1 - (1 - 0.85 ** rows) ** bands >= 0.95
+    assert 1 - (1 - 0.85 ** (rows + 1)) ** (128 // (rows + 1)) < 0.95
+
+
+def test_cleaner_skips_near_duplicate_pages_and_chunks():
+    """A print view of a page and a chunk repeated with a small change are not indexed twice"""
+    cleaner = ContentCleaner()
+    article = random_text(1, words=200)
+    page = {"url": "https://example.com/a", "text": article, "fetched_at": "2024-01-01T00:00:00"}
+    print_view = dict(page, url="https://example.com/a?print=1", text=article + " Printed from example.com")
+    other = dict(page, url="https://example.com/b", text=random_text(2, words=200))
+    
+    kept = [cleaner.add_page(p) for p in (page, print_view, other)]
+    
+    assert [len(chunks) > 0 for chunks in kept] == [True, False, True]
+    
+    edited = article.split()
+    edited[100] = "changed"
+    new_chunk = {"url": "https://example.com/c", "chunkid": "c0", "text": random_text(3, words=200)}
+    near_chunk = {"url": "https://example.com/c", "chunkid": "c1", "text": " ".join(edited)}
+    assert cleaner._deduplicate_pages([new_chunk, near_chunk]) == [new_chunk]
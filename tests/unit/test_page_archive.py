@@ -0,0 +1,134 @@
+"""
+Tests unitaires pour l'archive des pages brutes
+"""
+import asyncio
+import gzip
+from app.config import settings
+from app.schemas import JobState
+from app.services.job_manager import JobManager
+from app.services.page_archive import PageArchive
+from app.services.pipeline import IngestionPipeline
+
+
+def make_page(i):
+    """A fetched page as produced by WebFetcher"""
+    return {
+        "url": f"https://example.com/{i}",
+        "content": f"<html><body><p>Page {i} - café</p></body></html>".encode("iso-8859-1"),
+        "encoding": "iso-8859-1",
+        "status_code": 200,
+        "content_type": "text/html; charset=iso-8859-1",
+        "headers": [["Content-Type", "text/html; charset=iso-8859-1"], ["ETag", f'"v{i}"']],
+        "fetched_at": "2024-01-01T12:00:00.123456",
+    }
+
+
+def test_pages_round_trip_through_archive(tmp_path):
+    """Archived pages are read back with their body, headers and fetch time"""
+    archive = PageArchive("job", archive_dir=str(tmp_path))
+    for i in range(3):
+        archive.append(make_page(i))
+    archive.append(make_page(1))  # already archived
+    
+    pages = list(PageArchive("job", archive_dir=str(tmp_path)).iter_pages())
+    
+    assert [page["url"] for page in pages] == [f"https://example.com/{i}" for i in range(3)]
+    assert pages[1]["content"] == make_page(1)["content"]
+    assert pages[1]["encoding"] == "iso-8859-1"
+    assert pages[1]["status_code"] == 200
+    assert ["ETag", '"v1"'] in pages[1]["headers"]
+    assert pages[1]["content_type"] == "text/html; charset=iso-8859-1"
+    assert pages[1]["fetched_at"] == "2024-01-01T12:00:00"
+
+
+def test_archive_is_a_gzip_warc_file(tmp_path):
+    """Each record is a gzip member holding a WARC response record"""
+    archive = PageArchive("job", archive_dir=str(tmp_path))
+    archive.append(make_page(0))
+    archive.append(make_page(1))
+    
+    with open(archive.path, "rb") as f:
+        content = gzip.decompress(f.read())
+    
+    assert content.startswith(b"WARC/1.1\r\nWARC-Type: response\r\n")
+    assert content.count(b"WARC/1.1\r\n") == 2
+    assert b"WARC-Target-URI: https://example.com/1" in content
+
+
+def test_replay_feeds_pages_without_network(tmp_path):
+    """Replay hands every archived page to the consumer"""
+    archive = PageArchive("job", archive_dir=str(tmp_path))
+    for i in range(3):
+        archive.append(make_page(i))
+    received = []
+    
+    async def on_page(page, soup):
+        received.append(page["url"])
+    
+    pages = asyncio.run(archive.replay(on_page))
+    
+    assert received == [f"https://example.com/{i}" for i in range(3)]
+    assert all("content" not in page for page in pages)
+
+
+def test_pipeline_fills_a_new_archive(tmp_path, embeddings, store):
+    """Pages streamed through the pipeline are archived, starting from an empty archive"""
+    async def crawl(on_page):
+        pages = [make_page(i) for i in range(2)]
+        for page in pages:
+            await on_page(page, None)
+        return pages
+    
+    pipeline = IngestionPipeline(embeddings, store, archive=PageArchive("job", archive_dir=str(tmp_path)))
+    asyncio.run(pipeline.run(crawl))
+    
+    assert len(PageArchive("job", archive_dir=str(tmp_path))) == 2
+
+
+def test_replaced_records_supersede_old_ones(tmp_path):
+    """A replaced page is read back with its new body, in its original position; removed ones are gone"""
+    archive = PageArchive("job", archive_dir=str(tmp_path))
+    for i in range(3):
+        archive.append(make_page(i))
+    updated = dict(make_page(0), content=b"<html><body><p>Updated</p></body></html>")
+    archive.append(updated, replace=True)
+    archive.remove("https://example.com/1")
+    
+    reopened = PageArchive("job", archive_dir=str(tmp_path))
+    pages = list(reopened.iter_pages())
+    
+    assert [page["url"] for page in pages] == ["https://example.com/0", "https://example.com/2"]
+    assert pages[0]["content"] == updated["content"]
+    assert len(reopened) == 2
+
+
+def test_reprocess_keeps_the_job_serving(tmp_path, monkeypatch, embeddings, failing_embeddings):
+    """The job stays DONE while reprocessing; a failure is recorded apart and keeps the index"""
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path / "data"))
+    manager = JobManager(jobs_dir=str(tmp_path / "jobs"))
+    job_id = manager.create_job(["https://example.com/"], ["example.com"], 10, 1)
+    manager.update_job_state(job_id, JobState.DONE, pages_indexed=7)
+    archive = PageArchive(job_id)
+    for i in range(3):
+        text = f"Archived page {i} explains reprocessing in detail. " * 8
+        archive.append({"url": f"https://example.com/{i}", "html": f"<html><body><p>{text}</p></body></html>", "fetched_at": "2024-01-01T00:00:00"})
+    
+    assert manager.prepare_reprocess(job_id) == 3
+    assert manager.jobs[job_id]["state"] == JobState.DONE
+    assert manager.jobs[job_id]["reprocessing"]
+    assert not manager.is_refreshable(manager.jobs[job_id])
+    
+    manager.embedding_service = failing_embeddings
+    asyncio.run(manager.reprocess_job(job_id))
+    failed = dict(manager.jobs[job_id])
+    
+    manager.prepare_reprocess(job_id)
+    manager.embedding_service = embeddings
+    asyncio.run(manager.reprocess_job(job_id))
+    job = manager.jobs[job_id]
+    
+    assert (failed["state"], failed["pages_indexed"], failed["reprocessing"]) == (JobState.DONE, 7, False)
+    assert "quota" in failed["reprocess_error"]
+    assert (job["state"], job["pages_indexed"], job["reprocess_error"]) == (JobState.DONE, 3, None)
+    assert job_id not in manager.reprocessing
+    assert len(manager.get_vector_store(job_id).chunks) == 3
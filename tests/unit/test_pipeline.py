@@ -0,0 +1,161 @@
+"""
+Tests unitaires pour le pipeline d'ingestion en flux
+"""
+import asyncio
+import os
+from concurrent.futures.process import BrokenProcessPool
+import httpx
+import numpy as np
+import pytest
+from app.config import settings
+from app.services import clean_pool, fetcher
+from app.services.clean_pool import CleaningPool, clean_page_in_worker
+from app.services.html_parser import parse_html
+from app.services.pipeline import EmbeddingError, IngestionPipeline
+from app.services.vector_store import VectorStore
+
+
+def make_page(i):
+    """A page long enough to produce a chunk"""
+    text = f"Page number {i} talks about topic {i}. " * 10
+    return {
+        "url": f"https://example.com/{i}",
+        "html": f"<html><body><p>{text}</p></body></html>",
+        "fetched_at": "2024-01-01T00:00:00",
+    }
+
+
+def test_chunks_are_embedded_while_crawling(embeddings, store):
+    """Batches are embedded and indexed before the crawl has finished"""
+    events = embeddings.events
+    
+    async def crawl(on_page):
+        pages = [make_page(i) for i in range(6)] + [make_page(0)]  # last one is a duplicate
+        for page in pages:
+            await on_page(page, parse_html(page["html"]))
+            events.append(("fetched", page["url"]))
+            await asyncio.sleep(0.01)
+        return pages
+    
+    pipeline = IngestionPipeline(embeddings, store, batch_size=2)
+    
+    stats = asyncio.run(pipeline.run(crawl))
+    
+    assert stats == {"pages_fetched": 7, "pages_cleaned": 7, "chunks_indexed": 6}
+    assert len(store.chunks) == 6
+    # Chunks are only held until they are indexed
+    assert pipeline.cleaner.processed_content == []
+    first_embed = events.index(("embed", 2))
+    last_fetch = max(i for i, event in enumerate(events) if event[0] == "fetched")
+    assert first_embed < last_fetch
+
+
+def test_embedding_failure_stops_the_crawl(failing_embeddings, store):
+    """A failing embed stage cancels the other stages and surfaces the error"""
+    async def crawl(on_page):
+        i = 0
+        while True:  # would never end on its own
+            await on_page(make_page(i), None)
+            i += 1
+    
+    async def run():
+        pipeline = IngestionPipeline(failing_embeddings, store, queue_size=2, batch_size=1)
+        await asyncio.wait_for(pipeline.run(crawl), timeout=5)
+    
+    with pytest.raises(EmbeddingError, match="insufficient_quota"):
+        asyncio.run(run())
+
+
+def test_vector_store_appends_batches(tmp_path, monkeypatch):
+    """Repeated add_chunks calls extend the index instead of replacing it"""
+    pytest.importorskip("faiss")
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path))
+    store = VectorStore("job")
+    
+    store.add_chunks([{"text": "a"}, {"text": "b"}], np.eye(3)[:2])
+    store.add_chunks([{"text": "c"}], np.eye(3)[2:])
+    
+    assert len(store.chunks) == 3
+    assert store.index.ntotal == 3
+    results = store.search(np.array([0.0, 0.0, 1.0]), top_k=1)
+    assert results[0][0]["text"] == "c"
+
+
+def crash_on_marker(page, template_blocks=frozenset()):
+    """Worker function killing its process on a marked page"""
+    if page["url"].endswith("/crash"):
+        os._exit(1)
+    return clean_page_in_worker(page, template_blocks)
+
+
+def test_pool_cleaning_keeps_page_order(embeddings, store):
+    """Pages cleaned in worker processes come back in crawl order"""
+    pages = [make_page(i) for i in range(8)]
+    pages.insert(3, {"url": "https://example.com/broken"})  # fails to clean
+    
+    async def crawl(on_page):
+        for page in pages:
+            await on_page(page, None)
+        return pages
+    
+    async def run():
+        pool = CleaningPool(workers=2)
+        try:
+            pipeline = IngestionPipeline(embeddings, store, pool=pool, batch_size=3)
+            return await pipeline.run(crawl)
+        finally:
+            pool.close()
+    
+    stats = asyncio.run(run())
+    
+    assert stats["pages_cleaned"] == 9
+    assert [chunk["url"] for chunk in store.chunks] == [f"https://example.com/{i}" for i in range(8)]
+
+
+def test_pool_recovers_from_a_crashed_worker(monkeypatch):
+    """A worker dying fails its page only; the next page gets a new pool"""
+    monkeypatch.setattr(clean_pool, "clean_page_in_worker", crash_on_marker)
+    
+    async def run():
+        pool = CleaningPool(workers=1)
+        try:
+            with pytest.raises(BrokenProcessPool):
+                await pool.clean({"url": "https://example.com/crash"})
+            return await pool.clean(make_page(1))
+        finally:
+            pool.close()
+    
+    chunks, _ = asyncio.run(run())
+    
+    assert [chunk["url"] for chunk in chunks] == ["https://example.com/1"]
+
+
+def test_crawled_pages_are_parsed_once_in_the_pool(monkeypatch, embeddings, store, make_fetcher):
+    """With process_page the crawler gets links and chunks from the pool and never parses on the loop"""
+    def handler(request):
+        i = int(request.url.path.strip("/") or 0)
+        page = make_page(i)
+        links = "".join(f'<a href="/{j}">Page {j}</a>' for j in (i + 1, i + 2) if j < 5)
+        return httpx.Response(200, headers={"content-type": "text/html"}, text=page["html"].replace("</body>", links + "</body>"))
+    
+    def no_parse(page, backend=None):
+        raise AssertionError("parsed on the event loop")
+    
+    monkeypatch.setattr(fetcher, "parse_page", no_parse)
+    
+    async def run():
+        pool = CleaningPool(workers=1)
+        web_fetcher = make_fetcher(handler)
+        try:
+            pipeline = IngestionPipeline(embeddings, store, pool=pool, batch_size=2)
+            return await pipeline.run(lambda on_page: web_fetcher.crawl(
+                ["https://example.com/0"], ["example.com"], max_pages=10, max_depth=5,
+                on_page=on_page, process_page=pipeline.process_page
+            ))
+        finally:
+            pool.close()
+    
+    stats = asyncio.run(run())
+    
+    assert stats["pages_fetched"] == 5
+    assert sorted(chunk["url"] for chunk in store.chunks) == [f"https://example.com/{i}" for i in range(5)]
@@ -0,0 +1,125 @@
+"""
+Tests unitaires pour l'ingestion par envoi de documents (NDJSON)
+"""
+import asyncio
+import json
+import httpx
+import pytest
+from fastapi import FastAPI
+from app.config import settings
+from app.routers import ingest
+from app.schemas import JobState
+from app.services.job_manager import JobManager, job_manager
+from app.services.push_ingest import PushFormatError, PushStream
+
+
+TEXT = "Pushed documents are indexed without crawling. " * 5
+
+
+async def chunked(data: bytes, size: int):
+    """Simulate a request body arriving in small pieces"""
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def collect(stream: PushStream):
+    return [page async for page in stream.pages()]
+
+
+def test_records_are_split_across_chunks_and_validated():
+    """Lines spanning several chunks are rebuilt; invalid records are skipped"""
+    body = "\n".join([
+        json.dumps({"url": "https://example.com/a", "html": f"<p>{TEXT}</p>", "title": "A"}),
+        "{not json",
+        json.dumps({"url": "https://example.com/b"}),
+        "",
+        json.dumps({"url": "https://example.com/c", "text": TEXT, "fetched_at": "2024-01-01T00:00:00"}),
+    ]).encode()
+    stream = PushStream(chunked(body, 7))
+    
+    pages = asyncio.run(collect(stream))
+    
+    assert [page["url"] for page in pages] == ["https://example.com/a", "https://example.com/c"]
+    assert pages[0]["title"] == "A"
+    assert pages[1]["text"] == TEXT
+    assert pages[1]["fetched_at"] == "2024-01-01T00:00:00"
+    assert (stream.accepted, stream.rejected) == (2, 2)
+
+
+def test_oversized_record_stops_the_stream():
+    """A line longer than the limit is not buffered"""
+    body = json.dumps({"url": "https://example.com/a", "text": "x" * 1000}).encode()
+    stream = PushStream(chunked(body, 100), max_record_bytes=500)
+    
+    with pytest.raises(PushFormatError):
+        asyncio.run(collect(stream))
+
+
+def test_pushed_pages_are_indexed_as_a_job(tmp_path, monkeypatch, embeddings):
+    """HTML and plain-text records end up in a finished, queryable job"""
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path / "data"))
+    body = "\n".join([
+        json.dumps({"url": "https://example.com/a", "html": f"<html><body><nav>Menu</nav><p>{TEXT}</p></body></html>"}),
+        json.dumps({"url": "https://example.com/b", "text": TEXT.replace("Pushed", "Plain"), "title": "Plain"}),
+    ]).encode()
+    
+    manager = JobManager(jobs_dir=str(tmp_path / "jobs"))
+    manager.embedding_service = embeddings
+    job_id = manager.create_job([], [], max_pages=0, max_depth=0)
+    job = asyncio.run(manager.ingest_push(job_id, PushStream(chunked(body, 64))))
+    
+    assert job["state"] == JobState.DONE
+    assert job["pages_fetched"] == 2
+    chunks = manager.get_vector_store(job_id).chunks
+    assert [chunk["url"] for chunk in chunks] == ["https://example.com/a", "https://example.com/b"]
+    assert "Menu" not in chunks[0]["text"]
+    assert chunks[1]["title"] == "Plain"
+
+
+def test_push_endpoint_reports_the_job_outcome(tmp_path, monkeypatch, embeddings):
+    """A finished push answers with its state; a failed one with an error status"""
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path / "data"))
+    monkeypatch.setattr(settings, "push_max_record_bytes", 500)
+    monkeypatch.setattr(job_manager, "jobs_dir", tmp_path / "jobs")
+    monkeypatch.setattr(job_manager, "embedding_service", embeddings)
+    app = FastAPI()
+    app.include_router(ingest.router)
+    
+    async def push(body):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api") as client:
+            return await client.post("/ingest/push", content=body)
+    
+    done = asyncio.run(push(json.dumps({"url": "https://example.com/a", "text": TEXT}).encode()))
+    oversized = asyncio.run(push(json.dumps({"url": "https://example.com/a", "text": "x" * 1000}).encode()))
+    empty = asyncio.run(push(b"{not json\n"))
+    
+    assert done.status_code == 200
+    assert done.json()["state"] == "done"
+    assert oversized.status_code == 413
+    assert empty.status_code == 400
+    job_id = oversized.json()["detail"].split()[2]
+    assert job_manager.get_job(job_id)["state"] == JobState.FAILED
+
+
+def test_reprocessed_push_job_keeps_text_records(tmp_path, monkeypatch, embeddings):
+    """Plain-text records are archived, so a reprocess rebuilds them with their title"""
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path / "data"))
+    monkeypatch.setattr(settings, "page_archive_enabled", True)
+    body = "\n".join([
+        json.dumps({"url": "https://example.com/a", "html": f"<html><body><p>{TEXT}</p></body></html>"}),
+        json.dumps({"url": "https://example.com/b", "text": TEXT.replace("Pushed", "Plain"), "title": "Plain"}),
+    ]).encode()
+    
+    manager = JobManager(jobs_dir=str(tmp_path / "jobs"))
+    manager.embedding_service = embeddings
+    job_id = manager.create_job([], [], max_pages=0, max_depth=0, source="push")
+    asyncio.run(manager.ingest_push(job_id, PushStream(chunked(body, 64))))
+    
+    assert manager.prepare_reprocess(job_id) == 2
+    asyncio.run(manager.reprocess_job(job_id))
+    
+    chunks = manager.get_vector_store(job_id).chunks
+    assert manager.jobs[job_id]["reprocess_error"] is None
+    assert [chunk["url"] for chunk in chunks] == ["https://example.com/a", "https://example.com/b"]
+    assert chunks[1]["title"] == "Plain"
+    assert chunks[1]["text"].startswith("Plain documents")
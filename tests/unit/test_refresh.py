@@ -0,0 +1,156 @@
+"""
+Tests unitaires pour le rafraîchissement des jobs (détection des changements)
+"""
+import asyncio
+from datetime import datetime, timedelta
+import httpx
+import numpy as np
+import pytest
+from app.config import settings
+from app.schemas import JobState
+from app.services.cleaner import ContentCleaner
+from app.services.job_manager import JobManager
+from app.services.page_archive import PageArchive
+from app.services.page_hashes import PageHashes, content_hash
+from app.services.refresh import JobRefresher
+from app.services.refresh_scheduler import RefreshScheduler
+from app.services.templates import JobTemplates
+from app.services.vector_store import VectorStore
+
+
+def index_job(job_id, pages):
+    """Index pages as a finished crawl would, recording their hashes and site templates"""
+    store = VectorStore(job_id)
+    cleaner = ContentCleaner()
+    for page in pages:
+        chunks = cleaner.add_page(page)
+        store.add_chunks(chunks, np.ones((len(chunks), 4), dtype="float32"))
+    store.save()
+    PageHashes(job_id).save({page["url"]: content_hash(page) for page in pages})
+    JobTemplates(job_id).save(cleaner.templates)
+
+
+def test_refresh_reembeds_only_changed_pages(tmp_path, monkeypatch, page_html, embeddings, make_fetcher):
+    """Unchanged pages keep their vectors; changed ones are re-embedded and published"""
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path))
+    bodies = {"/a": page_html("asyncio").encode(), "/b": page_html("threads").encode()}
+    pages = [
+        {"url": f"https://example.com{path}", "content": body, "fetched_at": "2024-01-01T00:00:00"}
+        for path, body in bodies.items()
+    ]
+    index_job("job", pages)
+    archive = PageArchive("job")
+    for page in pages:
+        archive.append(page)
+    bodies["/b"] = page_html("processes").encode()
+    conditional = []
+    
+    def handler(request):
+        conditional.append(request.headers.get("if-none-match"))
+        if request.headers.get("if-none-match") == '"a1"':
+            return httpx.Response(304, headers={"etag": '"a1"'})
+        etag = '"a1"' if request.url.path == "/a" else None
+        headers = {"content-type": "text/html", **({"etag": etag} if etag else {})}
+        return httpx.Response(200, headers=headers, content=bodies[request.url.path])
+    
+    async def refresh():
+        job = {"job_id": "job", "domain_allowlist": ["example.com"]}
+        return await JobRefresher(embeddings, make_fetcher(handler), archive=PageArchive("job")).refresh(job)
+    
+    stats = asyncio.run(refresh())
+    embedded = list(embeddings.texts)
+    stats_again = asyncio.run(refresh())
+    
+    assert (stats["pages_changed"], stats["pages_unchanged"]) == (1, 1)
+    assert embedded and all("processes" in text for text in embedded)
+    store = VectorStore("job")
+    assert store.load()
+    assert [chunk["title"] for chunk in store.chunks] == ["asyncio", "processes"]
+    assert store.index.ntotal == 2
+    assert (stats_again["pages_changed"], stats_again["pages_unchanged"]) == (0, 2)
+    assert embeddings.texts == embedded
+    assert '"a1"' in conditional
+    assert [page["content"] for page in PageArchive("job").iter_pages()] == [bodies["/a"], bodies["/b"]]
+
+
+def test_saves_publish_new_versions_atomically(tmp_path, monkeypatch):
+    """Each save is a new version behind the CURRENT pointer; old ones are pruned"""
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path))
+    for count in (1, 2, 3):
+        store = VectorStore("job")
+        chunks = [{"url": f"https://example.com/{i}", "text": "x"} for i in range(count)]
+        store.add_chunks(chunks, np.ones((count, 4), dtype="float32"))
+        store.save()
+    
+    loaded = VectorStore("job")
+    assert loaded.load()
+    assert len(loaded.chunks) == 3
+    versions = [path for path in loaded.index_path.iterdir() if path.is_dir()]
+    assert len(versions) == VectorStore.KEPT_VERSIONS
+
+
+def test_scheduler_picks_jobs_due_for_refresh(tmp_path):
+    """Only finished crawl jobs past their interval are due"""
+    manager = JobManager(jobs_dir=str(tmp_path))
+    old = (datetime.utcnow() - timedelta(hours=2)).isoformat()
+    due = manager.create_job(["https://example.com/"], ["example.com"], 10, 1, refresh_interval_hours=1)
+    recent = manager.create_job(["https://example.com/"], ["example.com"], 10, 1, refresh_interval_hours=3)
+    never = manager.create_job(["https://example.com/"], ["example.com"], 10, 1)
+    pushed = manager.create_job([], [], 0, 0, refresh_interval_hours=1)
+    for job_id in (due, recent, never, pushed):
+        manager.update_job_state(job_id, JobState.DONE)
+        manager.jobs[job_id]["updated_at"] = old
+    manager.jobs[pushed]["source"] = "push"
+    
+    assert RefreshScheduler(manager).due_jobs() == [due]
+
+
+def test_refresh_is_discarded_when_job_changed(tmp_path, monkeypatch, page_html, embeddings, make_fetcher):
+    """A refresh that may no longer publish keeps the current index and hashes"""
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path))
+    page = {"url": "https://example.com/a", "content": page_html("asyncio").encode(), "fetched_at": "2024-01-01T00:00:00"}
+    index_job("job", [page])
+    
+    def handler(request):
+        return httpx.Response(200, headers={"content-type": "text/html"}, content=page_html("threads").encode())
+    
+    async def refresh():
+        job = {"job_id": "job", "domain_allowlist": ["example.com"]}
+        await JobRefresher(embeddings, make_fetcher(handler)).refresh(job, can_publish=lambda: False)
+    
+    with pytest.raises(RuntimeError):
+        asyncio.run(refresh())
+    
+    store = VectorStore("job")
+    assert store.load()
+    assert [chunk["title"] for chunk in store.chunks] == ["asyncio"]
+    assert PageHashes("job").load() == {page["url"]: content_hash(page)}
+
+
+def test_refreshed_pages_are_cleaned_without_the_site_template(tmp_path, monkeypatch, embeddings, make_fetcher):
+    """Site chrome learned by the first ingest stays out of re-embedded pages"""
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path))
+    chrome = "<div>Subscribe to our newsletter for weekly tips and tricks</div>"
+    
+    def body(topic):
+        text = f"This page explains {topic} in detail. " * 8
+        return f"<html><body>{chrome}<p>{text}</p></body></html>".encode()
+    
+    pages = [
+        {"url": f"https://example.com/{i}", "content": body(f"topic {i}"), "fetched_at": "2024-01-01T00:00:00"}
+        for i in range(6)
+    ]
+    index_job("job", pages)
+    
+    def handler(request):
+        content = body("something new") if request.url.path == "/5" else body(f"topic {request.url.path[1:]}")
+        return httpx.Response(200, headers={"content-type": "text/html"}, content=content)
+    
+    async def refresh():
+        job = {"job_id": "job", "domain_allowlist": ["example.com"]}
+        return await JobRefresher(embeddings, make_fetcher(handler)).refresh(job)
+    
+    stats = asyncio.run(refresh())
+    
+    assert stats["pages_changed"] == 1
+    assert embeddings.texts and all("newsletter" not in text for text in embeddings.texts)
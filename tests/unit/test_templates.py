@@ -0,0 +1,64 @@
+"""
+Tests unitaires pour la détection des blocs de gabarit répétés sur un site
+"""
+import random
+from app.services.cleaner import ContentCleaner
+from app.services.templates import SiteTemplates, block_fingerprint
+
+
+BANNER = "We use cookies to improve your experience. Accept all cookies"
+RELATED = "Related articles: ten tips for faster builds"
+
+
+def article(i):
+    """A page of a site with a cookie banner and a related-articles widget"""
+    rng = random.Random(i)
+    text = " ".join(f"word{rng.randrange(10000)}" for _ in range(80))
+    return {
+        "url": f"https://blog.example.com/post/{i}",
+        "html": (
+            f"<html><head><title>Post {i}</title></head><body>"
+            f"<div class='consent'>{BANNER}</div>"
+            f"<article><p>{text}.</p><div class='widget'>{RELATED}</div></article>"
+            f"</body></html>"
+        ),
+        "fetched_at": "2024-01-01T00:00:00",
+    }
+
+
+def test_blocks_on_most_pages_become_the_template():
+    """Only blocks above the ratio count, per host, once enough pages were seen"""
+    templates = SiteTemplates(ratio=0.5, min_pages=3)
+    banner, other = block_fingerprint(BANNER), block_fingerprint("Page specific")
+    for i in range(3):
+        templates.add(f"https://a.example.com/{i}", [banner] + ([other] if i == 0 else []))
+    
+    assert templates.blocks_for("https://a.example.com/new") == {banner}
+    assert templates.blocks_for("https://b.example.com/") == frozenset()
+    assert block_fingerprint("  WE use cookies to improve your experience.\nAccept all cookies") == banner
+
+
+def test_cleaner_drops_site_template_after_learning_it():
+    """Once the site's template is known, its blocks are no longer chunked"""
+    cleaner = ContentCleaner()
+    
+    chunks = [cleaner.add_page(article(i)) for i in range(8)]
+    
+    assert RELATED in chunks[0][0]["text"]
+    for page_chunks in chunks[5:]:
+        assert page_chunks
+        assert all(RELATED not in chunk["text"] for chunk in page_chunks)
+        assert all("word" in chunk["text"] for chunk in page_chunks)
+
+
+def test_rare_blocks_are_pruned():
+    """Blocks seen on one page are dropped periodically, frequent ones are kept"""
+    templates = SiteTemplates(ratio=0.5, min_pages=3, prune_pages=10)
+    banner = block_fingerprint(BANNER)
+    for i in range(1000):
+        blocks = [block_fingerprint(f"Paragraph {i}.{j}") for j in range(20)]
+        templates.add(f"https://a.example.com/{i}", blocks + [banner])
+    
+    assert len(templates.counts["a.example.com"]) <= 1 + 20 * 10
+    assert templates.counts["a.example.com"][banner] == 1000
+    assert templates.blocks_for("https://a.example.com/new") == {banner}
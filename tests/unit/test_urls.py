@@ -0,0 +1,73 @@
+"""
+Tests unitaires pour la canonicalisation d'URL et l'ensemble des URLs vues
+"""
+import pytest
+from app.config import settings
+from app.utils.urls import DomainMatcher, SeenUrlSet, UrlFilter, canonicalize_url
+
+
+def test_canonicalize_url():
+    """Equivalent URLs collapse, distinct pages stay distinct"""
+    assert canonicalize_url("HTTPS://Example.COM:443/Docs/") == "https://example.com/Docs"
+    assert canonicalize_url("http://example.com:8080/a#section") == "http://example.com:8080/a"
+    assert canonicalize_url("https://example.com") == "https://example.com/"
+    assert canonicalize_url("https://example.com/?utm_source=x&b=2&a=1&fbclid=y") == "https://example.com/?a=1&b=2"
+    assert canonicalize_url("https://example.com/%7euser/%2f") == "https://example.com/~user/%2F"
+    
+    # Path and query case are significant
+    assert canonicalize_url("https://example.com/Page") != canonicalize_url("https://example.com/page")
+    assert canonicalize_url("https://example.com/?q=A") != canonicalize_url("https://example.com/?q=a")
+
+
+@pytest.mark.parametrize("backend", ["set", "fingerprint", "bloom"])
+def test_seen_url_set_backends(backend):
+    """All backends remember added URLs"""
+    seen = SeenUrlSet(backend)
+    urls = [f"https://example.com/page/{i}" for i in range(1000)]
+    for url in urls:
+        seen.add(url)
+    seen.add(urls[0])
+    
+    assert len(seen) == 1000
+    assert all(url in seen for url in urls)
+    assert "https://example.com/other" not in seen
+
+
+def test_bloom_is_compact():
+    """The Bloom backend uses a few bytes per URL at its capacity"""
+    from app.config import settings
+    
+    seen = SeenUrlSet("bloom")
+    bytes_per_url = len(seen._bloom.bits) / settings.seen_url_bloom_capacity
+    assert bytes_per_url < 2.0
+
+
+def test_domain_matcher_respects_label_boundaries():
+    """Allowlisted domains match themselves and subdomains, not lookalikes"""
+    matcher = DomainMatcher(["example.com", "https://Docs.Other.org/path", "*.wild.net"])
+    
+    assert matcher.matches("example.com")
+    assert matcher.matches("www.example.com")
+    assert matcher.matches("docs.other.org")
+    assert matcher.matches("api.wild.net")
+    assert not matcher.matches("evil-example.com")
+    assert not matcher.matches("example.com.evil.io")
+    assert not matcher.matches("other.org")
+
+
+def test_url_filter_applies_include_and_exclude_rules():
+    """Include patterns narrow the crawl, exclude patterns and traps always win"""
+    scope = UrlFilter(["example.com"], include_patterns=[r"^/docs/"], exclude_patterns=[r"/drafts/"])
+    
+    assert scope.allows("https://example.com/docs/intro")
+    assert not scope.allows("https://example.com/blog/post")
+    assert not scope.allows("https://example.com/docs/drafts/x")
+    assert not scope.allows("https://evil-example.com/docs/intro")
+    assert scope.allows_domain("https://example.com/blog/post")
+    
+    traps = UrlFilter(["example.com"], exclude_patterns=settings.crawl_trap_patterns)
+    assert not traps.allows("https://example.com/tag/python/")
+    assert not traps.allows("https://example.com/blog/page/7")
+    assert not traps.allows("https://example.com/events/calendar?month=5")
+    assert not traps.allows("https://example.com/post?replytocom=12")
+    assert traps.allows("https://example.com/2024/05/12/release-notes")